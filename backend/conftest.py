@@ -0,0 +1,28 @@
+"""pytest setup for backend/tests. Living next to `pipeline/`, this file
+puts backend/ on sys.path, so the tests run from the repo root too."""
+
+from __future__ import annotations
+
+import pytest
+
+from pipeline.config import Settings
+from pipeline.sqlite_db import SqliteDatabase
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    """Open SqliteDatabase instances on one file in a temp state_dir
+    (spool included); Settings fields can be overridden per call."""
+    opened: list[SqliteDatabase] = []
+
+    def make(**overrides) -> SqliteDatabase:
+        settings = Settings(
+            supabase_url="", supabase_key="", db_backend="sqlite", state_dir=str(tmp_path), **overrides
+        )
+        db = SqliteDatabase(settings)
+        opened.append(db)
+        return db
+
+    yield make
+    for db in opened:
+        db.close()
@@ -3,6 +3,7 @@
 Usage:
     python -m pipeline run <group-or-source> [<group-or-source> ...]
     python -m pipeline list
+    python -m pipeline flush            # send writes spooled during an outage
 
 Examples:
     python -m pipeline run hot          # GMP + subscription
@@ -11,17 +12,23 @@ Examples:
     python -m pipeline run detail       # per-IPO deep scrape (throttled)
     python -m pipeline run all          # full pass
     python -m pipeline run investorgain_gmp chittorgarh_subscription
+    python -m pipeline run all --scheduler concurrent
+    python -m pipeline run all --record cassettes/today   # capture responses
+    python -m pipeline run all --replay cassettes/today   # offline re-run
 """
 
 from __future__ import annotations
 
 import argparse
+import dataclasses
+import signal
 import sys
 
+from .cassette import cassette_settings, open_cassette
 from .config import ConfigError, Settings
 from .logger import get_logger
 from .registry import ALL_SOURCES, GROUPS, resolve
-from .runner import run
+from .runner import flush_spool, run
 
 log = get_logger("pipeline.cli")
 
@@ -36,8 +43,29 @@ def main(argv: list[str] | None = None) -> int:
         nargs="+",
         help="Source name(s) or group name(s). See `pipeline list`.",
     )
+    run_p.add_argument(
+        "--scheduler",
+        choices=("sequential", "concurrent"),
+        default=None,
+        help="Override Settings.scheduler. `concurrent` runs sources on "
+        "distinct hosts in parallel.",
+    )
+
+    tape = run_p.add_mutually_exclusive_group()
+    tape.add_argument(
+        "--record",
+        metavar="DIR",
+        help="Also save every HTTP response / rendered page to a cassette in DIR.",
+    )
+    tape.add_argument(
+        "--replay",
+        metavar="DIR",
+        help="Serve responses from the cassette in DIR: no network, no sleeps, "
+        "writes go to a SQLite DB (DIR/replay.sqlite) dumped to DIR/replay-db.json.",
+    )
 
     sub.add_parser("list", help="List known sources and groups")
+    sub.add_parser("flush", help="Send DB writes spooled by earlier runs")
 
     args = parser.parse_args(argv)
 
@@ -51,11 +79,25 @@ def main(argv: list[str] | None = None) -> int:
         return 0
 
     try:
-        settings = Settings.load()
+        settings = Settings.load(require_supabase=not getattr(args, "replay", None))
     except ConfigError as exc:
         log.error("config error", extra={"error": str(exc)})
         print(f"error: {exc}", file=sys.stderr)
         return 2
+    if args.cmd == "flush":
+        sent, left = flush_spool(settings)
+        print(f"replayed {sent} spooled batch(es), {left} left")
+        return 1 if left else 0
+
+    if args.scheduler:
+        settings = dataclasses.replace(settings, scheduler=args.scheduler)
+    if args.record or args.replay:
+        settings = cassette_settings(settings, replay=bool(args.replay))
+    try:
+        cassette = open_cassette(args.record, args.replay)
+    except (OSError, ValueError) as exc:
+        print(f"error: cannot open cassette: {exc}", file=sys.stderr)
+        return 2
 
     # Expand group names to their constituent sources. Dedupe while
     # keeping order so "core cold" doesn't double-run calendar_events.
@@ -72,8 +114,12 @@ def main(argv: list[str] | None = None) -> int:
             print(f"error: {exc}", file=sys.stderr)
             return 2
 
+    # A cancelled workflow gets SIGTERM. Turn it into SystemExit so the
+    # runner's cleanup (write-behind flush, state saves) still happens.
+    signal.signal(signal.SIGTERM, lambda signum, _frame: sys.exit(128 + signum))
+
     log.info("starting pipeline run", extra={"sources": expanded})
-    report = run(expanded, settings=settings)
+    report = run(expanded, settings=settings, cassette=cassette)
 
     print()
     print("=" * 70)
@@ -0,0 +1,397 @@
+"""Asyncio counterpart of `PoliteClient`.
+
+Same contract as the sync client, and the same per-run state: an
+`AsyncPoliteClient` is opened on the run's `PoliteClient` and shares its
+per-host state (request cap, circuit breaker, warm-up memo, User-Agent,
+cookies, last request time), its conditional-GET validators, the AIMD
+gap, the request stats and the cassette. A host fetched through either
+client counts once against the cap, keeps one cookie jar, and has its
+session saved by `PoliteClient.save_state` as usual.
+
+  * One `httpx.AsyncClient` per host, on the host's cookie jar and UA.
+  * Honor Retry-After on 429/503, exponential backoff otherwise.
+  * Circuit breaker after two 401/403s, hard per-host request cap.
+  * `conditional=True` sends the stored validators and returns a 304.
+
+Pacing is a per-host token bucket instead of a blocking sleep: waiting
+for a host's token only suspends the coroutine that wants that host.
+Requests to other hosts keep flowing, so a source that needs several
+hosts can `await client.get_many([...])` and pay the slowest host's gap
+once instead of the sum of all of them.
+
+Usage from a (sync) source:
+
+    async def _fetch(http):
+        async with AsyncPoliteClient(http) as client:
+            return await client.get_many([URL_A, URL_B])
+
+    resp_a, resp_b = asyncio.run(_fetch(self.http))
+
+Requests to one host are serialised with the sync client's as well (the
+host lock is shared), so mixing the two on one host keeps the gap.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+
+from .cassette import _DROP_ON_REPLAY, Cassette
+from .config import RETRYABLE_STATUS
+from .http_client import _DEFAULT_HEADERS, HostBlocked, PoliteClient, _HostState, current_source
+from .logger import get_logger
+from .request_stats import RequestRecord
+
+log = get_logger("pipeline.http_async")
+
+
+class _TokenBucket:
+    """Single-host token bucket of capacity 1: no bursts, one token per
+    gap. The gap is read on every take, so AIMD changes apply at once,
+    and jitter is added per take, giving the same `gap + uniform(0,
+    jitter)` spacing PoliteClient sleeps. The last token is the host's
+    shared `last_request_at`, so requests made by the sync client (or
+    restored from the previous run's session) count too."""
+
+    def __init__(self, http: PoliteClient, host: str, st: _HostState):
+        self._http = http
+        self._host = host
+        self._st = st
+
+    async def take(self) -> float:
+        """Wait for the host's next token; returns seconds waited."""
+        settings = self._http.settings
+        rate = self._http.rate
+        base = rate.gap(self._host) if rate is not None else settings.per_host_min_gap_sec
+        gap = base + random.uniform(0.0, settings.per_host_jitter_sec)
+        if not self._st.last_request_at:
+            return 0.0
+        wait = self._st.last_request_at + gap - time.monotonic()
+        if wait <= 0:
+            return 0.0
+        await asyncio.sleep(wait)
+        return wait
+
+
+@dataclass
+class _AsyncHost:
+    st: _HostState  # shared with the PoliteClient
+    client: httpx.AsyncClient
+    bucket: _TokenBucket
+    # Queues this event loop's coroutines for the host before they take
+    # the shared (thread) lock, so at most one of them waits on it.
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class AsyncPoliteClient:
+    """Rate-limited asyncio HTTP client on top of a run's PoliteClient.
+    Use one instance per event loop."""
+
+    def __init__(self, http: PoliteClient, *, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """`transport` replaces httpx's network transport (e.g. a
+        MockTransport in a test)."""
+        self.http = http
+        self.settings = http.settings
+        self._transport = transport
+        self._hosts: dict[str, _AsyncHost] = {}
+
+    async def __aenter__(self) -> "AsyncPoliteClient":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        for host in self._hosts.values():
+            await host.client.aclose()
+        self._hosts.clear()
+
+    # -------------------------------------------------------------- #
+    # session management
+    # -------------------------------------------------------------- #
+
+    def _host_for(self, host: str) -> _AsyncHost:
+        # No lock needed: there is no await between lookup and insert.
+        entry = self._hosts.get(host)
+        if entry is None:
+            st = self.http._state_for(host)
+            transport = self._transport
+            if self.http.cassette is not None:
+                transport = _CassetteTransport(self.http.cassette, transport)
+            client = httpx.AsyncClient(
+                headers={**_DEFAULT_HEADERS, "User-Agent": st.user_agent},
+                # The requests session's jar itself, not a copy: cookies
+                # set here are seen by PoliteClient and saved with it.
+                cookies=st.session.cookies,
+                timeout=self.settings.request_timeout_sec,
+                follow_redirects=True,
+                transport=transport,
+            )
+            entry = _AsyncHost(st=st, client=client, bucket=_TokenBucket(self.http, host, st))
+            self._hosts[host] = entry
+        return entry
+
+    # -------------------------------------------------------------- #
+    # core fetch
+    # -------------------------------------------------------------- #
+
+    async def get(
+        self,
+        url: str,
+        *,
+        referer: Optional[str] = None,
+        extra_headers: Optional[dict[str, str]] = None,
+        accept_json: bool = False,
+        conditional: bool = False,
+    ) -> Optional[httpx.Response]:
+        """GET with per-host pacing, retries and backoff; see
+        `PoliteClient.get`."""
+        host = self.http._host_of(url)
+        entry = self._host_for(host)
+        rec = RequestRecord(host=host)
+
+        async with entry.lock:
+            while not entry.st.lock.acquire(blocking=False):
+                # The sync client is mid-request on this host. Polled
+                # rather than taken in a thread, so a cancelled get()
+                # can't end up holding the lock.
+                await asyncio.sleep(0.05)
+            try:
+                return await self._get_locked(
+                    url,
+                    host,
+                    entry,
+                    rec,
+                    referer=referer,
+                    extra_headers=extra_headers,
+                    accept_json=accept_json,
+                    conditional=conditional and self.http.cache is not None,
+                )
+            finally:
+                entry.st.lock.release()
+                if rec.attempts:
+                    self.http.stats.record(current_source.get(), rec)
+
+    async def _get_locked(
+        self,
+        url: str,
+        host: str,
+        entry: _AsyncHost,
+        rec: RequestRecord,
+        *,
+        referer: Optional[str],
+        extra_headers: Optional[dict[str, str]],
+        accept_json: bool,
+        conditional: bool,
+    ) -> Optional[httpx.Response]:
+        st = entry.st
+        cache = self.http.cache
+        if st.consecutive_blocks >= 2:
+            log.warning(
+                "host circuit-broken for this run; skipping",
+                extra={"host": host},
+            )
+            raise HostBlocked(host)
+
+        if st.request_count >= self.settings.per_host_max_requests_per_run:
+            log.warning(
+                "per-host request cap hit; skipping",
+                extra={"host": host, "records": st.request_count},
+            )
+            raise HostBlocked(host)
+
+        rec.politeness_sec = await entry.bucket.take()
+
+        headers: dict[str, str] = {}
+        if referer:
+            headers["Referer"] = referer
+            headers["Sec-Fetch-Site"] = "same-origin"
+        if accept_json:
+            headers["Accept"] = "application/json, text/plain, */*"
+        if extra_headers:
+            headers.update(extra_headers)
+        if conditional:
+            headers.update(cache.conditional_headers(url))  # type: ignore[union-attr]
+
+        backoff = self.settings.backoff_base_sec
+        last_status: Optional[int] = None
+
+        for attempt in range(1, self.settings.max_retries + 1):
+            rec.attempts = attempt
+            started = time.monotonic()
+            try:
+                resp = await entry.client.get(url, headers=headers)
+            except httpx.TransportError as exc:
+                log.warning(
+                    "request failed",
+                    extra={"host": host, "attempt": attempt},
+                    exc_info=exc,
+                )
+                rec.network_sec += time.monotonic() - started
+                await self._backoff(rec, min(backoff, self.settings.backoff_cap_sec))
+                backoff *= 2
+                continue
+            finally:
+                st.last_request_at = time.monotonic()
+                st.request_count += 1
+
+            rec.network_sec += time.monotonic() - started
+            _measure(rec, resp)
+            last_status = resp.status_code
+            retry_after = _retry_after(resp)
+            if self.http.rate is not None:
+                self.http.rate.observe(host, resp, retry_after)  # type: ignore[arg-type]
+
+            if resp.status_code == 200:
+                st.consecutive_blocks = 0
+                if conditional:
+                    cache.store(url, resp, owner=current_source.get())  # type: ignore[union-attr,arg-type]
+                return resp
+
+            if resp.status_code == 304 and conditional:
+                st.consecutive_blocks = 0
+                cache.touch(url)  # type: ignore[union-attr]
+                log.info("not modified", extra={"host": host, "status_code": 304})
+                return resp
+
+            if resp.status_code in (401, 403):
+                st.consecutive_blocks += 1
+                st.warmed_at = 0.0
+                log.warning(
+                    "blocked response",
+                    extra={"host": host, "status_code": resp.status_code, "attempt": attempt},
+                )
+                await self._backoff(rec, min(backoff * 2, self.settings.backoff_cap_sec))
+                backoff *= 2
+                continue
+
+            if resp.status_code in RETRYABLE_STATUS:
+                wait = retry_after or backoff
+                log.info(
+                    "retryable response",
+                    extra={"host": host, "status_code": resp.status_code, "attempt": attempt},
+                )
+                await self._backoff(rec, min(wait, self.settings.backoff_cap_sec))
+                backoff *= 2
+                continue
+
+            log.info(
+                "non-retryable response",
+                extra={"host": host, "status_code": resp.status_code, "attempt": attempt},
+            )
+            return resp
+
+        log.error(
+            "exhausted retries",
+            extra={"host": host, "status_code": last_status or 0},
+        )
+        return None
+
+    async def get_many(
+        self,
+        urls: list[str],
+        *,
+        referer: Optional[str] = None,
+        accept_json: bool = False,
+        conditional: bool = False,
+    ) -> list[Optional[httpx.Response]]:
+        """Fetch several URLs concurrently, results in input order.
+
+        Same-host URLs still queue on that host's bucket; different hosts
+        overlap. A blocked host yields None for its URLs rather than
+        cancelling the others.
+        """
+
+        async def _one(u: str) -> Optional[httpx.Response]:
+            try:
+                return await self.get(u, referer=referer, accept_json=accept_json, conditional=conditional)
+            except HostBlocked:
+                return None
+
+        return list(await asyncio.gather(*(_one(u) for u in urls)))
+
+    # -------------------------------------------------------------- #
+    # helpers
+    # -------------------------------------------------------------- #
+
+    async def warm_up(self, root_url: str, *more_urls: str) -> None:
+        """Hit the site root (then `more_urls`) for session cookies;
+        memoised per host with PoliteClient.warm_up's TTL."""
+        st = self._host_for(self.http._host_of(root_url)).st
+        if st.warmed_at and time.time() - st.warmed_at < self.settings.warm_up_ttl_sec:
+            log.info("warm-up still fresh; skipping", extra={"host": self.http._host_of(root_url)})
+            return
+        ok = True
+        for url in (root_url, *more_urls):
+            resp = await self.get(url)
+            ok = ok and resp is not None and resp.status_code == 200
+        if ok:
+            st.warmed_at = time.time()
+
+    @staticmethod
+    async def _backoff(rec: RequestRecord, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+        rec.backoff_sec += seconds
+
+
+class _CassetteTransport(httpx.AsyncBaseTransport):
+    """Records responses into the run's cassette, or serves them from it
+    (no network), in the format the requests adapter uses."""
+
+    def __init__(self, cassette: Cassette, inner: Optional[httpx.AsyncBaseTransport]):
+        self.cassette = cassette
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        if self.cassette.replay:
+            recorded = self.cassette.recorded_response(url)
+            if recorded is None:
+                raise httpx.ConnectError(f"not in cassette: {url}", request=request)
+            meta, body = recorded
+            resp = httpx.Response(meta["status"], headers=meta["headers"], content=body, request=request)
+            if meta.get("encoding"):
+                resp.encoding = meta["encoding"]
+            return resp
+        resp = await self.inner.handle_async_request(request)
+        resp.request = request
+        body = await resp.aread()  # decoded, as the requests adapter stores it
+        meta = {
+            "url": url,
+            "status": resp.status_code,
+            "reason": resp.reason_phrase,
+            "encoding": resp.charset_encoding,
+            "headers": dict(resp.headers),
+        }
+        self.cassette.record_response(url, meta, body)
+        headers = {k: v for k, v in meta["headers"].items() if k.lower() not in _DROP_ON_REPLAY}
+        return httpx.Response(resp.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def _measure(rec: RequestRecord, resp: httpx.Response) -> None:
+    rec.status = resp.status_code
+    try:
+        rec.ttfb_sec = resp.elapsed.total_seconds()
+    except RuntimeError:  # not closed yet (a mocked response)
+        pass
+    rec.body_bytes += len(resp.content)
+    # Bytes pulled off the socket, before decoding.
+    rec.wire_bytes += resp.num_bytes_downloaded or len(resp.content)
+
+
+def _retry_after(resp: httpx.Response) -> Optional[float]:
+    header = resp.headers.get("Retry-After")
+    if not header:
+        return None
+    try:
+        return float(header)
+    except ValueError:
+        return None
@@ -0,0 +1,154 @@
+"""Microbenchmark: turning detail rows into Supabase request bodies.
+
+    python -m pipeline.bench_encode                 # 2000 rows, 5 rounds
+    python -m pipeline.bench_encode --rows 500 --rounds 10
+
+Compares the write path before `db.encode_row` — None filter, then
+`_sanitize`, then a json.dumps per row to size chunks, then httpx
+encoding each chunk again — with the current one: the None filter
+plus one `encode_row` per row (which strips NULs from the bytes) whose
+bytes are both the chunk size and the request body. Run with and without orjson
+installed to see what it adds. No network, no database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Callable
+
+from . import db
+from .db import _drop_none, _sanitize, _sized_chunks
+
+
+def detail_row(i: int, rnd: random.Random) -> dict[str, Any]:
+    """A row shaped like chittorgarh_detail's output, on the large side."""
+
+    def text(n: int) -> str:
+        words = ("issue", "company", "limited", "shares", "equity", "offer", "crore", "fy24")
+        return " ".join(rnd.choice(words) for _ in range(n))
+
+    years = ("FY22", "FY23", "FY24", "FY25")
+    return {
+        "slug": f"bench-ipo-{i}",
+        "ipo_name": f"Bench Industries {i} IPO",
+        "about_company": text(250) + ("\x00" if i % 50 == 0 else ""),
+        "min_price": 100 + i % 50,
+        "max_price": 105 + i % 50,
+        "face_value": 10,
+        "lot_size": 140,
+        "issue_size_cr": round(rnd.uniform(50, 5000), 2),
+        "fresh_issue_size_cr": None,
+        "ofs_size_cr": round(rnd.uniform(0, 500), 2),
+        "issue_type": "Book Built Issue IPO",
+        "financials": [
+            {
+                "period": y,
+                "assets": rnd.uniform(1e2, 1e4),
+                "revenue": rnd.uniform(1e2, 1e4),
+                "profit_after_tax": rnd.uniform(-1e2, 1e3),
+                "net_worth": rnd.uniform(1e2, 1e4),
+                "reserves_and_surplus": rnd.uniform(1e2, 1e4),
+                "total_borrowing": rnd.uniform(0, 1e3),
+            }
+            for y in years
+        ],
+        "anchor_investors": [
+            {
+                "name": f"{text(3).title()} Fund {k}",
+                "shares": rnd.randint(10_000, 1_000_000),
+                "amount_cr": rnd.uniform(1, 50),
+            }
+            for k in range(30)
+        ],
+        "shareholding": {"pre_issue": rnd.uniform(50, 100), "post_issue": rnd.uniform(30, 80)},
+        "reservations": [
+            {
+                "category": c,
+                "shares_offered": rnd.randint(100_000, 10_000_000),
+                "percent": rnd.uniform(1, 50),
+            }
+            for c in ("QIB", "NII", "bNII", "sNII", "Retail", "Employee", "Anchor")
+        ],
+        "objectives": [{"objective": text(25)} for _ in range(6)],
+        "documents": [
+            {"title": f"{kind} document", "url": f"https://example.com/{i}/{kind}.pdf", "type": "pdf"}
+            for kind in ("drhp", "rhp", "addendum", "anchor", "prospectus")
+        ],
+        "faqs": [{"question": text(12) + "?", "answer": text(60)} for _ in range(12)],
+        "last_scraped_at": "2026-01-01T00:00:00+00:00",
+    }
+
+
+def before(rows: list[dict[str, Any]], chunk_size: int, chunk_bytes: int) -> int:
+    cleaned = [_sanitize({k: v for k, v in r.items() if v is not None}) for r in rows]
+    out = 0
+    chunk: list[dict[str, Any]] = []
+    size = 0
+    for row in cleaned:
+        n = len(json.dumps(row, default=str)) + 1
+        if chunk and (len(chunk) >= chunk_size or size + n > chunk_bytes):
+            out += len(_httpx_json(chunk))
+            chunk, size = [], 0
+        chunk.append(row)
+        size += n
+    if chunk:
+        out += len(_httpx_json(chunk))
+    return out
+
+
+def _httpx_json(chunk: list[dict[str, Any]]) -> bytes:
+    # What httpx does with `json=`.
+    return json.dumps(chunk, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+def after(rows: list[dict[str, Any]], chunk_size: int, chunk_bytes: int) -> int:
+    cleaned = [_drop_none(r) for r in rows]
+    return sum(len(c.body or b"") for c in _sized_chunks(cleaned, chunk_size, chunk_bytes))
+
+
+def _best(fn: Callable[[], int], rounds: int) -> tuple[float, int]:
+    best, out = float("inf"), 0
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser("pipeline.bench_encode", description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=40)
+    parser.add_argument("--chunk-bytes", type=int, default=256 * 1024)
+    args = parser.parse_args(argv)
+
+    rnd = random.Random(0)
+    rows = [detail_row(i, rnd) for i in range(args.rows)]
+    mb = sum(len(db.encode_row(r)) for r in rows) / 1e6
+    print(f"{args.rows} detail rows, {mb:.1f} MB of JSON, best of {args.rounds}")
+
+    sizes = (args.chunk_size, args.chunk_bytes)
+    timings = [("before (filter + sanitize + dumps x2)", _best(lambda: before(rows, *sizes), args.rounds))]
+    fast, db.orjson = db.orjson, None
+    timings.append(("encode_row, stdlib json", _best(lambda: after(rows, *sizes), args.rounds)))
+    db.orjson = fast
+    if fast is not None:
+        timings.append(("encode_row, orjson", _best(lambda: after(rows, *sizes), args.rounds)))
+    else:
+        print("(orjson not installed; `pip install orjson` to compare)")
+
+    base = timings[0][1][0]
+    for label, (secs, nbytes) in timings:
+        print(
+            f"  {label:<40} {secs * 1000:8.1f} ms  {mb / secs:7.1f} MB/s  "
+            f"x{base / secs:4.1f}  ({nbytes / 1e6:.1f} MB sent)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
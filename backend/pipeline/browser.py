@@ -13,11 +13,16 @@ block at the end of the run. Sources never instantiate this themselves.
 from __future__ import annotations
 
 import random
+import time
 from contextlib import contextmanager
 from typing import Iterator, Optional
+from urllib.parse import urlparse
 
+from .cassette import Cassette
 from .config import USER_AGENTS, Settings
+from .http_client import current_source
 from .logger import get_logger
+from .request_stats import RequestRecord, RequestStats
 
 log = get_logger("pipeline.browser")
 
@@ -51,8 +56,15 @@ _BLOCKED_HOST_SUFFIXES = (
 class HeadlessBrowser:
     """Lazy Playwright wrapper — started on first fetch, closed by runner."""
 
-    def __init__(self, settings: Settings):
+    def __init__(
+        self,
+        settings: Settings,
+        stats: Optional[RequestStats] = None,
+        cassette: Optional[Cassette] = None,
+    ):
         self.settings = settings
+        self.stats = stats
+        self.cassette = cassette
         self._playwright = None
         self._browser = None
         self._context = None
@@ -162,19 +174,55 @@ class HeadlessBrowser:
         (how we know the React tree finished hydrating). Otherwise wait
         for `networkidle`, which is looser but ok for smaller pages.
         """
-        with self.page() as page:
-            page.goto(
-                url,
-                wait_until="domcontentloaded",
-                referer=referer,
-            )
-            if wait_for_selector:
-                page.wait_for_selector(wait_for_selector, timeout=wait_timeout_ms)
-            else:
-                try:
-                    page.wait_for_load_state("networkidle", timeout=wait_timeout_ms)
-                except Exception:  # noqa: BLE001
-                    # Some sites keep long-poll connections open forever.
-                    # Fall through — the content may already be rendered.
-                    log.debug("networkidle timeout for %s", url)
-            return page.content()
+        rec = RequestRecord(host=urlparse(url).netloc.lower(), attempts=1)
+        started = time.monotonic()
+        try:
+            if self.cassette is not None and self.cassette.replay:
+                # Never launches Chromium.
+                html = self.cassette.replay_html(url)
+                rec.status, rec.body_bytes = 200, len(html.encode("utf-8"))
+                return html
+            with self.page() as page:
+                resp = page.goto(
+                    url,
+                    wait_until="domcontentloaded",
+                    referer=referer,
+                )
+                if resp is not None:
+                    _measure_document(rec, resp)
+                if wait_for_selector:
+                    page.wait_for_selector(wait_for_selector, timeout=wait_timeout_ms)
+                else:
+                    try:
+                        page.wait_for_load_state("networkidle", timeout=wait_timeout_ms)
+                    except Exception:  # noqa: BLE001
+                        # Some sites keep long-poll connections open forever.
+                        # Fall through — the content may already be rendered.
+                        log.debug("networkidle timeout for %s", url)
+                html = page.content()
+                rec.body_bytes = len(html.encode("utf-8"))
+                if self.cassette is not None:
+                    self.cassette.record_html(url, html)
+                return html
+        finally:
+            # Navigation + hydration wait; the browser has no politeness
+            # or backoff sleeps of its own.
+            rec.network_sec = time.monotonic() - started
+            if self.stats is not None:
+                self.stats.record(current_source.get(), rec)
+
+
+def _measure_document(rec: RequestRecord, resp: object) -> None:
+    """Status, TTFB and transfer size of the main document response."""
+    rec.status = resp.status  # type: ignore[attr-defined]
+    try:
+        timing = resp.request.timing  # type: ignore[attr-defined]
+        if timing.get("responseStart", -1) >= 0:
+            rec.ttfb_sec = timing["responseStart"] / 1000.0
+        sizes = resp.request.sizes()  # type: ignore[attr-defined]
+        rec.wire_bytes = int(sizes.get("responseBodySize", 0)) + int(
+            sizes.get("responseHeadersSize", 0)
+        )
+    except Exception:  # noqa: BLE001
+        # Timing/sizes are best-effort diagnostics; never fail a fetch on them.
+        pass
@@ -0,0 +1,286 @@
+"""Record / replay of every HTTP response and rendered page in a run.
+
+    python -m pipeline run all --record cassettes/2024-06-01
+    python -m pipeline run all --replay cassettes/2024-06-01
+
+Recording runs the pipeline normally (live sites, live Supabase) and
+additionally writes each response the sources see to a cassette
+directory, plus a snapshot of the DB rows the sources read to decide
+what to crawl. Replaying serves those responses back with no network,
+no politeness sleeps and no Supabase: writes go to the SQLite backend
+(`<dir>/replay.sqlite`, recreated each replay) seeded from the
+snapshot, and the resulting tables are dumped to `<dir>/replay-db.json`
+so two code versions can be diffed.
+That makes the full parse → write path (`_parse_detail`,
+`_generic_table_to_json`, `upsert_ipos` batching, ...) repeatable and
+profilable on a laptop.
+
+Layout:
+
+    <dir>/index.json                  url → number of recorded responses
+    <dir>/http/<key>-<n>.json|.body   status, headers, final body
+    <dir>/browser/<key>-<n>.html      rendered HTML from HeadlessBrowser
+    <dir>/db-seed.json                tables as they were when recording began
+    <dir>/replay.sqlite               the replay's database
+    <dir>/replay-db.json              its tables after the replay
+
+HTTP is captured at the transport (the `requests` adapter, or the httpx
+transport for AsyncPoliteClient), so the clients' retry / status
+handling and redirects replay exactly as recorded. A URL
+fetched several times replays its responses in order, repeating the last
+one once they run out. Bodies are stored decoded, so Content-Encoding is
+dropped on replay.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import threading
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .config import Settings
+from .logger import get_logger
+
+log = get_logger("pipeline.cassette")
+
+# Headers that describe the wire encoding of the body we no longer have.
+_DROP_ON_REPLAY = ("content-encoding", "content-length", "transfer-encoding")
+
+# Tables (columns, paging key) the sources read to pick their work.
+_SEED_TABLES: dict[str, tuple[str, str]] = {
+    "ipos": ("*", "slug"),
+    "gmp_history": ("ipo_slug, source, scraped_at", "id"),
+    "subscription_history": ("ipo_slug, source, scraped_at", "id"),
+}
+
+# Tables written to replay-db.json (paging key).
+_DUMP_TABLES: dict[str, str] = {
+    "ipos": "slug",
+    "gmp_history": "id",
+    "subscription_history": "id",
+    "scraping_runs": "id",
+}
+
+
+class CassetteMiss(requests.ConnectionError):
+    """Replay asked for a URL that was never recorded."""
+
+
+class Cassette:
+    def __init__(self, root: Path, *, replay: bool):
+        self.root = root
+        self.replay = replay
+        self._lock = threading.Lock()
+        # Recorded response count per key, and the replay cursor.
+        self._counts: dict[str, int] = {}
+        self._cursor: dict[str, int] = {}
+        self._urls: dict[str, str] = {}
+        if replay:
+            index = json.loads((root / "index.json").read_text(encoding="utf-8"))
+            for key, entry in index.items():
+                self._counts[key] = int(entry["count"])
+                self._urls[key] = entry["url"]
+
+    # -------------------------------------------------------------- #
+    # keys / bookkeeping
+    # -------------------------------------------------------------- #
+
+    @staticmethod
+    def _key(kind: str, url: str) -> str:
+        return kind + "-" + hashlib.sha1(url.encode("utf-8")).hexdigest()[:20]
+
+    def _next_slot(self, kind: str, url: str) -> tuple[str, int]:
+        key = self._key(kind, url)
+        with self._lock:
+            if self.replay:
+                count = self._counts.get(key, 0)
+                if not count:
+                    return key, -1
+                n = min(self._cursor.get(key, 0), count - 1)
+                self._cursor[key] = n + 1
+                return key, n
+            n = self._counts.get(key, 0)
+            self._counts[key] = n + 1
+            self._urls[key] = url
+            return key, n
+
+    def save(self) -> None:
+        """Write the index. Only meaningful when recording."""
+        if self.replay:
+            return
+        with self._lock:
+            index = {
+                key: {"url": self._urls[key], "count": count}
+                for key, count in sorted(self._counts.items())
+            }
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / "index.json").write_text(
+            json.dumps(index, indent=1, sort_keys=True), encoding="utf-8"
+        )
+        log.info("cassette saved", extra={"records": len(index)})
+
+    # -------------------------------------------------------------- #
+    # HTTP (PoliteClient)
+    # -------------------------------------------------------------- #
+
+    def record_http(self, url: str, resp: requests.Response) -> None:
+        self.record_response(
+            url,
+            {
+                "url": resp.url or url,
+                "status": resp.status_code,
+                "reason": resp.reason,
+                "encoding": resp.encoding,
+                "headers": dict(resp.headers),
+            },
+            resp.content,
+        )
+
+    def replay_http(self, request: requests.PreparedRequest) -> requests.Response:
+        url = request.url or ""
+        recorded = self.recorded_response(url)
+        if recorded is None:
+            raise CassetteMiss(f"not in cassette: {url}", request=request)
+        meta, body = recorded
+        resp = requests.Response()
+        resp.status_code = meta["status"]
+        resp.reason = meta.get("reason") or ""
+        resp.headers = CaseInsensitiveDict(meta["headers"])
+        resp.encoding = meta.get("encoding")
+        resp.url = meta.get("url") or url
+        resp._content = body
+        resp._content_consumed = True
+        resp.request = request
+        resp.elapsed = timedelta(0)
+        return resp
+
+    def record_response(self, url: str, meta: dict[str, Any], body: bytes) -> None:
+        """Store one response: `meta` has url / status / reason /
+        encoding / headers, `body` is decoded. Shared by the requests
+        adapter above and AsyncPoliteClient's transport."""
+        key, n = self._next_slot("http", url)
+        base = self.root / "http" / f"{key}-{n}"
+        base.parent.mkdir(parents=True, exist_ok=True)
+        base.with_suffix(".json").write_text(json.dumps(meta), encoding="utf-8")
+        base.with_suffix(".body").write_bytes(body)
+
+    def recorded_response(self, url: str) -> Optional[tuple[dict[str, Any], bytes]]:
+        """The next recorded (meta, body) for `url`, None if there is
+        none. Wire-encoding headers are dropped from meta["headers"]."""
+        key, n = self._next_slot("http", url)
+        if n < 0:
+            return None
+        base = self.root / "http" / f"{key}-{n}"
+        meta = json.loads(base.with_suffix(".json").read_text(encoding="utf-8"))
+        meta["headers"] = {k: v for k, v in meta["headers"].items() if k.lower() not in _DROP_ON_REPLAY}
+        return meta, base.with_suffix(".body").read_bytes()
+
+    # -------------------------------------------------------------- #
+    # rendered HTML (HeadlessBrowser)
+    # -------------------------------------------------------------- #
+
+    def record_html(self, url: str, html: str) -> None:
+        key, n = self._next_slot("browser", url)
+        path = self.root / "browser" / f"{key}-{n}.html"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(html, encoding="utf-8")
+
+    def replay_html(self, url: str) -> str:
+        key, n = self._next_slot("browser", url)
+        if n < 0:
+            raise CassetteMiss(f"not in cassette: {url}")
+        return (self.root / "browser" / f"{key}-{n}.html").read_text(encoding="utf-8")
+
+    # -------------------------------------------------------------- #
+    # DB seed
+    # -------------------------------------------------------------- #
+
+    def record_seed(self, db: Any) -> None:
+        """Snapshot the tables sources read, from the live DB."""
+        seed: dict[str, list[dict[str, Any]]] = {}
+        for table, (columns, key) in _SEED_TABLES.items():
+            seed[table] = list(db.iter_rows(table, columns, key=key))
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / "db-seed.json").write_text(json.dumps(seed, default=str), encoding="utf-8")
+
+    def open_replay_db(self, settings: Settings) -> Any:
+        """A fresh SQLite database at <dir>/replay.sqlite, seeded with the
+        recorded snapshot."""
+        # Local import: sqlite_db → db → http_client imports this module.
+        from .sqlite_db import SqliteDatabase
+
+        path = self.root / "replay.sqlite"
+        for stale in (path, path.with_name(path.name + "-wal"), path.with_name(path.name + "-shm")):
+            stale.unlink(missing_ok=True)
+        db = SqliteDatabase(dataclasses.replace(settings, db_backend="sqlite", sqlite_path=str(path)))
+        seed_path = self.root / "db-seed.json"
+        if seed_path.exists():
+            seed = json.loads(seed_path.read_text(encoding="utf-8"))
+            for table, rows in seed.items():
+                if table != "ipos":
+                    # Seeds recorded before `source` was captured.
+                    rows = [r if r.get("source") else {**r, "source": "unknown"} for r in rows]
+                db.seed(table, rows)
+        return db
+
+    def dump_db(self, db: Any) -> None:
+        """Write the replay's tables to <dir>/replay-db.json."""
+        data = {table: list(db.iter_rows(table, key=key)) for table, key in _DUMP_TABLES.items()}
+        (self.root / "replay-db.json").write_text(
+            json.dumps(data, indent=1, sort_keys=True, default=str), encoding="utf-8"
+        )
+
+
+class CassetteAdapter(HTTPAdapter):
+    """Transport adapter that records real responses or serves recorded ones."""
+
+    def __init__(self, cassette: Cassette):
+        super().__init__()
+        self.cassette = cassette
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:  # type: ignore[override]
+        if self.cassette.replay:
+            return self.cassette.replay_http(request)
+        resp = super().send(request, **kwargs)
+        self.cassette.record_http(request.url or "", resp)
+        return resp
+
+
+def cassette_settings(settings: Settings, *, replay: bool) -> Settings:
+    """Settings for a recording or replaying run.
+
+    Both turn off conditional GETs and content fingerprints so every
+    source fetches and processes full bodies (a 304 has nothing to
+    replay). Replay additionally zeroes every sleep and leaves the
+    cross-run state in `state_dir` untouched.
+    """
+    settings = dataclasses.replace(settings, http_cache=False, content_hash=False)
+    if not replay:
+        return settings
+    return dataclasses.replace(
+        settings,
+        per_host_min_gap_sec=0.0,
+        per_host_jitter_sec=0.0,
+        inter_source_gap_sec=0.0,
+        backoff_base_sec=0.0,
+        backoff_cap_sec=0.0,
+        adaptive_rate=False,
+        persist_sessions=False,
+        write_spool=False,
+    )
+
+
+def open_cassette(record: Optional[str], replay: Optional[str]) -> Optional[Cassette]:
+    if replay:
+        return Cassette(Path(replay), replay=True)
+    if record:
+        return Cassette(Path(record), replay=False)
+    return None
@@ -3,12 +3,13 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from pathlib import Path
 
 from dotenv import load_dotenv
 
 _ENV_PATH = Path(__file__).resolve().parent.parent / ".env"
+_DEFAULT_STATE_DIR = Path(__file__).resolve().parent.parent / ".pipeline-state"
 load_dotenv(_ENV_PATH, override=False)
 
 
@@ -31,12 +32,114 @@ class Settings:
     backoff_cap_sec: float = 60.0
     request_timeout_sec: int = 25
     per_host_max_requests_per_run: int = 40  # hard ceiling per host per invocation
+    warm_up_ttl_sec: float = 1800.0          # repeat warm_up() on a host within this is a no-op
+
+    # Adaptive per-host gap (rate_control.py). `per_host_min_gap_sec` is
+    # the starting point; the gap then grows x`aimd_increase_factor` on
+    # 429/403/Retry-After/challenge pages and shrinks by
+    # `aimd_decrease_step_sec` per `aimd_success_window` clean responses,
+    # within the host's bounds (HOST_GAP_BOUNDS below, else floor/ceiling).
+    adaptive_rate: bool = True
+    aimd_floor_sec: float = 3.0
+    aimd_ceiling_sec: float = 90.0
+    aimd_increase_factor: float = 2.0
+    aimd_decrease_step_sec: float = 0.5
+    aimd_success_window: int = 8
 
     # Detail-scrape throttle: how many per-IPO detail pages we pull per run.
     detail_batch_size: int = 10
 
-    # Upload batch size for Supabase chunks.
+    # Crawl sources overlap fetch / parse / write (sources/_staged.py).
+    # Queue depth bounds how far fetching can run ahead of the DB.
+    stage_queue_size: int = 4
+    parse_workers: int = 1
+
+    # Upload batches for Supabase: at most `upload_chunk_size` rows and
+    # about `upload_chunk_bytes` of JSON per request, so a chunk of
+    # detail rows (financials, FAQs, documents) isn't forty times the
+    # size of a chunk of GMP history rows. Independent chunks go out
+    # `upload_workers` at a time.
     upload_chunk_size: int = 40
+    upload_chunk_bytes: int = 256 * 1024
+    upload_workers: int = 4
+    # Rows per keyset page for Database.iter_rows (full-table reads).
+    read_page_size: int = 1000
+    # Load slug / status / date columns of ipos once per run and answer
+    # fetch_known_slugs & co. from memory, merged with this run's writes.
+    ipos_snapshot: bool = True
+    # Buffer ipos upserts/updates for the whole run, merged per slug, and
+    # send them in one flush at the end (Database.flush). A flush also
+    # happens before any DB read of ipos, and whenever this many slugs
+    # are pending (0 = no size limit).
+    write_behind: bool = True
+    write_behind_max_rows: int = 1000
+    # Journal writes that still fail after retries to
+    # <state_dir>/spool.jsonl instead of losing them (history batches
+    # right away, buffered ipos rows if the end-of-run flush fails), and
+    # replay the journal at the start of the next run or with
+    # `python -m pipeline flush`.
+    write_spool: bool = True
+    # Compare ipos writes with the current DB values and send only the
+    # rows / columns that differ. Rows where only last_scraped_at moved
+    # are "touches": "batch" bumps them with one UPDATE per chunk,
+    # "skip" leaves the old timestamp.
+    diff_writes: bool = True
+    touch_writes: str = "batch"
+    # Live GMP / subscription snapshots (investorgain_gmp, ipowatch_gmp,
+    # chittorgarh_subscription) are appended only when a value differs
+    # from the last stored row for that (ipo_slug, source), or when that
+    # row is older than the heartbeat, so a flat series still gets a
+    # row every few hours. Uses sql/0007 to fetch the last rows.
+    history_change_only: bool = True
+    history_heartbeat_sec: float = 6 * 3600
+    # history_maintenance (sql/0009, sql/0010): keep monthly history
+    # partitions created this many months ahead, and delete live
+    # intraday rows older than this many whole months once their day is
+    # in gmp_daily / subscription_daily (0 = keep forever).
+    partition_months_ahead: int = 3
+    history_prune_months: int = 0
+
+    # Where writes go. "supabase" is PostgREST over HTTP with SUPABASE_URL /
+    # SUPABASE_KEY. "postgres" talks to the database directly (pg_db.py)
+    # using DATABASE_URL — e.g. Supabase's pooler connection string.
+    # "sqlite" writes to a local file (sqlite_db.py), no credentials;
+    # `sqlite_path` defaults to <state_dir>/pipeline.sqlite.
+    db_backend: str = "supabase"
+    database_url: str = ""
+    sqlite_path: str = ""
+    pg_pool_size: int = 4
+    # Rows per statement on the postgres backend (upload_chunk_size is
+    # sized for PostgREST request bodies).
+    pg_chunk_size: int = 1000
+
+    # Source scheduling. "sequential" runs sources one after another
+    # with `inter_source_gap_sec` between them. "concurrent" runs
+    # sources that touch disjoint hosts side by side (per-host pacing
+    # still applies) and is what the scheduled workflow uses.
+    scheduler: str = "sequential"
+    max_parallel_sources: int = 4
+
+    # Where state that should outlive one run is kept (HTTP validator
+    # cache, ...). The workflow restores/saves it with actions/cache.
+    state_dir: str = str(_DEFAULT_STATE_DIR)
+    # Send If-None-Match / If-Modified-Since for sources that opt in, and
+    # let them skip parse + write on a 304. Once a URL's last full fetch
+    # is older than the max age, the next request is unconditional
+    # (0 = never expire). Longer than content_hash_max_age_sec so the
+    # 6-hourly "cold" run still gets its 304s.
+    http_cache: bool = True
+    http_cache_max_age_sec: float = 24 * 3600
+    # Hash what each source reads (JSON list / relevant tables) and skip
+    # parse + write when it matches the last successful run. Digests
+    # older than the max age are ignored so everything still gets a
+    # full refresh a few times a day.
+    content_hash: bool = True
+    content_hash_max_age_sec: float = 6 * 3600
+    # Carry cookies, User-Agent and last-request times per host over to
+    # the next run (session_store.py). Saved sessions older than the TTL
+    # are discarded and the host is warmed up from scratch.
+    persist_sessions: bool = True
+    session_ttl_sec: float = 12 * 3600
 
     # A polite contact string surfaced in User-Agent when operators want to reach us.
     operator_contact: str = field(
@@ -44,14 +147,49 @@ class Settings:
     )
 
     @staticmethod
-    def load() -> "Settings":
+    def load(require_supabase: bool = True) -> "Settings":
         url = os.getenv("SUPABASE_URL", "").strip()
         key = os.getenv("SUPABASE_KEY", "").strip()
+        overrides = _env_overrides()
+        if not require_supabase:
+            # Offline runs (cassette replay) never talk to Supabase.
+            return Settings(supabase_url=url, supabase_key=key, **overrides)
+        if overrides.get("db_backend") == "sqlite":
+            return Settings(supabase_url=url, supabase_key=key, **overrides)
+        if overrides.get("db_backend") == "postgres":
+            # Direct connection: the REST credentials aren't used.
+            if not overrides.get("database_url"):
+                raise ConfigError("DATABASE_URL is not set (DB_BACKEND=postgres).")
+            return Settings(supabase_url=url, supabase_key=key, **overrides)
         if not url or url.startswith("https://your-project-id"):
             raise ConfigError("SUPABASE_URL is not set. Populate backend/.env.")
         if not key or "your-service-role-key-here" in key:
             raise ConfigError("SUPABASE_KEY is not set. Populate backend/.env.")
-        return Settings(supabase_url=url, supabase_key=key)
+        return Settings(supabase_url=url, supabase_key=key, **overrides)
+
+
+def _env_overrides() -> dict[str, object]:
+    """Read tuning overrides from env vars named after the Settings
+    fields in UPPER_SNAKE case (e.g. PER_HOST_MIN_GAP_SEC=10)."""
+    out: dict[str, object] = {}
+    for f in fields(Settings):
+        if f.name in ("supabase_url", "supabase_key", "operator_contact"):
+            continue
+        raw = os.getenv(f.name.upper(), "").strip()
+        if not raw:
+            continue
+        try:
+            if f.type == "bool":
+                out[f.name] = raw.lower() in ("1", "true", "yes", "on")
+            elif f.type == "int":
+                out[f.name] = int(raw)
+            elif f.type == "float":
+                out[f.name] = float(raw)
+            else:
+                out[f.name] = raw
+        except ValueError as exc:
+            raise ConfigError(f"{f.name.upper()}={raw!r} is not a valid {f.type}") from exc
+    return out
 
 
 # Browser user-agents we rotate between sessions. We keep a short list of
@@ -66,5 +204,16 @@ USER_AGENTS: tuple[str, ...] = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:126.0) Gecko/20100101 Firefox/126.0",
 )
 
+# Per-host (floor, ceiling) for the adaptive request gap, in seconds.
+# Cloudflare-fronted and exchange hosts never go below the old fixed
+# 6 s; the niftytrader JSON API is allowed to run faster.
+HOST_GAP_BOUNDS: dict[str, tuple[float, float]] = {
+    "www.chittorgarh.com": (6.0, 120.0),
+    "www.nseindia.com": (6.0, 120.0),
+    "www.bseindia.com": (6.0, 120.0),
+    "api.bseindia.com": (6.0, 120.0),
+    "webapi.niftytrader.in": (2.0, 60.0),
+}
+
 # HTTP status codes that should trigger polite retry with backoff.
 RETRYABLE_STATUS: frozenset[int] = frozenset({408, 425, 429, 500, 502, 503, 504})
@@ -2,17 +2,36 @@
 
 from __future__ import annotations
 
+import atexit
+import contextvars
+import itertools
+import json
+import re
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Any, Iterable, Optional
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional, TypeVar
 
+import httpx
+from postgrest.exceptions import APIError
 from supabase import Client, create_client
 
+try:  # optional, several times faster than the stdlib encoder
+    import orjson
+except ImportError:
+    orjson = None
+
 from .config import Settings
+from .http_client import current_source
 from .logger import get_logger
+from .spool import WriteSpool
 
 log = get_logger("pipeline.db")
 
+T = TypeVar("T")
+
 
 # Postgres JSONB and text columns reject \u0000 (NUL) — SQLSTATE 22P05
 # "unsupported Unicode escape sequence". Scraped HTML occasionally
@@ -37,11 +56,210 @@ def _sanitize(value: Any) -> Any:
     return value
 
 
+def _clean(row: dict[str, Any], drop: str = "") -> dict[str, Any]:
+    """`row` without None values (and without the `drop` key), NULs
+    stripped: the usual None filter and `_sanitize` in one pass."""
+    return {k: _sanitize(v) for k, v in row.items() if v is not None and k != drop}
+
+
+def _drop_none(row: dict[str, Any], drop: str = "") -> dict[str, Any]:
+    """`_clean` without the NUL stripping, for rows that leave through
+    `encode_row` (which strips them from the encoded bytes)."""
+    return {k: v for k, v in row.items() if v is not None and k != drop}
+
+
+# A JSON escape that encodes NUL (\u0000) or the literal text "\u0000"
+# (\\u0000), or an escaped backslash — matched left to right so that
+# "\\" followed by "u0000" is never misread as a NUL escape.
+_NUL_ESCAPE = re.compile(rb"\\\\u0000|\\u0000|\\\\")
+
+
+def _drop_nul_escape(m: "re.Match[bytes]") -> bytes:
+    return b"" if m.group().endswith(b"u0000") else m.group()
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):  # date / datetime
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_row(row: dict[str, Any], *, drop_none: bool = True) -> bytes:
+    """`row` as compact UTF-8 JSON, ready to be a request body: top-level
+    None values dropped (unless `drop_none=False`), NULs removed as in
+    `_sanitize`. One serialiser pass — orjson when installed — with the
+    NULs taken out of the encoded bytes rather than by walking the row."""
+    if drop_none:
+        row = {k: v for k, v in row.items() if v is not None}
+    if orjson is not None:
+        body = orjson.dumps(row, default=_json_default)
+    else:
+        body = json.dumps(
+            row, ensure_ascii=False, separators=(",", ":"), default=_json_default
+        ).encode("utf-8")
+    if b"u0000" in body:
+        body = _NUL_ESCAPE.sub(_drop_nul_escape, body)
+    return body
+
+
+# Columns of `ipos` kept in the run-scoped snapshot: enough to answer
+# fetch_known_slugs / fetch_active_slugs / fetch_ipos_for_calendar.
+_SNAPSHOT_DATE_COLUMNS = (
+    "drhp_filed_date",
+    "rhp_filed_date",
+    "sebi_approval_date",
+    "open_date",
+    "close_date",
+    "allotment_date",
+    "refund_date",
+    "demat_credit_date",
+    "listing_date",
+)
+_SNAPSHOT_COLUMNS = ("slug", "status") + _SNAPSHOT_DATE_COLUMNS
+
+# History columns that say which row / whose / when rather than what
+# was observed; ignored when comparing with the last observation.
+_HISTORY_META_COLUMNS = frozenset({"id", "ipo_slug", "source", "scraped_at", "observation_date"})
+
+# ON CONFLICT targets for day-wise history rows, in the order tried: the
+# unique index from sql/0006, then its partitioned form from sql/0009
+# (a unique index there has to include the partition key, scraped_at).
+_OBSERVATION_KEYS = (
+    ("ipo_slug", "source", "observation_date"),
+    ("ipo_slug", "source", "observation_date", "scraped_at"),
+)
+
+
 class Database:
-    def __init__(self, settings: Settings):
+    # Slugs per `slug IN (...)` filter; keeps the PostgREST URL short.
+    _in_list_size = 100
+
+    def __init__(self, settings: Settings, client: Optional[Any] = None):
+        """`client` replaces the Supabase client (e.g. a stub in a test)."""
         self.settings = settings
-        self.client: Client = create_client(settings.supabase_url, settings.supabase_key)
+        self.client: Client = client or self._connect()
         self.run_id: uuid.UUID = uuid.uuid4()
+        # Flipped off for the rest of the run the first time the
+        # bulk_update_ipos function turns out not to exist (0004 not applied).
+        self._bulk_update_rpc = True
+        self._missing_history_rpc = True
+        self._observation_keys = _OBSERVATION_KEYS
+        self._latest_history_rpc = True
+        # Run-scoped snapshot of ipos (slug → _SNAPSHOT_COLUMNS), loaded
+        # on first read and kept current by this run's own writes.
+        self._snapshot: Optional[dict[str, dict[str, Any]]] = None
+        self._snapshot_lock = threading.Lock()
+        # Held (alone) for the network read that loads the snapshot.
+        # While it runs, this run's writes are queued in the backlog and
+        # folded into the rows before they're installed.
+        self._snapshot_load_lock = threading.Lock()
+        self._snapshot_backlog: Optional[list[tuple[list[dict[str, Any]], bool]]] = None
+        # Write-behind buffer (Settings.write_behind): ipos changes merged
+        # per slug until flush(). Upserts and pure updates are kept apart
+        # so partial payloads never hit the INSERT side of an upsert.
+        self._pending_upserts: dict[str, dict[str, Any]] = {}
+        self._pending_updates: dict[str, dict[str, Any]] = {}
+        self._pending_sources: dict[str, set[str]] = {}
+        self._pending_lock = threading.Lock()
+        # Held across a flush's network writes (which run without
+        # _pending_lock), so flushes go out one at a time and a flush
+        # that returns has sent everything buffered before it started.
+        self._flush_lock = threading.Lock()
+        # Settings.diff_writes: current values of the ipos columns this run
+        # writes, per slug, plus slugs known not to exist. Filled on demand
+        # and updated only after a write succeeds.
+        self._ipos_values: dict[str, dict[str, Any]] = {}
+        self._ipos_absent: set[str] = set()
+        self._values_lock = threading.Lock()
+        # Settings.write_spool: writes that still fail after _execute's
+        # retries are journalled locally and replayed by the next run.
+        self.spool: Optional[WriteSpool] = (
+            WriteSpool(Path(settings.state_dir) / "spool.jsonl") if settings.write_spool else None
+        )
+        # Settings.history_change_only: last stored observation per
+        # (table, ipo_slug, source), None if there is none, for the slugs
+        # in `_history_slugs` — loaded once per slug, then kept current
+        # by this run's appends.
+        self._history_last: dict[tuple[str, str, Any], Optional[dict[str, Any]]] = {}
+        self._history_slugs: set[tuple[str, str]] = set()
+        self._history_lock = threading.Lock()
+        # Set when the first write gets spooled. The DB is taken to be
+        # down for the rest of the run: later writes skip the retries.
+        self._outage = False
+        # scraping_runs rows start_run couldn't write during an outage,
+        # by placeholder id; finish_run spools them complete.
+        self._unlogged_runs: dict[int, dict[str, Any]] = {}
+        self._unlogged_ids = itertools.count(1)
+        self._closed = False
+        if settings.write_behind:
+            atexit.register(self._flush_at_exit)
+
+    def _connect(self) -> Any:
+        url, key = self.settings.supabase_url, self.settings.supabase_key
+        # Writes post their pre-encoded bodies straight to the REST API
+        # (see _rest_write); supabase-py handles everything else.
+        self._rest = httpx.Client(
+            base_url=url.rstrip("/") + "/rest/v1",
+            headers={"apikey": key, "Authorization": f"Bearer {key}"},
+            timeout=_REST_TIMEOUT_SEC,
+        )
+        return create_client(url, key)
+
+    @property
+    def _write_chunk_size(self) -> int:
+        return self.settings.upload_chunk_size
+
+    # Chunks carry their rows pre-encoded as the request body
+    # (encode_row), so each row is serialised once — when sizing.
+    _json_bodies = True
+    # The PostgREST session those bodies are posted on; None with an
+    # injected client (a stub in a test), whose queries get the rows.
+    _rest: Optional[httpx.Client] = None
+
+    @property
+    def _write_chunk_bytes(self) -> int:
+        return self.settings.upload_chunk_bytes
+
+    @property
+    def _upload_workers(self) -> int:
+        return self.settings.upload_workers
+
+    def close(self) -> None:
+        """Release connections: the write session's pool. Anything still
+        in the write-behind buffer is dropped — flush first."""
+        self._closed = True
+        atexit.unregister(self._flush_at_exit)
+        if self._rest is not None:
+            self._rest.close()
+
+    def _transient(self, exc: Exception) -> bool:
+        """True if `exc` means the database or the network is down, so
+        the write is worth spooling and sending again later. Anything
+        else (bad rows, missing schema) would fail the same way on
+        replay. Subclasses add their driver's connection errors."""
+        return _transient_error(exc)
+
+    def _rest_write(
+        self,
+        build: Callable[[], Any],
+        path: str,
+        body: Optional[bytes],
+        *,
+        params: Optional[dict[str, str]] = None,
+        prefer: str = "return=minimal",
+    ) -> Any:
+        """A query for `_execute` that POSTs the pre-encoded `body` to
+        `path` on the REST API, or `build()` — the same request as a
+        supabase-py query, sending the rows — without a write session."""
+        if self._rest is None or body is None:
+            return build()
+        return _RestWrite(self._rest, path, body, params or {}, prefer)
+
+    def _clean(self, row: dict[str, Any], drop: str = "") -> dict[str, Any]:
+        """`row` without None values (and the `drop` key), as it goes
+        into the write path. NULs are left to `encode_row` when that's
+        what the row will be sent as."""
+        return _drop_none(row, drop) if self._rest is not None else _clean(row, drop)
 
     def _execute(self, query: Any) -> Any:
         import time
@@ -49,34 +267,192 @@ class Database:
             try:
                 return query.execute()
             except Exception as e:
-                if attempt == 3:
+                # A missing function / column won't appear on retry.
+                if attempt == 3 or _schema_missing(e):
                     raise
                 msg = str(e).replace("\n", " ")
                 log.warning("Database query failed, retrying (%s/3): %s", attempt + 1, msg[:200])
                 time.sleep(2 ** attempt)
 
+    def _write_chunks(self, rows: list[dict[str, Any]], *, drop_none: bool = True) -> list["_Chunk"]:
+        """Split `rows` for upload: at most `_write_chunk_size` rows and
+        about `_write_chunk_bytes` of JSON (0 = no byte limit), each
+        chunk with its `body` already encoded."""
+        if not self._json_bodies:
+            return [_Chunk(chunk) for chunk in _chunks(rows, self._write_chunk_size)]
+        return list(
+            _sized_chunks(rows, self._write_chunk_size, self._write_chunk_bytes, drop_none=drop_none)
+        )
+
+    def _parallel(self, fn: Callable[[Any], T], chunks: list[Any]) -> list[T]:
+        """`fn(chunk)` for every chunk, `upload_workers` at a time;
+        results in chunk order. Each call retries on its own through
+        `_execute`. If one fails the others still run to completion (so
+        their bookkeeping is done) and the first error is raised."""
+        workers = min(max(1, self._upload_workers), len(chunks))
+        if workers <= 1:
+            return [fn(chunk) for chunk in chunks]
+        # Worker threads see the caller's current_source.
+        ctx = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload") as pool:
+            futures = [pool.submit(ctx.copy().run, fn, chunk) for chunk in chunks]
+        for future in futures:
+            if future.exception() is not None:
+                raise future.exception()  # type: ignore[misc]
+        return [future.result() for future in futures]
+
+    def iter_rows(
+        self,
+        table: str,
+        columns: str = "*",
+        *,
+        key: str = "id",
+        where: Optional[Callable[[Any], Any]] = None,
+        page_size: Optional[int] = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Stream every matching row of `table`, one keyset page at a time.
+
+        A bare `.select()` is silently cut off at PostgREST's max-rows
+        (1000 on Supabase). This walks `key` (a unique column — `id`, or
+        `slug` on ipos) with `key > last ORDER BY key LIMIT page_size`,
+        so memory stays bounded and nothing is dropped. `where` adds
+        filters to each page's query, e.g. `lambda q: q.in_("status", [...])`.
+
+        Stops on an empty page rather than a short one: if `page_size`
+        exceeds the server's max-rows a short page doesn't mean the end.
+        """
+        size = page_size or self.settings.read_page_size
+        cols = [c.strip() for c in columns.split(",")]
+        if "*" not in cols and key not in cols:
+            columns = f"{columns}, {key}"
+        last: Any = None
+        while True:
+            query = self.client.table(table).select(columns)
+            if where is not None:
+                query = where(query)
+            if last is not None:
+                query = query.gt(key, last)
+            resp = self._execute(query.order(key).limit(size))
+            page = resp.data or []
+            if not page:
+                return
+            yield from page
+            last = page[-1].get(key)
+            if last is None:
+                raise ValueError(f"iter_rows: {table}.{key} is not a usable keyset column")
+
+    # -------------------------------------------------------------- #
+    # run-scoped ipos snapshot
+    # -------------------------------------------------------------- #
+
+    def _ipos_snapshot(self) -> list[dict[str, Any]]:
+        """Copies of the snapshot rows, loading it on first use.
+
+        Several sources per run want "which slugs exist / are active /
+        what are their dates". Rather than a full scan of ipos each, the
+        first caller loads one snapshot and everyone after — including
+        calendar_events at the end of the run — reads it from memory.
+        Rows written (or buffered) by this run are merged in; changes
+        made by other processes mid-run are not seen (same as before,
+        where a source's read was only as fresh as its start).
+        """
+        with self._snapshot_lock:
+            if self._snapshot is not None:
+                return [dict(r) for r in self._snapshot.values()]
+        # The read runs without _pending_lock, so sources buffering or
+        # flushing writes meanwhile aren't held up behind it.
+        with self._snapshot_load_lock:
+            with self._snapshot_lock:
+                if self._snapshot is not None:
+                    return [dict(r) for r in self._snapshot.values()]
+                self._snapshot_backlog = []
+            try:
+                rows = {
+                    r["slug"]: r
+                    for r in self.iter_rows("ipos", ", ".join(_SNAPSHOT_COLUMNS), key="slug")
+                    if r.get("slug")
+                }
+            except BaseException:
+                with self._snapshot_lock:
+                    self._snapshot_backlog = None
+                raise
+            # Lock order everywhere: _pending_lock, then _snapshot_lock.
+            with self._pending_lock, self._snapshot_lock:
+                # Writes that went through during the read may or may not
+                # be in it; writes still in the write-behind buffer aren't.
+                for backlog_rows, insert in self._snapshot_backlog or ():
+                    _fold(rows, backlog_rows, insert=insert)
+                self._snapshot_backlog = None
+                for bucket, insert in ((self._pending_upserts, True), (self._pending_updates, False)):
+                    _fold(rows, ({**changes, "slug": slug} for slug, changes in bucket.items()), insert=insert)
+                if not self.settings.ipos_snapshot:
+                    # Disabled: read through every time.
+                    return list(rows.values())
+                if self._snapshot is None:
+                    self._snapshot = rows
+                return [dict(r) for r in self._snapshot.values()]
+
+    def _remember(self, rows: Iterable[dict[str, Any]], *, insert: bool) -> None:
+        """Fold rows this run wrote into the snapshot (if it is loaded).
+        `insert=False` (plain UPDATE) never adds slugs that aren't there."""
+        with self._snapshot_lock:
+            if self._snapshot is not None:
+                _fold(self._snapshot, rows, insert=insert)
+            elif self._snapshot_backlog is not None:
+                self._snapshot_backlog.append((list(rows), insert))
+            # else: whoever loads it later reads our writes from the DB
+
     # -------------------------------------------------------------- #
     # ipos table
     # -------------------------------------------------------------- #
 
     def upsert_ipos(self, rows: list[dict[str, Any]]) -> int:
-        """Upsert IPO rows by slug. Returns number of rows sent."""
+        """Upsert IPO rows by slug. Returns the number of rows written or
+        found already current (with write-behind: accepted into the buffer)."""
         if not rows:
             return 0
         # Strip None values — otherwise we'd overwrite good columns with NULL
         # whenever one source doesn't provide a given field.
-        cleaned = [
-            _sanitize({k: v for k, v in row.items() if v is not None})
-            for row in rows
-            if row.get("slug")
-        ]
-        sent = 0
-        for chunk in _chunks(cleaned, self.settings.upload_chunk_size):
-            self._execute(self.client.table("ipos").upsert(chunk, on_conflict="slug"))
-            sent += len(chunk)
-        log.info("upserted ipos", extra={"records": sent})
+        cleaned = [self._clean(row) for row in rows if row.get("slug")]
+        merged: dict[str, dict[str, Any]] = {}
+        for row in cleaned:
+            merged.setdefault(row["slug"], {}).update(row)
+        if self.settings.write_behind:
+            self._defer(merged, insert=True)
+            return len(cleaned)
+        return self._write_or_defer(merged, {})
+
+    def _send_upserts(self, rows: list[dict[str, Any]]) -> int:
+        """Upsert full rows, grouped by column set and chunked by
+        `upload_chunk_size` / `upload_chunk_bytes`, chunks in parallel.
+        Grouping matters: PostgREST bulk upserts take the union of the
+        chunk's keys as the column list, and a row missing one of them
+        would have it written as NULL."""
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        def send(chunk: list[dict[str, Any]]) -> int:
+            self._upsert_chunk(chunk)
+            self._remember(chunk, insert=True)
+            self._note_written({row["slug"]: row for row in chunk}, insert=True)
+            return len(chunk)
+
+        chunks = [chunk for group in groups.values() for chunk in self._write_chunks(group)]
+        sent = sum(self._parallel(send, chunks))
+        if sent:
+            log.info("upserted ipos", extra={"records": sent})
         return sent
 
+    def _upsert_chunk(self, chunk: list[dict[str, Any]]) -> None:
+        self._execute(self._rest_write(
+            lambda: self.client.table("ipos").upsert(chunk, on_conflict="slug"),
+            "ipos",
+            getattr(chunk, "body", None),
+            params={"on_conflict": "slug", "columns": _columns(chunk)},
+            prefer="return=minimal,resolution=merge-duplicates",
+        ))
+
     def update_ipo_by_slug(self, slug: str, changes: dict[str, Any]) -> int:
         """Update an existing IPO row by slug — never creates new rows.
         Use this when a source only has a partial view and must not
@@ -86,40 +462,336 @@ class Database:
         doesn't match and then trips NOT NULL on ipo_name)."""
         if not slug or not changes:
             return 0
-        cleaned = _sanitize({k: v for k, v in changes.items() if v is not None})
+        cleaned = self._clean(changes)
         if not cleaned:
             return 0
+        if self.settings.write_behind:
+            self._defer({slug: cleaned}, insert=False)
+            return self._count_known([slug])
+        return self._write_or_defer({}, {slug: cleaned})
+
+    def _update_one(self, slug: str, cleaned: dict[str, Any]) -> int:
         query = self.client.table("ipos").update(cleaned).eq("slug", slug)
         resp = self._execute(query)
+        self._remember([{**cleaned, "slug": slug}], insert=False)
+        self._note_written({slug: cleaned}, insert=False)
         return len(resp.data or [])
 
     def bulk_update_ipos(self, rows: list[dict[str, Any]]) -> int:
-        """Pure UPDATE per row by slug. Use this from enrichment sources
-        (investorgain_gmp, chittorgarh_subscription) that have filtered
-        input to known slugs but can't satisfy all NOT NULL columns on
-        the INSERT side of an upsert — PostgreSQL checks NOT NULL
-        *before* ON CONFLICT DO UPDATE resolves, so upsert with a
+        """Pure UPDATE by slug for many rows. Use this from enrichment
+        sources (investorgain_gmp, chittorgarh_subscription, ...) that
+        have filtered input to known slugs but can't satisfy all NOT NULL
+        columns on the INSERT side of an upsert — PostgreSQL checks NOT
+        NULL *before* ON CONFLICT DO UPDATE resolves, so upsert with a
         partial payload blows up even when the row already exists.
 
-        One PostgREST round-trip per row. Callers should have already
-        pre-filtered with fetch_known_slugs(); rows for unknown slugs
-        here simply update zero rows (no error).
+        One `bulk_update_ipos` RPC (sql/0004) per upload chunk, chunks
+        in parallel; each row only touches its own non-None columns. Falls back to one PostgREST round-trip per row if the
+        function isn't installed. Rows for unknown slugs update nothing
+        (no error). Returns the number of rows updated.
         """
-        sent = 0
+        updates: dict[str, dict[str, Any]] = {}
         for row in rows:
             slug = row.get("slug")
             if not slug:
                 continue
-            changes = {k: v for k, v in row.items() if k != "slug"}
-            sent += self.update_ipo_by_slug(slug, changes)
+            changes = self._clean(row, drop="slug")
+            if changes:
+                # Same slug twice in one batch: later values win, as they
+                # would have with sequential updates.
+                updates.setdefault(slug, {}).update(changes)
+        if not updates:
+            return 0
+        if self.settings.write_behind:
+            self._defer(updates, insert=False)
+            return self._count_known(updates)
+        return self._write_or_defer({}, updates)
+
+    def _write_or_defer(self, upserts: dict[str, dict[str, Any]], updates: dict[str, dict[str, Any]]) -> int:
+        """`_write_ipos` for write-behind off. With a spool, a write that
+        fails goes to the write-behind buffer instead: the end-of-run
+        flush tries it again and spools it if that fails too."""
+        if self.spool is None or not self._outage:
+            try:
+                return self._write_ipos(upserts, updates)
+            except Exception as exc:  # noqa: BLE001
+                if self.spool is None or not self._transient(exc):
+                    raise
+                self._note_outage(exc)
+        if upserts:
+            self._defer(upserts, insert=True)
+        if updates:
+            self._defer(updates, insert=False)
+        return len(upserts) + len(updates)
+
+    def _send_updates(self, updates: dict[str, dict[str, Any]]) -> int:
+        if not updates:
+            return 0
+        sent = 0
+        pending = [{"slug": slug, "changes": changes} for slug, changes in updates.items()]
+        if self._bulk_update_rpc:
+
+            def send(chunk: _Chunk) -> Optional[int]:
+                query = self._rest_write(
+                    lambda: self.client.rpc("bulk_update_ipos", {"updates": chunk}),
+                    "rpc/bulk_update_ipos",
+                    None if chunk.body is None else b'{"updates":' + chunk.body + b"}",
+                    prefer="",
+                )
+                try:
+                    resp = self._execute(query)
+                except Exception as exc:  # noqa: BLE001
+                    if not _schema_missing(exc):
+                        raise
+                    return None  # sent row by row below
+                self._remember(({**u["changes"], "slug": u["slug"]} for u in chunk), insert=False)
+                self._note_written({u["slug"]: u["changes"] for u in chunk}, insert=False)
+                return int(resp.data or 0)
+
+            chunks = self._write_chunks(pending)
+            results = self._parallel(send, chunks)
+            sent += sum(n for n in results if n is not None)
+            pending = [u for chunk, n in zip(chunks, results) if n is None for u in chunk]
+            if pending:
+                log.warning(
+                    "bulk_update_ipos function missing, updating row by row "
+                    "(apply sql/0004_bulk_update_ipos.sql)"
+                )
+                self._bulk_update_rpc = False
+        if pending:
+            sent += sum(self._parallel(lambda u: self._update_one(u["slug"], u["changes"]), pending))
         if sent:
             log.info("bulk-updated ipos", extra={"records": sent})
         return sent
 
+    # -------------------------------------------------------------- #
+    # diff against current values
+    # -------------------------------------------------------------- #
+
+    def _write_ipos(self, upserts: dict[str, dict[str, Any]], updates: dict[str, dict[str, Any]]) -> int:
+        """Write full rows (`upserts`, may insert) and partial ones
+        (`updates`, existing rows only), both slug → columns.
+
+        With `diff_writes`, each row is compared with the current values
+        of the columns it carries and only what differs is sent: new
+        slugs are upserted whole, changed rows go through
+        `bulk_update_ipos` with just their changed columns, rows where
+        only `last_scraped_at` moved get one shared-timestamp UPDATE per
+        chunk (or nothing, `touch_writes="skip"`), and identical rows
+        are dropped. Returns rows written or found already current.
+        """
+        if not self.settings.diff_writes:
+            return self._send_upserts(list(upserts.values())) + self._send_updates(updates)
+        current = self._current_values({**updates, **upserts})
+        inserts: list[dict[str, Any]] = []
+        changes: dict[str, dict[str, Any]] = {}
+        touches: dict[str, Any] = {}
+        unchanged = 0
+        for bucket, insert in ((upserts, True), (updates, False)):
+            for slug, row in bucket.items():
+                old = current.get(slug)
+                if old is None:
+                    # Unknown slug: upserts insert it, updates had nothing to hit.
+                    if insert:
+                        inserts.append(row)
+                    continue
+                diff = {k: v for k, v in row.items() if k != "slug" and not _same(v, old.get(k))}
+                if diff.keys() - {_TOUCH_COLUMN}:
+                    changes[slug] = diff
+                elif diff:
+                    touches[slug] = diff[_TOUCH_COLUMN]
+                else:
+                    unchanged += 1
+        if touches or unchanged:
+            log.info(
+                "ipos diff: %d new, %d changed, %d touch-only, %d unchanged",
+                len(inserts), len(changes), len(touches), unchanged,
+            )
+        return (
+            self._send_upserts(inserts)
+            + self._send_updates(changes)
+            + self._send_touches(touches)
+            + unchanged
+        )
+
+    def _send_touches(self, touches: dict[str, Any]) -> int:
+        """Bump last_scraped_at on rows that otherwise didn't change: one
+        PATCH per chunk, all set to the batch's latest timestamp."""
+        if not touches or self.settings.touch_writes == "skip":
+            return len(touches)
+        stamp = max(str(v) for v in touches.values())
+
+        def send(chunk: list[str]) -> int:
+            n = self._touch_chunk(chunk, stamp)
+            self._note_written({slug: {_TOUCH_COLUMN: stamp} for slug in chunk}, insert=False)
+            return n
+
+        return sum(self._parallel(send, list(_chunks(sorted(touches), self._in_list_size))))
+
+    def _touch_chunk(self, slugs: list[str], stamp: str) -> int:
+        query = self.client.table("ipos").update({_TOUCH_COLUMN: stamp}).in_("slug", slugs)
+        return len(self._execute(query).data or [])
+
+    def _current_values(self, rows: dict[str, dict[str, Any]]) -> dict[str, Optional[dict[str, Any]]]:
+        """Current values of the columns in `rows`, per slug (None if the
+        slug isn't in ipos). Served from the run-scoped cache; whatever
+        it lacks is read with one `slug IN (...)` select per chunk."""
+        with self._values_lock:
+            missing = [
+                slug for slug, row in rows.items()
+                if slug not in self._ipos_absent
+                and not row.keys() <= self._ipos_values.get(slug, {}).keys()
+            ]
+        if missing:
+            columns = sorted({k for slug in missing for k in rows[slug]} | {"slug"})
+            found: dict[str, dict[str, Any]] = {}
+            for chunk in _chunks(missing, self._in_list_size):
+                for r in self._select_ipos(columns, chunk):
+                    found[r["slug"]] = r
+            with self._values_lock:
+                for slug in missing:
+                    if slug in found:
+                        self._ipos_values.setdefault(slug, {}).update(found[slug])
+                    else:
+                        self._ipos_absent.add(slug)
+        with self._values_lock:
+            return {
+                slug: None if slug in self._ipos_absent else dict(self._ipos_values.get(slug, {}))
+                for slug in rows
+            }
+
+    def _select_ipos(self, columns: list[str], slugs: list[str]) -> list[dict[str, Any]]:
+        query = self.client.table("ipos").select(", ".join(columns)).in_("slug", slugs)
+        return self._execute(query).data or []
+
+    def _note_written(self, rows: dict[str, dict[str, Any]], *, insert: bool) -> None:
+        """Record values that reached the DB in the diff cache."""
+        with self._values_lock:
+            for slug, row in rows.items():
+                if insert:
+                    self._ipos_absent.discard(slug)
+                    self._ipos_values.setdefault(slug, {}).update(row)
+                elif slug in self._ipos_values:
+                    self._ipos_values[slug].update(row)
+
+    # -------------------------------------------------------------- #
+    # write-behind buffer for ipos
+    # -------------------------------------------------------------- #
+
+    def _defer(self, rows: dict[str, dict[str, Any]], *, insert: bool) -> None:
+        """Merge `rows` (slug → columns) into the run's pending writes.
+
+        Field by field, later values win — the same end state as sending
+        each source's write as it came. A slug with a pending upsert
+        stays an upsert (updates fold into it); otherwise updates stay
+        updates, so partial enrichment payloads never take the INSERT path.
+        """
+        source = current_source.get()
+        with self._pending_lock:
+            _merge_pending(self._pending_upserts, self._pending_updates, rows, insert=insert)
+            for slug in rows:
+                self._pending_sources.setdefault(slug, set()).add(source)
+            size = len(self._pending_upserts) + len(self._pending_updates)
+            # Reads served from the snapshot see buffered writes immediately.
+            self._remember(({**changes, "slug": slug} for slug, changes in rows.items()), insert=insert)
+        limit = self.settings.write_behind_max_rows
+        if limit and size >= limit:
+            self._checkpoint()
+
+    def _count_known(self, slugs: Iterable[str]) -> int:
+        """Rows a buffered update will touch: slugs in the snapshot (which
+        includes this run's buffered upserts). Without a snapshot, assume all."""
+        slugs = list(slugs)
+        with self._snapshot_lock:
+            if self._snapshot is None:
+                return len(slugs)
+            return sum(1 for s in slugs if s in self._snapshot)
+
+    def flush(self, *, final: bool = False) -> int:
+        """Send every buffered ipos write (see `_write_ipos`). Returns
+        rows written or found already current.
+
+        Raises if a write fails. Everything stays buffered then (see
+        `unflushed_sources`) and goes out with the next flush — re-sending
+        rows that already went through is harmless. The end-of-run flush
+        (`final=True`) moves the buffer to the spool instead, if there
+        is one; mid-run flushes never do, so the spool only ever holds
+        the run's last word on a slug.
+
+        The buffer is swapped out under `_pending_lock` and sent without
+        it, so sources keep buffering while a flush is on the network.
+        """
+        with self._flush_lock:
+            with self._pending_lock:
+                upserts, updates, sources = self._pending_upserts, self._pending_updates, self._pending_sources
+                if not upserts and not updates:
+                    return 0
+                self._pending_upserts, self._pending_updates, self._pending_sources = {}, {}, {}
+            try:
+                return self._write_ipos(upserts, updates)
+            except Exception as exc:  # noqa: BLE001
+                if not final or self.spool is None or not self._transient(exc):
+                    self._unflush(upserts, updates, sources)
+                    raise
+                self._note_outage(exc)
+                if upserts:
+                    self.spool.append("upsert_ipos", "ipos", list(upserts.values()))
+                if updates:
+                    self.spool.append("update_ipos", "ipos", [{**c, "slug": slug} for slug, c in updates.items()])
+                return 0
+
+    def _unflush(
+        self,
+        upserts: dict[str, dict[str, Any]],
+        updates: dict[str, dict[str, Any]],
+        sources: dict[str, set[str]],
+    ) -> None:
+        """Put a batch whose flush failed back in the buffer, underneath
+        whatever was buffered while it was being sent (which is newer)."""
+        with self._pending_lock:
+            _merge_pending(upserts, updates, self._pending_upserts, insert=True)
+            _merge_pending(upserts, updates, self._pending_updates, insert=False)
+            for slug, names in self._pending_sources.items():
+                sources.setdefault(slug, set()).update(names)
+            self._pending_upserts, self._pending_updates, self._pending_sources = upserts, updates, sources
+
+    def _checkpoint(self) -> None:
+        """Flush, but leave a failure for the end-of-run flush to report
+        rather than failing whichever source happened to trigger it."""
+        if self._outage:
+            return  # the end-of-run flush gets one more try
+        try:
+            self.flush()
+        except Exception as exc:  # noqa: BLE001
+            log.warning(
+                "write-behind flush failed, keeping rows buffered: %s",
+                str(exc).replace("\n", " ")[:200],
+            )
+
+    def unflushed_sources(self) -> set[str]:
+        """Sources with ipos writes still in the buffer."""
+        with self._pending_lock:
+            return {s for sources in self._pending_sources.values() for s in sources if s}
+
+    def _flush_at_exit(self) -> None:
+        # Backstop for interpreter exit without runner.run's own flush
+        # (e.g. Database used from a script, or SIGTERM mid-run).
+        if self._closed:
+            return  # close() unregisters this; a closed client can't send
+        try:
+            self.flush(final=True)
+        except Exception as exc:  # noqa: BLE001
+            log.error(
+                "buffered ipos writes lost at exit (sources: %s): %s",
+                ", ".join(sorted(self.unflushed_sources())) or "-",
+                str(exc).replace("\n", " ")[:200],
+            )
+
     def fetch_ipos_missing_detail(self, limit: int) -> list[dict[str, Any]]:
         """Candidates for the detail scraper: have a cached detail_url and
         haven't had their financials populated yet (or were last scraped >7d ago).
         Prioritise recently-opened IPOs."""
+        self._checkpoint()  # read from the DB: buffered rows must be there
         query = (
             self.client.table("ipos")
             .select(
@@ -135,14 +807,36 @@ class Database:
         return resp.data or []
 
     def fetch_ipos_missing_history(self, limit: int) -> list[dict[str, Any]]:
-        """Candidates for the history backfill: have a detail_url and zero
-        rows in both gmp_history and subscription_history. Ordered oldest
+        """Candidates for the history backfill: have a detail_url and are
+        missing rows in gmp_history or subscription_history. Ordered oldest
         first so listed/closed IPOs (the ones that predate the pipeline)
-        get backfilled before we revisit recent ones."""
-        gmp_resp = self._execute(self.client.table("gmp_history").select("ipo_slug"))
-        sub_resp = self._execute(self.client.table("subscription_history").select("ipo_slug"))
-        have_gmp = {r["ipo_slug"] for r in (gmp_resp.data or []) if r.get("ipo_slug")}
-        have_sub = {r["ipo_slug"] for r in (sub_resp.data or []) if r.get("ipo_slug")}
+        get backfilled before we revisit recent ones.
+
+        The anti-join runs in Postgres (`ipos_missing_history`, sql/0005);
+        without that migration we fall back to diffing slugs client-side.
+        """
+        self._checkpoint()  # read from the DB: buffered rows must be there
+        if self._missing_history_rpc:
+            try:
+                resp = self._execute(self.client.rpc("ipos_missing_history", {"max_rows": limit}))
+                return resp.data or []
+            except Exception as exc:  # noqa: BLE001
+                if not _schema_missing(exc):
+                    raise
+                log.warning(
+                    "ipos_missing_history function missing, diffing client-side "
+                    "(apply sql/0005_ipos_missing_history.sql)"
+                )
+                self._missing_history_rpc = False
+        return self._fetch_ipos_missing_history_client_side(limit)
+
+    def _fetch_ipos_missing_history_client_side(self, limit: int) -> list[dict[str, Any]]:
+        # Pages through every history row — fine as a stop-gap, but
+        # apply 0005 so this never ships the tables over the wire.
+        have_gmp = {r["ipo_slug"] for r in self.iter_rows("gmp_history", "ipo_slug") if r.get("ipo_slug")}
+        have_sub = {
+            r["ipo_slug"] for r in self.iter_rows("subscription_history", "ipo_slug") if r.get("ipo_slug")
+        }
         already = have_gmp & have_sub
 
         query = (
@@ -158,13 +852,11 @@ class Database:
         return filtered[:limit]
 
     def fetch_active_slugs(self) -> set[str]:
-        query = (
-            self.client.table("ipos")
-            .select("slug")
-            .in_("status", ["upcoming", "open", "closed"])
-        )
-        resp = self._execute(query)
-        return {row["slug"] for row in (resp.data or []) if row.get("slug")}
+        return {
+            row["slug"]
+            for row in self._ipos_snapshot()
+            if row.get("status") in ("upcoming", "open", "closed")
+        }
 
     def fetch_known_slugs(self) -> set[str]:
         """Every slug the pipeline has ever seen, regardless of status.
@@ -175,57 +867,212 @@ class Database:
         fetch_active_slugs() drops 'listed' and 'unknown' rows, so a GMP
         row for a just-listed IPO gets skipped — not what we want.
         """
-        query = self.client.table("ipos").select("slug")
-        resp = self._execute(query)
-        return {row["slug"] for row in (resp.data or []) if row.get("slug")}
+        return {row["slug"] for row in self._ipos_snapshot()}
 
     def fetch_ipos_for_calendar(self) -> list[dict[str, Any]]:
-        """Pulls the date fields needed to derive timeline_events JSONB."""
-        query = (
-            self.client.table("ipos")
-            .select(
-                "slug, drhp_filed_date, rhp_filed_date, sebi_approval_date, "
-                "open_date, close_date, allotment_date, refund_date, "
-                "demat_credit_date, listing_date"
-            )
-            .in_("status", ["upcoming", "open", "closed", "listed"])
-        )
-        resp = self._execute(query)
-        return resp.data or []
+        """The date fields needed to derive timeline_events JSONB."""
+        return [
+            {col: row.get(col) for col in ("slug",) + _SNAPSHOT_DATE_COLUMNS}
+            for row in self._ipos_snapshot()
+            if row.get("status") in ("upcoming", "open", "closed", "listed")
+        ]
 
     # -------------------------------------------------------------- #
     # history tables (append-only)
     # -------------------------------------------------------------- #
 
     def append_gmp_history(self, rows: list[dict[str, Any]]) -> int:
-        return self._append("gmp_history", rows)
+        rows = self._history_changes("gmp_history", rows)
+        return self._spooled_append("append", "gmp_history", rows)
 
     def append_subscription_history(self, rows: list[dict[str, Any]]) -> int:
-        return self._append("subscription_history", rows)
+        rows = self._history_changes("subscription_history", rows)
+        return self._spooled_append("append", "subscription_history", rows)
+
+    def _history_changes(self, table: str, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """`rows` minus those that repeat the last stored observation for
+        their (ipo_slug, source), unless that observation is older than
+        `history_heartbeat_sec` (Settings.history_change_only). Between
+        two stored rows the value held, so nothing is lost: a row means
+        "first seen at", or "still this at" for a heartbeat."""
+        items = [r for r in rows if r.get("ipo_slug")]
+        if not self.settings.history_change_only or not items or self._outage:
+            return items
+        try:
+            self._load_last_observations(table, items)
+        except Exception as exc:  # noqa: BLE001
+            log.warning(
+                "last observations unavailable, appending everything: %s",
+                str(exc).replace("\n", " ")[:200],
+                extra={"source": table},
+            )
+            return items
+        now = datetime.now(timezone.utc)
+        heartbeat = self.settings.history_heartbeat_sec
+        out: list[dict[str, Any]] = []
+        with self._history_lock:
+            for row in items:
+                key = (table, row["ipo_slug"], row.get("source"))
+                last = self._history_last.get(key)
+                if last is not None and _same_observation(row, last):
+                    at = _instant(str(last.get("scraped_at") or ""))
+                    if at is not None and at.tzinfo is not None and (now - at).total_seconds() < heartbeat:
+                        continue
+                out.append(row)
+                self._history_last[key] = {**row, "scraped_at": row.get("scraped_at") or now.isoformat()}
+        if len(out) < len(items):
+            log.info(
+                "%d of %d history rows unchanged, not appended",
+                len(items) - len(out), len(items),
+                extra={"source": table},
+            )
+        return out
+
+    def _load_last_observations(self, table: str, items: list[dict[str, Any]]) -> None:
+        with self._history_lock:
+            slugs = sorted({r["ipo_slug"] for r in items} - {s for t, s in self._history_slugs if t == table})
+        if not slugs:
+            return
+        found: dict[tuple[str, str, Any], dict[str, Any]] = {}
+        for chunk in _chunks(slugs, self._in_list_size):
+            for r in self._latest_history(table, chunk):
+                found[(table, r["ipo_slug"], r.get("source"))] = r
+        with self._history_lock:
+            for slug in slugs:
+                self._history_slugs.add((table, slug))
+            for row in items:
+                self._history_last.setdefault((table, row["ipo_slug"], row.get("source")), None)
+            for key, r in found.items():
+                if self._history_last.get(key) is None:
+                    self._history_last[key] = r
+
+    def _latest_history(self, table: str, slugs: list[str]) -> list[dict[str, Any]]:
+        """The newest row of `table` per (ipo_slug, source), for `slugs`:
+        the `latest_<table>` function from sql/0007, or a client-side
+        pass over the slugs' history if it isn't installed."""
+        if self._latest_history_rpc:
+            try:
+                return self._execute(self.client.rpc(f"latest_{table}", {"slugs": slugs})).data or []
+            except Exception as exc:  # noqa: BLE001
+                if not _schema_missing(exc):
+                    raise
+                log.warning(
+                    "latest_%s function missing, reading history client-side "
+                    "(apply sql/0007_history_latest.sql)",
+                    table,
+                )
+                self._latest_history_rpc = False
+        latest: dict[tuple[str, Any], dict[str, Any]] = {}
+        for r in self.iter_rows(table, "*", where=lambda q: q.in_("ipo_slug", slugs)):
+            key = (r.get("ipo_slug"), r.get("source"))
+            prev = latest.get(key)
+            # iter_rows goes by id, so on equal timestamps the later row wins.
+            if prev is None or _later_or_same(r.get("scraped_at"), prev.get("scraped_at")):
+                latest[key] = r
+        return list(latest.values())
 
     def append_gmp_history_dedupe(self, rows: list[dict[str, Any]]) -> int:
-        """Insert only rows whose (ipo_slug, scraped_at-date) isn't already
-        present. Used by the detail scraper and history backfill — they
-        re-read the same Chittorgarh trend table each time, so without
-        this every run would duplicate N days of observations."""
-        return self._append_dedupe("gmp_history", rows)
+        """Insert only rows whose (ipo_slug, source, observation date)
+        isn't already present. Used by the detail scraper and history
+        backfill — they re-read the same Chittorgarh trend table each
+        time, so without this every run would duplicate N days of
+        observations. Returns the number of rows actually inserted."""
+        return self._spooled_append("append_dedupe", "gmp_history", rows)
 
     def append_subscription_history_dedupe(self, rows: list[dict[str, Any]]) -> int:
-        return self._append_dedupe("subscription_history", rows)
+        return self._spooled_append("append_dedupe", "subscription_history", rows)
+
+    def _spooled_append(self, op: str, table: str, rows: list[dict[str, Any]]) -> int:
+        """`_append` (op "append") or `_append_dedupe` ("append_dedupe").
+        With a spool, a batch that fails because the database is
+        unreachable is journalled for the next run and counts as 0 rows
+        appended, rather than failing the source. Other errors raise."""
+        send = self._append if op == "append" else self._append_dedupe
+        if self.spool is None:
+            return send(table, rows)
+        items = [r for r in rows if r.get("ipo_slug")]
+        if not items:
+            return 0
+        if op == "append":
+            # Fix the observation time now rather than leaving it to the
+            # column default: a replay then records when the row was
+            # seen, and can tell whether a timed-out insert went through.
+            now = datetime.now(timezone.utc).isoformat()
+            items = [r if r.get("scraped_at") else {**r, "scraped_at": now} for r in items]
+        if not self._outage:
+            try:
+                return send(table, items)
+            except Exception as exc:  # noqa: BLE001
+                if not self._transient(exc):
+                    raise
+                self._note_outage(exc)
+        self.spool.append(op, table, items)
+        return 0
+
+    def _note_outage(self, exc: Exception) -> None:
+        if not self._outage:
+            log.warning(
+                "database write failed, spooling writes for the rest of the run: %s",
+                str(exc).replace("\n", " ")[:200],
+            )
+        self._outage = True
 
     def _append_dedupe(self, table: str, rows: list[dict[str, Any]]) -> int:
         items = [r for r in rows if r.get("ipo_slug")]
         if not items:
             return 0
-        slugs = sorted({r["ipo_slug"] for r in items})
-        query = (
-            self.client.table(table)
-            .select("ipo_slug, scraped_at")
-            .in_("ipo_slug", slugs)
+        while self._observation_keys:
+            try:
+                return self._append_observations(table, items, self._observation_keys[0])
+            except Exception as exc:  # noqa: BLE001
+                if not _schema_missing(exc):
+                    raise
+                self._observation_keys = self._observation_keys[1:]
+                if not self._observation_keys:
+                    log.warning(
+                        "observation_date unique index missing, deduping by select "
+                        "(apply sql/0006_history_observation_date.sql)"
+                    )
+        return self._append_dedupe_by_select(table, items)
+
+    def _append_observations(self, table: str, items: list[dict[str, Any]], key: tuple[str, ...]) -> int:
+        """INSERT … ON CONFLICT (`key`) DO NOTHING against the unique
+        observation index from sql/0006 (or sql/0009): no read, and safe
+        when two runs write the same day concurrently. Rows without a
+        date get a NULL observation_date and always insert, as they did
+        before."""
+
+        def send(chunk: _Chunk) -> int:
+            query = self._rest_write(
+                lambda: self.client.table(table).upsert(
+                    chunk,
+                    on_conflict=",".join(key),
+                    ignore_duplicates=True,
+                    default_to_null=False,
+                ),
+                table,
+                chunk.body,
+                params={"on_conflict": ",".join(key), "columns": _columns(chunk), "select": "id"},
+                # missing=default: columns a row lacks (e.g. undated
+                # scraped_at) take the column default instead of NULL.
+                prefer="return=representation,resolution=ignore-duplicates,missing=default",
+            )
+            # With ignore-duplicates PostgREST only returns inserted rows.
+            return len(self._execute(query).data or [])
+
+        chunks = self._write_chunks(
+            _stamp_observations(items, sanitize=self._rest is None), drop_none=False
         )
-        resp = self._execute(query)
+        inserted = sum(self._parallel(send, chunks))
+        log.info("appended history", extra={"records": inserted, "source": table})
+        return inserted
+
+    def _append_dedupe_by_select(self, table: str, items: list[dict[str, Any]]) -> int:
+        slugs = sorted({r["ipo_slug"] for r in items})
         existing: set[tuple[str, str]] = set()
-        for r in resp.data or []:
+        for r in self.iter_rows(
+            table, "ipo_slug, scraped_at", where=lambda q: q.in_("ipo_slug", slugs)
+        ):
             at = (r.get("scraped_at") or "")[:10]
             if at:
                 existing.add((r["ipo_slug"], at))
@@ -236,33 +1083,203 @@ class Database:
         return self._append(table, fresh)
 
     def _append(self, table: str, rows: Iterable[dict[str, Any]]) -> int:
-        items = [_sanitize(r) for r in rows if r.get("ipo_slug")]
+        items = [r for r in rows if r.get("ipo_slug")]
         if not items:
             return 0
-        sent = 0
-        for chunk in _chunks(items, self.settings.upload_chunk_size):
-            self._execute(self.client.table(table).insert(chunk))
-            sent += len(chunk)
+        if self._rest is None:  # sent as rows, not through encode_row
+            items = [_sanitize(r) for r in items]
+
+        def send(chunk: _Chunk) -> int:
+            self._execute(self._rest_write(
+                lambda: self.client.table(table).insert(chunk),
+                table,
+                chunk.body,
+                params={"columns": _columns(chunk)},
+            ))
+            return len(chunk)
+
+        sent = sum(self._parallel(send, self._write_chunks(items, drop_none=False)))
         log.info("appended history", extra={"records": sent, "source": table})
         return sent
 
+    def _history_stamps(self, table: str, slugs: list[str]) -> list[dict[str, Any]]:
+        """ipo_slug and scraped_at of the rows of `table` for `slugs`."""
+        out: list[dict[str, Any]] = []
+        for chunk in _chunks(slugs, self._in_list_size):
+            out.extend(
+                self.iter_rows(table, "ipo_slug, scraped_at", where=lambda q, c=chunk: q.in_("ipo_slug", c))
+            )
+        return out
+
+    # -------------------------------------------------------------- #
+    # history maintenance (sql/0009, sql/0010)
+    # -------------------------------------------------------------- #
+
+    def ensure_history_partitions(self, months_ahead: int) -> Optional[int]:
+        """Create the monthly history partitions up to `months_ahead`
+        months out, and give rows stuck in the default partition one of
+        their own. Returns partitions created; None without sql/0009."""
+        return self._maintenance(
+            "ensure_history_partitions", {"months_ahead": months_ahead}, "0009_history_partitions"
+        )
+
+    def refresh_history_rollups(self, since: str) -> Optional[int]:
+        """Recompute gmp_daily / subscription_daily for the days that got
+        history rows since the last refresh, or were scraped at or after
+        `since`. Returns rollup rows written; None without sql/0010."""
+        return self._maintenance("refresh_history_rollups", {"since": since}, "0010_history_rollups")
+
+    def prune_history(self, before: str) -> Optional[int]:
+        """Delete live intraday history rows scraped before `before`,
+        keeping each rolled-up day's last row. Returns rows deleted;
+        None without sql/0010."""
+        return self._maintenance("prune_history", {"before": before}, "0010_history_rollups")
+
+    def _maintenance(self, fn: str, params: dict[str, Any], migration: str) -> Optional[int]:
+        try:
+            return int(self._call(fn, params) or 0)
+        except Exception as exc:  # noqa: BLE001
+            if not _schema_missing(exc):
+                raise
+            log.warning("%s function missing, skipped (apply sql/%s.sql)", fn, migration)
+            return None
+
+    def _call(self, fn: str, params: dict[str, Any]) -> Any:
+        """The result of SQL function `fn`, called with named `params`."""
+        return self._execute(self.client.rpc(fn, params)).data
+
+    # -------------------------------------------------------------- #
+    # spool replay
+    # -------------------------------------------------------------- #
+
+    def replay_spool(self) -> tuple[int, int]:
+        """Send the batches earlier runs spooled, oldest first, stopping
+        at the first one that fails because the database is unreachable.
+        A batch the database rejects outright (bad rows, missing schema)
+        is moved to the spool's quarantine file instead, so it doesn't
+        hold up the batches behind it. Returns (batches sent, batches
+        left).
+
+        Safe to repeat, so a batch that half went through can be sent
+        again: ipos upserts and updates only set columns, and skip slugs
+        whose `last_scraped_at` in the DB is already newer (a later run
+        got there first); day-wise history goes through the usual
+        observation_date dedupe; plain appends skip rows whose
+        (ipo_slug, scraped_at) is already there; a run-log row is only
+        inserted if its (run_id, source) has none, and run-log updates
+        only set columns.
+        """
+        if self.spool is None:
+            return 0, 0
+        entries = self.spool.entries()
+        sent = done = 0
+        for entry in entries:
+            try:
+                self._replay(entry)
+            except Exception as exc:  # noqa: BLE001
+                msg = str(exc).replace("\n", " ")[:200]
+                if self._transient(exc):
+                    log.warning(
+                        "spool replay stopped, %d batch(es) kept for later: %s",
+                        len(entries) - done,
+                        msg,
+                    )
+                    break
+                self.spool.quarantine(entry, msg)
+                log.error(
+                    "spooled %s for %s rejected, moved to %s: %s",
+                    entry["op"],
+                    entry.get("table", ""),
+                    self.spool.quarantine_path.name,
+                    msg,
+                    extra={"records": len(entry["rows"])},
+                )
+            else:
+                sent += 1
+            done += 1
+        if done:
+            self.spool.discard(done)
+        if sent:
+            log.info("replayed spooled writes", extra={"records": sent})
+        return sent, len(entries) - done
+
+    def _replay(self, entry: dict[str, Any]) -> None:
+        op, table, rows = entry["op"], entry.get("table", ""), entry["rows"]
+        if op in ("upsert_ipos", "update_ipos"):
+            fresh = self._not_superseded({r["slug"]: r for r in rows if r.get("slug")})
+            if op == "upsert_ipos":
+                self._write_ipos(fresh, {})
+            else:
+                self._write_ipos({}, {slug: self._clean(r, drop="slug") for slug, r in fresh.items()})
+        elif op == "append_dedupe":
+            self._append_dedupe(table, rows)
+        elif op == "append":
+            self._append(table, self._not_appended(table, rows))
+        elif op == "insert_run":
+            for row in rows:
+                if not self._run_logged(row["run_id"], row["source"]):
+                    self._insert_run(row)
+        elif op == "update_run":
+            for row in rows:
+                self._update_run(row["id"], {k: v for k, v in row.items() if k != "id"})
+        else:
+            log.warning("unknown spool op %r, dropped", op)
+
+    def _not_superseded(self, rows: dict[str, dict[str, Any]]) -> dict[str, dict[str, Any]]:
+        current = self._current_values({slug: {_TOUCH_COLUMN: None} for slug in rows})
+        out = {}
+        for slug, row in rows.items():
+            ours = _instant(str(row.get(_TOUCH_COLUMN) or ""))
+            theirs = _instant(str((current.get(slug) or {}).get(_TOUCH_COLUMN) or ""))
+            try:
+                if ours and theirs and theirs > ours:
+                    continue
+            except TypeError:  # naive vs aware; can't tell, so write
+                pass
+            out[slug] = row
+        return out
+
+    def _not_appended(self, table: str, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        slugs = sorted({r["ipo_slug"] for r in rows if r.get("ipo_slug")})
+        present = {
+            (r.get("ipo_slug"), _instant(str(r.get("scraped_at") or "")))
+            for r in self._history_stamps(table, slugs)
+        }
+        return [
+            r for r in rows
+            if (r.get("ipo_slug"), _instant(str(r.get("scraped_at") or ""))) not in present
+        ]
+
     # -------------------------------------------------------------- #
     # scraping_runs
     # -------------------------------------------------------------- #
 
     def start_run(self, source: str) -> int:
-        query = (
-            self.client.table("scraping_runs")
-            .insert(
-                {
-                    "run_id": str(self.run_id),
-                    "source": source,
-                    "status": "running",
-                    "started_at": datetime.now(timezone.utc).isoformat(),
-                }
-            )
-        )
-        resp = self._execute(query)
+        """Insert the source's scraping_runs row; returns its id. With a
+        spool, an unreachable database doesn't stop the source: the row
+        is held back and spooled whole by `finish_run`, and a negative
+        placeholder id is returned."""
+        row = {
+            "run_id": str(self.run_id),
+            "source": source,
+            "status": "running",
+            "started_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if self.spool is None:
+            return self._insert_run(row)
+        if not self._outage:
+            try:
+                return self._insert_run(row)
+            except Exception as exc:  # noqa: BLE001
+                if not self._transient(exc):
+                    raise
+                self._note_outage(exc)
+        row_id = -next(self._unlogged_ids)
+        self._unlogged_runs[row_id] = row
+        return row_id
+
+    def _insert_run(self, row: dict[str, Any]) -> int:
+        resp = self._execute(self.client.table("scraping_runs").insert(row))
         data = resp.data or []
         return data[0]["id"] if data else 0
 
@@ -277,12 +1294,18 @@ class Database:
         errors_count: int = 0,
         error_details: Optional[dict[str, Any]] = None,
         duration_ms: Optional[int] = None,
+        skip_reason: Optional[str] = None,
+        request_stats: Optional[dict[str, Any]] = None,
     ) -> None:
         if not row_id:
             return
         payload = _sanitize(
             {
                 "status": status,
+                "skip_reason": skip_reason,
+                # Per-host timing / bytes rollup (request_stats.py); the
+                # column predates it and only ever held status codes.
+                "http_status_codes": request_stats,
                 "records_found": records_found,
                 "records_updated": records_updated,
                 "records_appended": records_appended,
@@ -292,10 +1315,20 @@ class Database:
                 "finished_at": datetime.now(timezone.utc).isoformat(),
             }
         )
-        query = self.client.table("scraping_runs").update(payload).eq("id", row_id)
+        if row_id < 0:
+            row = {**self._unlogged_runs.pop(row_id), **payload}
+            self.spool.append("insert_run", "scraping_runs", [row])  # type: ignore[union-attr]
+            return
+        if self.spool is not None and self._outage:
+            self.spool.append("update_run", "scraping_runs", [{**payload, "id": row_id}])
+            return
         try:
-            self._execute(query)
+            self._update_run(row_id, payload)
         except Exception as exc:  # noqa: BLE001
+            if self.spool is not None and self._transient(exc):
+                self._note_outage(exc)
+                self.spool.append("update_run", "scraping_runs", [{**payload, "id": row_id}])
+                return
             # Last-ditch: if even sanitized error_details tripped something
             # (e.g. an exotic invalid-UTF-8 byte), fall back to an empty
             # error_details payload so the run-log row is at least written.
@@ -305,12 +1338,224 @@ class Database:
                 str(exc).replace("\n", " ")[:200],
             )
             payload["error_details"] = None
-            query = (
-                self.client.table("scraping_runs").update(payload).eq("id", row_id)
-            )
-            self._execute(query)
+            self._update_run(row_id, payload)
+
+    def _update_run(self, row_id: int, payload: dict[str, Any]) -> None:
+        self._execute(self.client.table("scraping_runs").update(payload).eq("id", row_id))
+
+    def _run_logged(self, run_id: str, source: str) -> bool:
+        """Is there a scraping_runs row for this run of `source`?"""
+        query = self.client.table("scraping_runs").select("id").eq("run_id", run_id).eq("source", source)
+        return bool(self._execute(query.limit(1)).data)
+
+
+# The timestamp every source stamps on the rows it writes. A row whose
+# only difference is this column is a "touch" (see Database._send_touches).
+_TOUCH_COLUMN = "last_scraped_at"
+
+def _same(new: Any, old: Any) -> bool:
+    """Would writing `new` over `old` (as PostgREST returned it) leave
+    the column unchanged? Tolerates the representation changes of a round
+    trip: 12 vs 12.0, and timestamps that come back in Postgres' format."""
+    if new == old:
+        return True
+    if new is None or old is None or isinstance(new, bool) or isinstance(old, bool):
+        return False
+    if isinstance(old, (int, float)) and isinstance(new, (int, float, str)):
+        try:
+            return float(new) == float(old)
+        except ValueError:
+            return False
+    if isinstance(new, str) and isinstance(old, str):
+        a, b = _instant(new), _instant(old)
+        return a is not None and a == b
+    return False
+
+
+def _same_observation(new: dict[str, Any], old: dict[str, Any]) -> bool:
+    """Would appending `new` repeat `old`? Compares the value columns of
+    both; one a row doesn't carry counts as NULL."""
+    columns = (new.keys() | old.keys()) - _HISTORY_META_COLUMNS
+    return all(_same(new.get(c), old.get(c)) for c in columns)
+
+
+def _later_or_same(a: Any, b: Any) -> bool:
+    ta, tb = _instant(str(a or "")), _instant(str(b or ""))
+    if ta is None or tb is None:
+        return ta is not None or tb is None
+    try:
+        return ta >= tb
+    except TypeError:  # naive vs aware
+        return True
+
+
+def _instant(value: str) -> Optional[datetime]:
+    if len(value) < 10 or value[4:5] != "-":
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+# Errors meaning "that migration hasn't been applied": function or
+# column not in PostgREST's schema cache, no unique index matching an
+# ON CONFLICT target, undefined column, undefined function (psycopg).
+_SCHEMA_MISSING_CODES = ("PGRST202", "PGRST204", "42P10", "42703", "42883")
+
+
+def _fold(snapshot: dict[str, dict[str, Any]], rows: Iterable[dict[str, Any]], *, insert: bool) -> None:
+    """Copy the _SNAPSHOT_COLUMNS of `rows` into `snapshot` entries;
+    new slugs are only added with `insert`."""
+    for row in rows:
+        slug = row.get("slug")
+        if not slug:
+            continue
+        entry = snapshot.get(slug)
+        if entry is None:
+            if not insert:
+                continue
+            entry = snapshot[slug] = dict.fromkeys(_SNAPSHOT_COLUMNS)
+            entry["slug"] = slug
+        for col in _SNAPSHOT_COLUMNS:
+            if col in row:
+                entry[col] = row[col]
+
+
+def _merge_pending(
+    upserts: dict[str, dict[str, Any]],
+    updates: dict[str, dict[str, Any]],
+    rows: dict[str, dict[str, Any]],
+    *,
+    insert: bool,
+) -> None:
+    """Fold `rows` (slug → columns) into write-behind buckets, field by
+    field with `rows` winning. A slug with an upsert stays an upsert
+    (updates fold into it); `insert=True` turns a buffered update into
+    an upsert; otherwise updates stay updates."""
+    for slug, changes in rows.items():
+        entry = upserts.get(slug)
+        if entry is None and insert:
+            # An update buffered earlier rides along underneath.
+            entry = upserts[slug] = {**updates.pop(slug, {}), "slug": slug}
+        if entry is None:
+            updates.setdefault(slug, {}).update(changes)
+        else:
+            entry.update(changes)
+
+
+def _stamp_observations(items: list[dict[str, Any]], *, sanitize: bool = True) -> list[dict[str, Any]]:
+    """Copies of history rows with observation_date = the UTC day of
+    scraped_at (left out when there is no scraped_at), sanitised unless
+    `sanitize=False` (rows sent through encode_row)."""
+    stamped: list[dict[str, Any]] = []
+    for r in items:
+        day = (r.get("scraped_at") or "")[:10]
+        row = {**r, "observation_date": day} if day else r
+        stamped.append(_sanitize(row) if sanitize else row)
+    return stamped
+
+
+def _schema_missing(exc: Exception) -> bool:
+    # PostgREST errors carry `code`; psycopg's carry `sqlstate`.
+    code = getattr(exc, "code", None) or getattr(exc, "sqlstate", None)
+    text = str(exc)
+    return code in _SCHEMA_MISSING_CODES or any(c in text for c in _SCHEMA_MISSING_CODES)
+
+
+# SQLSTATE classes that say nothing about the rows: connection
+# exception, insufficient resources, operator intervention (shutdown,
+# statement timeout), transaction rollback (serialization, deadlock).
+_TRANSIENT_SQLSTATE_CLASSES = ("08", "53", "57", "40")
+# PostgREST can't reach the database / timed out waiting for it.
+_TRANSIENT_PGRST_CODES = ("PGRST000", "PGRST001", "PGRST002", "PGRST003")
+
+
+def _transient_error(exc: Exception) -> bool:
+    if isinstance(exc, (OSError, httpx.TransportError)):
+        return True
+    # postgrest-py puts the HTTP status in `code` when the error body
+    # isn't JSON (a gateway 502/503/504), else PostgREST's code or the
+    # SQLSTATE; psycopg errors carry `sqlstate`.
+    code = getattr(exc, "code", None) or getattr(exc, "sqlstate", None)
+    if isinstance(code, int) or (isinstance(code, str) and len(code) == 3 and code.isdigit()):
+        return int(code) >= 500 or int(code) in (408, 429)
+    if isinstance(code, str):
+        return code in _TRANSIENT_PGRST_CODES or code[:2] in _TRANSIENT_SQLSTATE_CLASSES
+    return False
 
 
 def _chunks(seq: list[Any], size: int):
     for i in range(0, len(seq), size):
         yield seq[i : i + size]
+
+
+class _Chunk(list):
+    """Rows for one write request. `body` is the same rows as a JSON
+    array, encoded while sizing the chunk (None if it wasn't)."""
+
+    body: Optional[bytes] = None
+
+
+def _sized_chunks(rows: list[dict[str, Any]], max_rows: int, max_bytes: int, *, drop_none: bool = True):
+    """Consecutive chunks of at most `max_rows` rows whose encoded JSON
+    adds up to at most `max_bytes` (0 = rows only), with `body` set. A
+    row bigger than the limit on its own still goes, alone."""
+    chunk, parts, size = _Chunk(), [], 2  # the brackets
+    for row in rows:
+        part = encode_row(row, drop_none=drop_none)
+        if chunk and (len(chunk) >= max_rows or (max_bytes > 0 and size + len(part) + 1 > max_bytes)):
+            chunk.body = b"[" + b",".join(parts) + b"]"
+            yield chunk
+            chunk, parts, size = _Chunk(), [], 2
+        chunk.append(row)
+        parts.append(part)
+        size += len(part) + 1  # + the separating comma
+    if chunk:
+        chunk.body = b"[" + b",".join(parts) + b"]"
+        yield chunk
+
+
+def _columns(chunk: list[dict[str, Any]]) -> str:
+    """PostgREST's `columns` parameter for a bulk write: the union of
+    the rows' keys, so a key missing from a row is written as NULL (or
+    the column default, with `missing=default`) instead of failing."""
+    return ",".join(f'"{k}"' for k in dict.fromkeys(k for row in chunk for k in row))
+
+
+class _RestWrite:
+    """A POST of pre-encoded JSON to PostgREST, run by `_execute` like
+    a supabase-py query: `execute()` returns the parsed response as
+    `.data` and raises postgrest-py's APIError for an error response."""
+
+    def __init__(self, session: httpx.Client, path: str, body: bytes, params: dict[str, str], prefer: str):
+        self.session = session
+        self.path = path
+        self.body = body
+        self.params = params
+        self.prefer = prefer
+
+    def execute(self) -> Any:
+        headers = {"Content-Type": "application/json"}
+        if self.prefer:
+            headers["Prefer"] = self.prefer
+        r = self.session.post(self.path, content=self.body, params=self.params, headers=headers)
+        if r.is_success:
+            return _RestResult(r.json() if r.content else None)
+        try:
+            error = r.json()
+        except ValueError:
+            error = None
+        if not isinstance(error, dict):
+            # A gateway error page: the HTTP status as `code`, like
+            # postgrest-py, so _transient_error can classify it.
+            error = {"message": r.text[:200] or r.reason_phrase, "code": r.status_code, "hint": None, "details": None}
+        raise APIError(error)
+
+
+class _RestResult(NamedTuple):
+    data: Any
+
+
+# supabase-py's default PostgREST timeout.
+_REST_TIMEOUT_SEC = 120
@@ -0,0 +1,112 @@
+"""Content fingerprints for skipping unchanged pages and payloads.
+
+Conditional GETs (http_cache.py) only help when a server sends
+validators, and most of ours don't — or they sit behind a CDN that
+re-renders every hit. This is the fallback: a source hashes the part of
+the response it actually reads (the JSON list, the relevant `<table>`s)
+and skips parse → write entirely when the digest matches the last run.
+
+A digest only becomes "the last run" once the source finishes with
+status "success" (see Source.execute), so a failed write is retried on
+the next run instead of being masked. Entries also expire after
+`content_hash_max_age_sec`, forcing a periodic full refresh even for
+data that never changes (keeps `last_scraped_at` honest).
+
+Stored as a small JSON file in `state_dir`, keyed by "<source>:<key>".
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from .logger import get_logger
+
+log = get_logger("pipeline.fingerprints")
+
+_WS_RE = re.compile(r"\s+")
+
+
+def fingerprint(payload: Any) -> str:
+    """Stable sha256 of `payload`.
+
+    Strings are whitespace-collapsed first so reformatting the markup
+    doesn't count as a change. Anything else is canonical JSON (sorted
+    keys); non-JSON values such as BeautifulSoup tags fall back to str().
+    """
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8", "replace")
+    if isinstance(payload, str):
+        text = _WS_RE.sub(" ", payload).strip()
+    else:
+        text = json.dumps(
+            payload,
+            sort_keys=True,
+            separators=(",", ":"),
+            default=lambda v: _WS_RE.sub(" ", str(v)).strip(),
+        )
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class FingerprintStore:
+    def __init__(self, path: Path, max_age_sec: float):
+        self.path = path
+        self.max_age_sec = max_age_sec
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            log.warning("fingerprint store unreadable, starting empty: %s", exc)
+            return
+        if isinstance(data, dict):
+            self._entries = {k: v for k, v in data.items() if isinstance(v, dict)}
+
+    def matches(self, source: str, key: str, digest: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(f"{source}:{key}")
+        if not entry or entry.get("digest") != digest:
+            return False
+        return time.time() - entry.get("at", 0) < self.max_age_sec
+
+    def put(self, source: str, key: str, digest: str) -> None:
+        with self._lock:
+            self._entries[f"{source}:{key}"] = {"digest": digest, "at": time.time()}
+            self._dirty = True
+
+    def forget(self, source: str) -> None:
+        """Drop every fingerprint of `source`, e.g. because what it wrote
+        this run never reached the DB."""
+        prefix = f"{source}:"
+        with self._lock:
+            for k in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[k]
+                self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            # Anything past its max age would be ignored anyway.
+            cutoff = time.time() - self.max_age_sec
+            entries = {k: v for k, v in self._entries.items() if v.get("at", 0) >= cutoff}
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(entries, sort_keys=True), encoding="utf-8")
+                tmp.replace(self.path)
+            except OSError as exc:
+                log.warning("fingerprint store not saved: %s", exc)
+                return
+            self._dirty = False
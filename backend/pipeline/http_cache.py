@@ -0,0 +1,128 @@
+"""On-disk validator cache for conditional GETs.
+
+Stores the `ETag` / `Last-Modified` a server sent with the last 200 for a
+URL, so the next run can ask `If-None-Match` / `If-Modified-Since` and
+get a bodyless 304 when nothing changed. Only validators are kept, not
+bodies: a source that sees a 304 skips parsing and writing altogether,
+because whatever the page said was already written last time.
+
+Validators are remembered per source for the current run. If a source
+ends up "failed" (e.g. the parse or the Supabase write blew up after a
+200), `discard_owner` forgets what it stored, so the next run re-fetches
+the full body instead of being told "not modified" about data we never
+saved.
+
+A 304 skip also stops counting once the last full fetch of the URL is
+older than `max_age_sec`: the request then goes out unconditionally and
+the page is parsed and rewritten, so rows lost or edited in the DB are
+put right within that window even if the page itself never changes.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import requests
+
+from .logger import get_logger
+
+log = get_logger("pipeline.http_cache")
+
+# Entries untouched for this long are dropped on save; a server that
+# hasn't been asked for a month will just get an unconditional GET.
+_MAX_AGE_SEC = 30 * 24 * 3600
+
+
+class HttpCache:
+    def __init__(self, path: Path, max_age_sec: float = 0):
+        self.path = path
+        self.max_age_sec = max_age_sec
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._owned: dict[str, set[str]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            log.warning("http cache unreadable, starting empty: %s", exc)
+            return
+        if isinstance(data, dict):
+            self._entries = {k: v for k, v in data.items() if isinstance(v, dict)}
+
+    def conditional_headers(self, url: str) -> dict[str, str]:
+        with self._lock:
+            entry = self._entries.get(url)
+        if not entry:
+            return {}
+        if self.max_age_sec > 0 and time.time() - entry.get("fetched_at", 0) > self.max_age_sec:
+            return {}  # due a full fetch; `store` renews fetched_at
+        headers: dict[str, str] = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url: str, resp: requests.Response, owner: str = "") -> None:
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        with self._lock:
+            if not etag and not last_modified:
+                # Server stopped sending validators — drop the stale pair
+                # so we don't keep sending conditions it can't evaluate.
+                if self._entries.pop(url, None) is not None:
+                    self._dirty = True
+                return
+            now = time.time()
+            # stored_at: last time a response confirmed the validators
+            # (304s included); fetched_at: last full 200.
+            self._entries[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "stored_at": now,
+                "fetched_at": now,
+            }
+            self._owned.setdefault(owner, set()).add(url)
+            self._dirty = True
+
+    def touch(self, url: str) -> None:
+        """Record that a 304 confirmed the entry is still current."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                entry["stored_at"] = time.time()
+                self._dirty = True
+
+    def discard_owner(self, owner: str) -> None:
+        with self._lock:
+            for url in self._owned.pop(owner, set()):
+                self._entries.pop(url, None)
+                self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            cutoff = time.time() - _MAX_AGE_SEC
+            entries = {
+                k: v for k, v in self._entries.items() if v.get("stored_at", 0) >= cutoff
+            }
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(entries, sort_keys=True), encoding="utf-8")
+                tmp.replace(self.path)
+            except OSError as exc:
+                log.warning("http cache not saved: %s", exc)
+                return
+            self._dirty = False
+
@@ -3,27 +3,43 @@
 Design goals:
   * One `requests.Session` per host so cookies stick — many sites reject
     naked requests but accept a session that first warmed up on the root.
-  * Never two requests to the same host within `per_host_min_gap_sec` +
-    random jitter. That single rule is the biggest anti-ban lever.
+  * Never two requests to the same host within the host's gap + random
+    jitter. That single rule is the biggest anti-ban lever. The gap
+    starts at `per_host_min_gap_sec` and adapts per host (rate_control.py).
   * Honor Retry-After on 429/503. Fall back to exponential backoff otherwise.
   * Hard per-host request cap per run so a broken parser can't hammer a site.
+  * Optionally carry cookies, UA and pacing state over to the next run
+    (session_store.py) so scheduled runs look like one returning visitor.
 """
 
 from __future__ import annotations
 
 import random
+import threading
 import time
+from contextvars import ContextVar
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Optional
 from urllib.parse import urlparse
 
 import requests
 
 from .config import RETRYABLE_STATUS, USER_AGENTS, Settings
+from .cassette import Cassette, CassetteAdapter
+from .http_cache import HttpCache
 from .logger import get_logger
+from .rate_control import AimdController
+from .request_stats import RequestRecord, RequestStats
+from .session_store import SessionStore, restore_cookies
 
 log = get_logger("pipeline.http")
 
+# Name of the source currently issuing requests on this thread. Set by
+# Source.execute so per-run bookkeeping (validator ownership, ...) can be
+# attributed without threading the name through every call.
+current_source: ContextVar[str] = ContextVar("current_source", default="")
+
 
 @dataclass
 class _HostState:
@@ -34,6 +50,12 @@ class _HostState:
     # If the site serves a 403 or 429 more than once, back off hard for
     # the rest of the run rather than keep pushing.
     consecutive_blocks: int = 0
+    # Wall-clock time of the last successful warm-up, 0 if never / reset
+    # after a block. Lets repeat warm_up() calls inside the TTL be free.
+    warmed_at: float = 0.0
+    # Held for the whole wait + retry loop so two threads can never
+    # interleave requests to the same host and shorten the gap.
+    lock: threading.Lock = field(default_factory=threading.Lock)
 
 
 _DEFAULT_HEADERS = {
@@ -63,12 +85,64 @@ class HostBlocked(RuntimeError):
 class PoliteClient:
     """Rate-limited HTTP client shared across all sources in a single run.
 
-    Not thread-safe — the pipeline is intentionally sequential.
+    Safe to share between threads: requests to one host are serialised
+    by that host's lock, requests to different hosts proceed in parallel.
     """
 
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, cassette: Optional[Cassette] = None):
         self.settings = settings
+        self.cassette = cassette
         self._hosts: dict[str, _HostState] = {}
+        self._hosts_lock = threading.Lock()
+        self.cache: Optional[HttpCache] = (
+            HttpCache(Path(settings.state_dir) / "http_cache.json", settings.http_cache_max_age_sec)
+            if settings.http_cache
+            else None
+        )
+        self.sessions: Optional[SessionStore] = (
+            SessionStore(Path(settings.state_dir) / "sessions.json", settings.session_ttl_sec)
+            if settings.persist_sessions
+            else None
+        )
+        # Per-source / per-host timing and byte rollups (request_stats.py),
+        # shared with the headless browser and popped by Source.execute.
+        self.stats = RequestStats()
+        self.rate: Optional[AimdController] = (
+            AimdController(settings, Path(settings.state_dir) / "rate_control.json")
+            if settings.adaptive_rate
+            else None
+        )
+
+    def save_state(self) -> None:
+        """Persist cross-run state. Called once by the runner at the end."""
+        if self.cache is not None:
+            self.cache.save()
+        if self.rate is not None:
+            self.rate.save()
+        if self.sessions is not None:
+            with self._hosts_lock:
+                hosts = list(self._hosts.items())
+            for host, st in hosts:
+                if st.consecutive_blocks:
+                    # Burned identity — next run starts clean.
+                    self.sessions.drop(host)
+                elif st.request_count:
+                    # Hosts we didn't talk to keep their old entry (and
+                    # its age); only real contact refreshes the TTL.
+                    self.sessions.put(
+                        host,
+                        session=st.session,
+                        user_agent=st.user_agent,
+                        last_request_wall=time.time() - (time.monotonic() - st.last_request_at),
+                        warmed_at=st.warmed_at,
+                    )
+            self.sessions.save()
+
+    def discard_validators(self, source: str) -> None:
+        """Forget validators stored by `source` this run (it failed, so the
+        next run must re-fetch full bodies rather than trust a 304)."""
+        if self.cache is not None:
+            self.cache.discard_owner(source)
 
     # -------------------------------------------------------------- #
     # session management
@@ -78,15 +152,41 @@ class PoliteClient:
         return urlparse(url).netloc.lower()
 
     def _state_for(self, host: str) -> _HostState:
-        st = self._hosts.get(host)
-        if st is None:
-            sess = requests.Session()
-            ua = random.choice(USER_AGENTS)
-            sess.headers.update(_DEFAULT_HEADERS)
-            sess.headers["User-Agent"] = ua
-            st = _HostState(session=sess, user_agent=ua)
-            self._hosts[host] = st
-        return st
+        with self._hosts_lock:
+            st = self._hosts.get(host)
+            if st is None:
+                sess = requests.Session()
+                ua = random.choice(USER_AGENTS)
+                sess.headers.update(_DEFAULT_HEADERS)
+                if self.cassette is not None:
+                    adapter = CassetteAdapter(self.cassette)
+                    sess.mount("https://", adapter)
+                    sess.mount("http://", adapter)
+                st = _HostState(session=sess, user_agent=ua)
+                if self.sessions is not None:
+                    self._restore_session(host, st)
+                sess.headers["User-Agent"] = st.user_agent
+                self._hosts[host] = st
+            return st
+
+    def _restore_session(self, host: str, st: _HostState) -> None:
+        saved = self.sessions.get(host) if self.sessions is not None else None
+        if not saved or not saved.get("user_agent"):
+            return
+        st.user_agent = saved["user_agent"]
+        restored = restore_cookies(st.session, saved.get("cookies") or [])
+        # The warm-up only counts if the cookies it earned survived.
+        if restored:
+            st.warmed_at = float(saved.get("warmed_at") or 0.0)
+        last = float(saved.get("last_request_at") or 0.0)
+        if last:
+            # Re-express the wall-clock stamp on this process's monotonic
+            # clock so _wait_for_host keeps the gap across runs.
+            st.last_request_at = max(time.monotonic() - (time.time() - last), 1e-9)
+        log.info(
+            "session restored",
+            extra={"host": host, "records": restored},
+        )
 
     # -------------------------------------------------------------- #
     # core fetch
@@ -99,10 +199,46 @@ class PoliteClient:
         referer: Optional[str] = None,
         extra_headers: Optional[dict[str, str]] = None,
         accept_json: bool = False,
+        conditional: bool = False,
     ) -> Optional[requests.Response]:
+        """GET with per-host pacing, retries and backoff.
+
+        With `conditional=True` the request carries the validators from
+        the last 200 for this URL, and a 304 is returned as-is — callers
+        must check for it and treat it as "unchanged since last run".
+        """
         host = self._host_of(url)
         st = self._state_for(host)
+        rec = RequestRecord(host=host)
+
+        with st.lock:
+            try:
+                return self._get_locked(
+                    url,
+                    host,
+                    st,
+                    rec,
+                    referer=referer,
+                    extra_headers=extra_headers,
+                    accept_json=accept_json,
+                    conditional=conditional and self.cache is not None,
+                )
+            finally:
+                if rec.attempts:
+                    self.stats.record(current_source.get(), rec)
 
+    def _get_locked(
+        self,
+        url: str,
+        host: str,
+        st: _HostState,
+        rec: RequestRecord,
+        *,
+        referer: Optional[str],
+        extra_headers: Optional[dict[str, str]],
+        accept_json: bool,
+        conditional: bool,
+    ) -> Optional[requests.Response]:
         if st.consecutive_blocks >= 2:
             log.warning(
                 "host circuit-broken for this run; skipping",
@@ -117,7 +253,7 @@ class PoliteClient:
             )
             raise HostBlocked(host)
 
-        self._wait_for_host(st)
+        rec.politeness_sec = self._wait_for_host(host, st)
 
         headers: dict[str, str] = {}
         if referer:
@@ -127,11 +263,15 @@ class PoliteClient:
             headers["Accept"] = "application/json, text/plain, */*"
         if extra_headers:
             headers.update(extra_headers)
+        if conditional:
+            headers.update(self.cache.conditional_headers(url))  # type: ignore[union-attr]
 
         backoff = self.settings.backoff_base_sec
         last_status: Optional[int] = None
 
         for attempt in range(1, self.settings.max_retries + 1):
+            rec.attempts = attempt
+            started = time.monotonic()
             try:
                 resp = st.session.get(
                     url,
@@ -145,28 +285,43 @@ class PoliteClient:
                     extra={"host": host, "attempt": attempt},
                     exc_info=exc,
                 )
-                time.sleep(min(backoff, self.settings.backoff_cap_sec))
+                rec.network_sec += time.monotonic() - started
+                self._backoff(rec, min(backoff, self.settings.backoff_cap_sec))
                 backoff *= 2
                 continue
             finally:
                 st.last_request_at = time.monotonic()
                 st.request_count += 1
 
+            rec.network_sec += time.monotonic() - started
+            self._measure(rec, resp)
             last_status = resp.status_code
+            if self.rate is not None:
+                self.rate.observe(host, resp, self._retry_after(resp))
 
             if resp.status_code == 200:
                 st.consecutive_blocks = 0
+                if conditional:
+                    self.cache.store(url, resp, owner=current_source.get())  # type: ignore[union-attr]
+                return resp
+
+            if resp.status_code == 304 and conditional:
+                st.consecutive_blocks = 0
+                self.cache.touch(url)  # type: ignore[union-attr]
+                log.info("not modified", extra={"host": host, "status_code": 304})
                 return resp
 
             if resp.status_code in (401, 403):
                 st.consecutive_blocks += 1
+                # Whatever the warm-up earned us has been revoked.
+                st.warmed_at = 0.0
                 log.warning(
                     "blocked response",
                     extra={"host": host, "status_code": resp.status_code, "attempt": attempt},
                 )
                 # Back off hard — and don't keep retrying if we've already
                 # been blocked once.
-                time.sleep(min(backoff * 2, self.settings.backoff_cap_sec))
+                self._backoff(rec, min(backoff * 2, self.settings.backoff_cap_sec))
                 backoff *= 2
                 continue
 
@@ -176,7 +331,7 @@ class PoliteClient:
                     "retryable response",
                     extra={"host": host, "status_code": resp.status_code, "attempt": attempt},
                 )
-                time.sleep(min(wait, self.settings.backoff_cap_sec))
+                self._backoff(rec, min(wait, self.settings.backoff_cap_sec))
                 backoff *= 2
                 continue
 
@@ -197,18 +352,55 @@ class PoliteClient:
     # helpers
     # -------------------------------------------------------------- #
 
-    def warm_up(self, root_url: str) -> None:
-        """Hit the site root first so we pick up session cookies before
-        requesting a deeper URL. Many anti-bot layers require this."""
-        self.get(root_url)
-
-    def _wait_for_host(self, st: _HostState) -> None:
-        gap = self.settings.per_host_min_gap_sec + random.uniform(
-            0.0, self.settings.per_host_jitter_sec
-        )
+    def warm_up(self, root_url: str, *more_urls: str) -> None:
+        """Hit the site root (then any `more_urls`, in order) first so we
+        pick up session cookies before requesting a deeper URL. Many
+        anti-bot layers require this.
+
+        Memoised per host: once a warm-up has succeeded, further calls
+        within `warm_up_ttl_sec` are no-ops. Several sources share
+        chittorgarh.com, and each used to spend a request, a politeness
+        gap and a slot of the per-host cap re-fetching the home page. A
+        401/403 on the host clears the memo so the next call warms again.
+        """
+        host = self._host_of(root_url)
+        st = self._state_for(host)
+        if st.warmed_at and time.time() - st.warmed_at < self.settings.warm_up_ttl_sec:
+            log.info("warm-up still fresh; skipping", extra={"host": host})
+            return
+        ok = True
+        for url in (root_url, *more_urls):
+            resp = self.get(url)
+            ok = ok and resp is not None and resp.status_code == 200
+        if ok:
+            st.warmed_at = time.time()
+
+    def _wait_for_host(self, host: str, st: _HostState) -> float:
+        """Sleep out the rest of the host's gap; returns seconds slept."""
+        base = self.rate.gap(host) if self.rate is not None else self.settings.per_host_min_gap_sec
+        gap = base + random.uniform(0.0, self.settings.per_host_jitter_sec)
         elapsed = time.monotonic() - st.last_request_at
         if st.last_request_at and elapsed < gap:
             time.sleep(gap - elapsed)
+            return gap - elapsed
+        return 0.0
+
+    @staticmethod
+    def _backoff(rec: RequestRecord, seconds: float) -> None:
+        time.sleep(seconds)
+        rec.backoff_sec += seconds
+
+    @staticmethod
+    def _measure(rec: RequestRecord, resp: requests.Response) -> None:
+        rec.status = resp.status_code
+        # `elapsed` stops when the headers are parsed, i.e. time to first byte.
+        rec.ttfb_sec = resp.elapsed.total_seconds()
+        rec.body_bytes += len(resp.content)
+        try:
+            # urllib3 counts bytes pulled off the socket, before decoding.
+            rec.wire_bytes += int(resp.raw.tell())
+        except (AttributeError, TypeError, ValueError, OSError):
+            rec.wire_bytes += len(resp.content)
 
     def _retry_after(self, resp: requests.Response) -> Optional[float]:
         header = resp.headers.get("Retry-After")
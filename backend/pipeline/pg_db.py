@@ -0,0 +1,409 @@
+"""Direct Postgres backend: `Database` over a psycopg connection pool.
+
+    DB_BACKEND=postgres
+    DATABASE_URL=postgresql://postgres.<ref>:<password>@<pooler-host>:6543/postgres
+
+Same public surface and the same write-behind / diff / snapshot logic
+as `db.Database`; only the wire changes. Instead of JSON over PostgREST
+in `upload_chunk_size` pieces:
+
+  * history appends are one COPY per column set;
+  * day-wise dedupe COPYs into a temp table and does a single
+    INSERT … SELECT … ON CONFLICT DO NOTHING (or NOT EXISTS without
+    sql/0006);
+  * ipos upserts and updates are one statement per `pg_chunk_size`
+    rows, up to `upload_workers` (capped by the pool) at once, with `jsonb_populate_recordset` doing the per-column casts —
+    no dependency on the bulk_update_ipos function from sql/0004;
+  * full-table reads stream through a server-side cursor.
+
+Needs `psycopg` and `psycopg-pool`, imported only when this backend is
+selected. Works through Supabase's transaction pooler (port 6543):
+prepared statements are turned off.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+import psycopg
+from psycopg import sql
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+from psycopg_pool import ConnectionPool
+
+from .db import (
+    _TOUCH_COLUMN,
+    Database,
+    _sanitize,
+    _stamp_observations,
+)
+from .logger import get_logger
+
+log = get_logger("pipeline.pg_db")
+
+T = TypeVar("T")
+
+_IPOS = sql.Identifier("public", "ipos")
+
+
+class PostgresDatabase(Database):
+    # No URL to keep short: `slug = ANY(%s)` takes any number of slugs.
+    _in_list_size = 5000
+
+    def _connect(self) -> Any:
+        self.pool = ConnectionPool(
+            self.settings.database_url,
+            min_size=1,
+            max_size=max(1, self.settings.pg_pool_size),
+            kwargs={"prepare_threshold": None},
+            configure=_configure,
+            name="pipeline",
+        )
+        return None  # no PostgREST client on this backend
+
+    @property
+    def _write_chunk_size(self) -> int:
+        return self.settings.pg_chunk_size
+
+    # Rows go out as statement parameters, not JSON request bodies:
+    # chunk by rows only, nothing to pre-encode.
+    _json_bodies = False
+
+    @property
+    def _upload_workers(self) -> int:
+        return min(self.settings.upload_workers, self.settings.pg_pool_size)
+
+    def close(self) -> None:
+        super().close()
+        self.pool.close()
+
+    def _transient(self, exc: Exception) -> bool:
+        # Dropped connections and pool timeouts (what `_run` retries);
+        # errors with a SQLSTATE are judged by its class.
+        if isinstance(exc, psycopg.OperationalError) and not getattr(exc, "sqlstate", None):
+            return True
+        return super()._transient(exc)
+
+    def _run(self, fn: Callable[[psycopg.Connection], T]) -> T:
+        """Call `fn` with a pooled connection inside one transaction,
+        retrying dropped connections like `Database._execute`."""
+        for attempt in range(4):
+            try:
+                with self.pool.connection() as conn:
+                    return fn(conn)
+            except psycopg.OperationalError as exc:
+                if attempt == 3:
+                    raise
+                msg = str(exc).replace("\n", " ")
+                log.warning("Postgres connection failed, retrying (%s/3): %s", attempt + 1, msg[:200])
+                time.sleep(2 ** attempt)
+        raise AssertionError("unreachable")
+
+    def _rows(self, query: sql.Composable, params: Any = None) -> list[dict[str, Any]]:
+        def go(conn: psycopg.Connection) -> list[dict[str, Any]]:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(query, params)
+                return [_jsonable(r) for r in cur.fetchall()]
+
+        return self._run(go)
+
+    def _rowcount(self, query: sql.Composable, params: Any = None) -> int:
+        return self._run(lambda conn: conn.execute(query, params).rowcount)
+
+    def _call(self, fn: str, params: dict[str, Any]) -> Any:
+        # The maintenance functions from sql/0009 / 0010, called in SQL.
+        query = sql.SQL("SELECT {}({}) AS result").format(
+            sql.Identifier("public", fn),
+            sql.SQL(", ").join(sql.SQL("{} => %s").format(sql.Identifier(k)) for k in params),
+        )
+        return self._rows(query, list(params.values()))[0]["result"]
+
+    # -------------------------------------------------------------- #
+    # reads
+    # -------------------------------------------------------------- #
+
+    def iter_rows(
+        self,
+        table: str,
+        columns: str = "*",
+        *,
+        key: str = "id",
+        where: Optional[Callable[[Any], Any]] = None,
+        page_size: Optional[int] = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Stream `table` ordered by `key` through a server-side cursor,
+        `page_size` rows per round-trip. `where` is a PostgREST filter
+        hook and has no equivalent here."""
+        if where is not None:
+            raise TypeError("PostgresDatabase.iter_rows does not take a PostgREST `where`")
+        query = sql.SQL("SELECT {} FROM {} ORDER BY {}").format(
+            _column_list(columns), sql.Identifier("public", table), sql.Identifier(key)
+        )
+        with self.pool.connection() as conn:
+            with conn.cursor(name=f"iter_{table}", row_factory=dict_row) as cur:
+                cur.itersize = page_size or self.settings.read_page_size
+                cur.execute(query)
+                for row in cur:
+                    yield _jsonable(row)
+
+    def _select_ipos(self, columns: list[str], slugs: list[str]) -> list[dict[str, Any]]:
+        query = sql.SQL("SELECT {} FROM {} WHERE slug = ANY(%s)").format(
+            sql.SQL(", ").join(map(sql.Identifier, columns)), _IPOS
+        )
+        return self._rows(query, [slugs])
+
+    def fetch_ipos_missing_detail(self, limit: int) -> list[dict[str, Any]]:
+        self._checkpoint()  # read from the DB: buffered rows must be there
+        return self._rows(
+            sql.SQL(
+                "SELECT slug, ipo_name, company_name, category, status,"
+                "       detail_url, open_date, last_scraped_at"
+                "  FROM public.ipos"
+                " WHERE detail_url IS NOT NULL"
+                "   AND status IN ('upcoming', 'open', 'closed', 'listed')"
+                " ORDER BY open_date DESC NULLS FIRST"
+                " LIMIT %s"
+            ),
+            [limit],
+        )
+
+    def fetch_ipos_missing_history(self, limit: int) -> list[dict[str, Any]]:
+        # The anti-join from sql/0005, inlined: no function needed here.
+        self._checkpoint()  # read from the DB: buffered rows must be there
+        return self._rows(
+            sql.SQL(
+                "SELECT i.slug, i.ipo_name, i.detail_url, i.open_date::text AS open_date, i.status"
+                "  FROM public.ipos i"
+                " WHERE i.detail_url IS NOT NULL"
+                "   AND i.status IN ('closed', 'listed', 'open', 'upcoming')"
+                "   AND NOT ("
+                "           EXISTS (SELECT 1 FROM public.gmp_history g WHERE g.ipo_slug = i.slug)"
+                "       AND EXISTS (SELECT 1 FROM public.subscription_history s WHERE s.ipo_slug = i.slug)"
+                "   )"
+                " ORDER BY i.open_date ASC NULLS LAST"
+                " LIMIT %s"
+            ),
+            [max(limit, 0)],
+        )
+
+    # -------------------------------------------------------------- #
+    # ipos writes
+    # -------------------------------------------------------------- #
+
+    def _upsert_chunk(self, chunk: list[dict[str, Any]]) -> None:
+        # Every row in `chunk` has the same columns (see _send_upserts).
+        columns = sorted(chunk[0])
+        updates = [c for c in columns if c != "slug"]
+        on_conflict = (
+            sql.SQL("DO UPDATE SET {}").format(
+                sql.SQL(", ").join(
+                    sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(c)) for c in updates
+                )
+            )
+            if updates
+            else sql.SQL("DO NOTHING")
+        )
+        cols = sql.SQL(", ").join(map(sql.Identifier, columns))
+        query = sql.SQL(
+            "INSERT INTO {table} ({cols})"
+            " SELECT {cols} FROM jsonb_populate_recordset(NULL::public.ipos, %s)"
+            " ON CONFLICT (slug) {on_conflict}"
+        ).format(table=_IPOS, cols=cols, on_conflict=on_conflict)
+        self._rowcount(query, [Jsonb(chunk)])
+
+    def _send_updates(self, updates: dict[str, dict[str, Any]]) -> int:
+        """UPDATE … FROM jsonb_populate_recordset, one statement per
+        column set and chunk. Unknown slugs match nothing."""
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for slug, changes in updates.items():
+            groups.setdefault(tuple(sorted(changes)), []).append({**changes, "slug": slug})
+        sent = 0
+        for columns, group in groups.items():
+            query = sql.SQL(
+                "UPDATE {table} t SET {sets}"
+                "  FROM jsonb_populate_recordset(NULL::public.ipos, %s) v"
+                " WHERE t.slug = v.slug"
+            ).format(
+                table=_IPOS,
+                sets=sql.SQL(", ").join(
+                    sql.SQL("{0} = v.{0}").format(sql.Identifier(c)) for c in columns
+                ),
+            )
+
+            def send(chunk: list[dict[str, Any]], query: sql.Composable = query) -> int:
+                n = self._rowcount(query, [Jsonb(chunk)])
+                self._remember(chunk, insert=False)
+                self._note_written({r["slug"]: r for r in chunk}, insert=False)
+                return n
+
+            sent += sum(self._parallel(send, self._write_chunks(group)))
+        if sent:
+            log.info("bulk-updated ipos", extra={"records": sent})
+        return sent
+
+    def _touch_chunk(self, slugs: list[str], stamp: str) -> int:
+        query = sql.SQL("UPDATE {} SET {} = %s WHERE slug = ANY(%s)").format(
+            _IPOS, sql.Identifier(_TOUCH_COLUMN)
+        )
+        return self._rowcount(query, [stamp, slugs])
+
+    # -------------------------------------------------------------- #
+    # history tables
+    # -------------------------------------------------------------- #
+
+    def _append(self, table: str, rows: Any) -> int:
+        items = [_sanitize(r) for r in rows if r.get("ipo_slug")]
+        if not items:
+            return 0
+
+        def go(conn: psycopg.Connection) -> int:
+            for columns, group in _by_columns(items).items():
+                _copy(conn, sql.Identifier("public", table), columns, group)
+            return len(items)
+
+        sent = self._run(go)
+        log.info("appended history", extra={"records": sent, "source": table})
+        return sent
+
+    def _append_observations(self, table: str, items: list[dict[str, Any]], key: tuple[str, ...]) -> int:
+        """COPY into a temp table, then one INSERT … ON CONFLICT DO NOTHING
+        against the sql/0006 (or 0009) unique index. Returns rows inserted."""
+        inserted = self._insert_from_staging(
+            table,
+            _stamp_observations(items),
+            f"ON CONFLICT ({', '.join(key)}) DO NOTHING",
+        )
+        log.info("appended history", extra={"records": inserted, "source": table})
+        return inserted
+
+    def _append_dedupe_by_select(self, table: str, items: list[dict[str, Any]]) -> int:
+        # Without 0006: skip rows whose (ipo_slug, UTC day) already exists,
+        # decided in the same statement rather than by a pre-read. Undated
+        # rows can't be matched and always go in, as in the base class.
+        undated = [r for r in items if not r.get("scraped_at")]
+        inserted = self._append(table, undated) if undated else 0
+        inserted += self._insert_from_staging(
+            table,
+            [_sanitize(r) for r in items if r.get("scraped_at")],
+            "WHERE NOT EXISTS ("
+            " SELECT 1 FROM {target} h"
+            "  WHERE h.ipo_slug = s.ipo_slug"
+            "    AND (h.scraped_at AT TIME ZONE 'UTC')::date = (s.scraped_at AT TIME ZONE 'UTC')::date)",
+        )
+        log.info("appended history", extra={"records": inserted, "source": table})
+        return inserted
+
+    def _history_stamps(self, table: str, slugs: list[str]) -> list[dict[str, Any]]:
+        query = sql.SQL("SELECT ipo_slug, scraped_at FROM {} WHERE ipo_slug = ANY(%s)").format(
+            sql.Identifier("public", table)
+        )
+        return self._rows(query, [slugs])
+
+    def _latest_history(self, table: str, slugs: list[str]) -> list[dict[str, Any]]:
+        # What sql/0007's latest_<table> does; no dependency on it here.
+        query = sql.SQL(
+            "SELECT DISTINCT ON (ipo_slug, source) * FROM {} WHERE ipo_slug = ANY(%s)"
+            " ORDER BY ipo_slug, source, scraped_at DESC, id DESC"
+        ).format(sql.Identifier("public", table))
+        return self._rows(query, [slugs])
+
+    def _insert_from_staging(self, table: str, rows: list[dict[str, Any]], tail: str) -> int:
+        target = sql.Identifier("public", table)
+
+        def go(conn: psycopg.Connection) -> int:
+            inserted = 0
+            for columns, group in _by_columns(rows).items():
+                cols = sql.SQL(", ").join(map(sql.Identifier, columns))
+                conn.execute(
+                    sql.SQL(
+                        "CREATE TEMP TABLE _staging ON COMMIT DROP AS"
+                        " SELECT {cols} FROM {target} WITH NO DATA"
+                    ).format(cols=cols, target=target)
+                )
+                _copy(conn, sql.Identifier("_staging"), columns, group)
+                query = sql.SQL("INSERT INTO {target} ({cols}) SELECT {cols} FROM _staging s " + tail)
+                inserted += conn.execute(query.format(target=target, cols=cols)).rowcount
+                conn.execute("DROP TABLE _staging")
+            return inserted
+
+        return self._run(go)
+
+    # -------------------------------------------------------------- #
+    # scraping_runs
+    # -------------------------------------------------------------- #
+
+    def _insert_run(self, row: dict[str, Any]) -> int:
+        query = sql.SQL("INSERT INTO public.scraping_runs ({}) VALUES ({}) RETURNING id").format(
+            sql.SQL(", ").join(map(sql.Identifier, row)),
+            sql.SQL(", ").join(sql.Placeholder() * len(row)),
+        )
+        # A spooled run-log row carries the finish_run columns as well.
+        rows = self._rows(query, [_adapt(v) for v in row.values()])
+        return rows[0]["id"] if rows else 0
+
+    def _update_run(self, row_id: int, payload: dict[str, Any]) -> None:
+        query = sql.SQL("UPDATE public.scraping_runs SET {} WHERE id = %s").format(
+            sql.SQL(", ").join(
+                sql.SQL("{} = %s").format(sql.Identifier(k)) for k in payload
+            )
+        )
+        self._rowcount(query, [_adapt(v) for v in payload.values()] + [row_id])
+
+    def _run_logged(self, run_id: str, source: str) -> bool:
+        query = sql.SQL("SELECT 1 FROM public.scraping_runs WHERE run_id = %s AND source = %s LIMIT 1")
+        return bool(self._rows(query, [run_id, source]))
+
+
+def _configure(conn: psycopg.Connection) -> None:
+    # timestamptz comes back in UTC, as it does from PostgREST.
+    conn.execute("SET TIME ZONE 'UTC'")
+    conn.commit()
+
+
+def _column_list(columns: str) -> sql.Composable:
+    names = [c.strip() for c in columns.split(",") if c.strip()]
+    if not names or "*" in names:
+        return sql.SQL("*")
+    return sql.SQL(", ").join(map(sql.Identifier, names))
+
+
+def _by_columns(rows: list[dict[str, Any]]) -> dict[tuple[str, ...], list[dict[str, Any]]]:
+    # A row that lacks a column gets the column default, not NULL.
+    groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+    for r in rows:
+        groups.setdefault(tuple(sorted(r)), []).append(r)
+    return groups
+
+
+def _copy(
+    conn: psycopg.Connection,
+    table: sql.Composable,
+    columns: tuple[str, ...],
+    rows: list[dict[str, Any]],
+) -> None:
+    query = sql.SQL("COPY {} ({}) FROM STDIN").format(
+        table, sql.SQL(", ").join(map(sql.Identifier, columns))
+    )
+    with conn.cursor() as cur, cur.copy(query) as copy:
+        for r in rows:
+            copy.write_row([_adapt(r[c]) for c in columns])
+
+
+def _adapt(value: Any) -> Any:
+    return Jsonb(value) if isinstance(value, (dict, list)) else value
+
+
+def _jsonable(row: dict[str, Any]) -> dict[str, Any]:
+    """Values as PostgREST would have returned them (numbers, ISO
+    strings), so the rest of the pipeline can't tell the backends apart."""
+    out: dict[str, Any] = {}
+    for k, v in row.items():
+        if isinstance(v, Decimal):
+            v = int(v) if v == v.to_integral_value() else float(v)
+        elif isinstance(v, (datetime, date)):
+            v = v.isoformat()
+        out[k] = v
+    return out
@@ -0,0 +1,167 @@
+"""Adaptive per-host request gap (AIMD).
+
+`per_host_min_gap_sec` used to be one fixed guess for every host —
+niftytrader's JSON API and Cloudflare-fronted chittorgarh alike. This
+controller learns a gap per host instead, the way TCP learns a window:
+
+  * Multiplicative increase on a pushback signal — 429, 401/403, any
+    response carrying Retry-After, or a 200 that is really a challenge
+    page (`_diagnostics.classify_response` → "blocked-challenge"). The
+    gap is multiplied by `aimd_increase_factor`, and never drops below
+    what Retry-After asked for.
+  * Additive decrease after sustained success — every
+    `aimd_success_window` clean responses in a row shave
+    `aimd_decrease_step_sec` off the gap.
+
+The gap is clamped to per-host floor/ceiling bounds (HOST_GAP_BOUNDS in
+config.py, falling back to `aimd_floor_sec` / `aimd_ceiling_sec`).
+Random jitter is still added on top by PoliteClient. Learned gaps are
+saved to `state_dir/rate_control.json` so the next run starts from what
+the host tolerated last time rather than from the default.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+from .config import HOST_GAP_BOUNDS, Settings
+from .logger import get_logger
+from .sources._diagnostics import classify_response
+
+log = get_logger("pipeline.rate_control")
+
+# A learned gap this old says little about the host today; start over.
+_MAX_AGE_SEC = 7 * 24 * 3600
+
+
+@dataclass
+class _HostGap:
+    gap: float
+    successes: int = 0
+    updated_at: float = 0.0
+
+
+class AimdController:
+    def __init__(self, settings: Settings, path: Optional[Path] = None):
+        self.settings = settings
+        self.path = path
+        self._lock = threading.Lock()
+        self._hosts: dict[str, _HostGap] = {}
+        self._dirty = False
+        if path is not None:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))  # type: ignore[union-attr]
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            log.warning("rate control state unreadable, starting fresh: %s", exc)
+            return
+        if not isinstance(data, dict):
+            return
+        cutoff = time.time() - _MAX_AGE_SEC
+        for host, entry in data.items():
+            if not isinstance(entry, dict) or entry.get("updated_at", 0) < cutoff:
+                continue
+            try:
+                gap = self._clamp(host, float(entry["gap"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+            self._hosts[host] = _HostGap(gap=gap, updated_at=entry["updated_at"])
+
+    def bounds(self, host: str) -> tuple[float, float]:
+        return HOST_GAP_BOUNDS.get(
+            host, (self.settings.aimd_floor_sec, self.settings.aimd_ceiling_sec)
+        )
+
+    def _clamp(self, host: str, gap: float) -> float:
+        floor, ceiling = self.bounds(host)
+        return min(max(gap, floor), ceiling)
+
+    def _state(self, host: str) -> _HostGap:
+        st = self._hosts.get(host)
+        if st is None:
+            st = _HostGap(gap=self._clamp(host, self.settings.per_host_min_gap_sec))
+            self._hosts[host] = st
+        return st
+
+    def gap(self, host: str) -> float:
+        """Current minimum seconds between requests to `host` (no jitter)."""
+        with self._lock:
+            return self._state(host).gap
+
+    def observe(
+        self,
+        host: str,
+        resp: Optional[requests.Response],
+        retry_after: Optional[float] = None,
+    ) -> None:
+        """Feed one response (None = transport error) into the controller."""
+        if resp is None:
+            return  # network trouble isn't the host pushing back
+        pushback = (
+            resp.status_code in (401, 403, 429)
+            or retry_after is not None
+            or (resp.status_code == 200 and classify_response(resp) == "blocked-challenge")
+        )
+        with self._lock:
+            st = self._state(host)
+            if pushback:
+                old = st.gap
+                st.gap = self._clamp(
+                    host,
+                    max(st.gap * self.settings.aimd_increase_factor, retry_after or 0.0),
+                )
+                st.successes = 0
+                st.updated_at = time.time()
+                self._dirty = True
+                if st.gap != old:
+                    log.info(
+                        "rate gap widened %.1fs -> %.1fs",
+                        old,
+                        st.gap,
+                        extra={"host": host, "status_code": resp.status_code},
+                    )
+                return
+            if resp.status_code not in (200, 304):
+                return  # 404s, 5xx: neither pushback nor proof of tolerance
+            st.successes += 1
+            if st.successes < self.settings.aimd_success_window:
+                return
+            st.successes = 0
+            old = st.gap
+            st.gap = self._clamp(host, st.gap - self.settings.aimd_decrease_step_sec)
+            st.updated_at = time.time()
+            self._dirty = True
+            if st.gap != old:
+                log.info("rate gap narrowed %.1fs -> %.1fs", old, st.gap, extra={"host": host})
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = {
+                host: {"gap": round(st.gap, 3), "updated_at": st.updated_at}
+                for host, st in self._hosts.items()
+                if st.updated_at
+            }
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(entries, sort_keys=True), encoding="utf-8")
+                tmp.replace(self.path)
+            except OSError as exc:
+                log.warning("rate control state not saved: %s", exc)
+                return
+            self._dirty = False
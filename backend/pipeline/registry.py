@@ -19,6 +19,7 @@ from .sources.chittorgarh_detail import ChittorgarhDetail
 from .sources.chittorgarh_drhp import ChittorgarhDRHP
 from .sources.chittorgarh_history_backfill import ChittorgarhHistoryBackfill
 from .sources.chittorgarh_subscription import ChittorgarhSubscription
+from .sources.history_maintenance import HistoryMaintenance
 from .sources.investorgain_gmp import InvestorgainGMP
 from .sources.ipocentral_shareholder import IPOCentralShareholder
 from .sources.ipoji_shareholder_quota import IpojiShareholderQuota
@@ -44,6 +45,7 @@ ALL_SOURCES: dict[str, Type[Source]] = {
         NSECurrentIssues,
         BSECurrentIssues,
         CalendarEvents,
+        HistoryMaintenance,
     )
 }
 
@@ -93,6 +95,11 @@ GROUPS: dict[str, tuple[str, ...]] = {
     "backfill": (
         "chittorgarh_history_backfill",
     ),
+    # Daily, no network: history partitions, daily rollups and (with
+    # HISTORY_PRUNE_MONTHS) pruning of old intraday rows.
+    "maintenance": (
+        "history_maintenance",
+    ),
     # Full pass — use sparingly (e.g. initial backfill).
     "all": (
         "niftytrader_calendar",
@@ -0,0 +1,106 @@
+"""Per-request timing and byte counters, rolled up per source and host.
+
+PoliteClient and HeadlessBrowser record one `RequestRecord` per logical
+fetch (retries included) under the source that issued it
+(`http_client.current_source`). When the source finishes,
+Source.execute pops its rollup and finish_run writes it to
+`scraping_runs.http_status_codes`:
+
+    {
+      "status": {"200": 11, "304": 1},
+      "hosts": {
+        "www.chittorgarh.com": {
+          "requests": 12, "attempts": 13, "status": {...},
+          "politeness_sec": 71.2,   # waiting out the per-host gap
+          "backoff_sec": 4.0,       # sleeping after 429/403/5xx/errors
+          "network_sec": 9.8,       # inside the HTTP call / page load
+          "ttfb_sec": 6.1, "ttfb_max_sec": 1.4,
+          "wire_bytes": 412345,     # as received (compressed)
+          "body_bytes": 2211042     # after decoding
+        }
+      }
+    }
+
+`duration_ms - (politeness + backoff + network)` is roughly the time the
+source spent parsing and writing, which is the split we need to tell a
+slow network from a strict rate limiter from a slow parser.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any
+
+_SUMMED = ("politeness_sec", "backoff_sec", "network_sec", "ttfb_sec", "wire_bytes", "body_bytes")
+
+
+@dataclass
+class RequestRecord:
+    host: str
+    status: int = 0  # final status; 0 = no response at all
+    attempts: int = 0
+    politeness_sec: float = 0.0
+    backoff_sec: float = 0.0
+    network_sec: float = 0.0
+    ttfb_sec: float = 0.0
+    wire_bytes: int = 0
+    body_bytes: int = 0
+
+
+class _HostTotals:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.attempts = 0
+        self.status: Counter[int] = Counter()
+        self.ttfb_max_sec = 0.0
+        self.sums = dict.fromkeys(_SUMMED, 0.0)
+
+    def add(self, rec: RequestRecord) -> None:
+        self.requests += 1
+        self.attempts += rec.attempts
+        self.status[rec.status] += 1
+        self.ttfb_max_sec = max(self.ttfb_max_sec, rec.ttfb_sec)
+        for name in _SUMMED:
+            self.sums[name] += getattr(rec, name)
+
+    def as_dict(self) -> dict[str, Any]:
+        out: dict[str, Any] = {
+            "requests": self.requests,
+            "attempts": self.attempts,
+            "status": {str(code): n for code, n in sorted(self.status.items())},
+            "ttfb_max_sec": round(self.ttfb_max_sec, 3),
+        }
+        for name, value in self.sums.items():
+            out[name] = int(value) if name.endswith("_bytes") else round(value, 3)
+        return out
+
+
+class RequestStats:
+    """Thread-safe accumulator shared by the HTTP client and the browser."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._by_source: dict[str, dict[str, _HostTotals]] = {}
+        self._statuses: dict[str, list[int]] = {}
+
+    def record(self, source: str, rec: RequestRecord) -> None:
+        with self._lock:
+            hosts = self._by_source.setdefault(source, {})
+            hosts.setdefault(rec.host, _HostTotals()).add(rec)
+            self._statuses.setdefault(source, []).append(rec.status)
+
+    def pop(self, source: str) -> tuple[list[int], dict[str, Any] | None]:
+        """Remove and return `source`'s final statuses (in request order)
+        and its rollup, or `([], None)` if it made no requests."""
+        with self._lock:
+            hosts = self._by_source.pop(source, None)
+            statuses = self._statuses.pop(source, [])
+        if not hosts:
+            return statuses, None
+        totals: Counter[int] = Counter(statuses)
+        return statuses, {
+            "status": {str(code): n for code, n in sorted(totals.items())},
+            "hosts": {host: t.as_dict() for host, t in sorted(hosts.items())},
+        }
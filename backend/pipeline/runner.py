@@ -1,22 +1,40 @@
-"""Orchestrator: runs a list of source names sequentially, waiting
-`inter_source_gap_sec` between them. Returns an aggregate report.
+"""Orchestrator: runs a list of source names and returns an aggregate report.
+
+Two scheduling modes (`Settings.scheduler`):
+
+  * "sequential" — one source after another, waiting
+    `inter_source_gap_sec` between them.
+  * "concurrent" — sources whose `hosts` don't overlap run side by side
+    in a small thread pool. Sources sharing a host keep their listed
+    order, `runs_after` / `runs_last` constraints are honoured, and the
+    per-host gap in PoliteClient still applies to every request, so no
+    site sees more traffic than in a sequential run.
 """
 
 from __future__ import annotations
 
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional, Type
 
 from .browser import HeadlessBrowser
+from .cassette import Cassette
 from .config import Settings
 from .db import Database
+from .fingerprints import FingerprintStore
 from .http_client import PoliteClient
 from .logger import get_logger
 from .registry import ALL_SOURCES
-from .sources.base import SourceResult
+from .sources.base import Source, SourceResult
 
 log = get_logger("pipeline.runner")
 
+# Pseudo-host claimed by every needs_browser source: there is one shared
+# Chromium context and Playwright's sync API is single-threaded.
+_BROWSER_LANE = "<browser>"
+
 
 @dataclass
 class RunReport:
@@ -37,6 +55,7 @@ class RunReport:
                 f"[{res.status:>7}] {name:<28} "
                 f"found={res.records_found} updated={res.records_updated} "
                 f"appended={res.records_appended} errors={len(res.errors)}"
+                + (f" ({res.skip_reason})" if res.skip_reason else "")
             )
             # When something went wrong, dump the first error inline so
             # you can debug from the GitHub Actions log without needing
@@ -49,45 +68,276 @@ class RunReport:
         return lines
 
 
-def run(sources: list[str], *, settings: Settings) -> RunReport:
-    http = PoliteClient(settings)
-    db = Database(settings)
+def run(
+    sources: list[str],
+    *,
+    settings: Settings,
+    cassette: Optional[Cassette] = None,
+) -> RunReport:
+    """Run `sources`. With a recording `cassette` every response is also
+    captured to disk; with a replaying one nothing touches the network or
+    Supabase (see cassette.py)."""
+    http = PoliteClient(settings, cassette=cassette)
+    replaying = cassette is not None and cassette.replay
+    if replaying:
+        db: Database = cassette.open_replay_db(settings)  # type: ignore[union-attr]
+    else:
+        db = _open_database(settings)
+    fingerprints: Optional[FingerprintStore] = None
+    if settings.content_hash:
+        fingerprints = FingerprintStore(
+            Path(settings.state_dir) / "fingerprints.json",
+            max_age_sec=settings.content_hash_max_age_sec,
+        )
     report = RunReport()
 
-    # Lazy Chromium launch — only started if one of the scheduled
-    # sources actually needs JS-rendered HTML. For a "hot" run with
-    # only static-parse sources, the browser never boots.
-    browser: HeadlessBrowser | None = None
+    known: list[str] = []
+    for name in sources:
+        if name not in ALL_SOURCES:
+            log.error("unknown source", extra={"source": name})
+            continue
+        known.append(name)
+
+    # Lazy Chromium launch — HeadlessBrowser only boots Chromium on the
+    # first fetch, so a "hot" run with only static-parse sources never
+    # starts it.
+    browser: Optional[HeadlessBrowser] = None
+    if any(ALL_SOURCES[n].needs_browser for n in known):
+        browser = HeadlessBrowser(settings, stats=http.stats, cassette=cassette)
+
     try:
-        for i, name in enumerate(sources):
-            cls = ALL_SOURCES.get(name)
-            if cls is None:
-                log.error("unknown source", extra={"source": name})
-                continue
+        if not replaying:
+            # Writes earlier runs spooled go first, so this run's own
+            # writes land on top of them.
+            db.replay_spool()
+            if cassette is not None:
+                cassette.record_seed(db)
+        if settings.scheduler == "concurrent":
+            _run_concurrent(known, http=http, db=db, browser=browser, fingerprints=fingerprints, settings=settings, report=report)
+        else:
+            _run_sequential(known, http=http, db=db, browser=browser, fingerprints=fingerprints, settings=settings, report=report)
+    finally:
+        _flush_writes(db, http=http, fingerprints=fingerprints, report=report)
+        if replaying:
+            cassette.dump_db(db)  # type: ignore[union-attr]
+        db.close()
+        http.save_state()
+        if fingerprints is not None:
+            fingerprints.save()
+        if cassette is not None:
+            cassette.save()
+
+    return report
+
+
+def _open_database(settings: Settings) -> Database:
+    if settings.db_backend == "postgres":
+        # Local import: psycopg is only needed for this backend.
+        from .pg_db import PostgresDatabase
+
+        return PostgresDatabase(settings)
+    if settings.db_backend == "sqlite":
+        from .sqlite_db import SqliteDatabase
+
+        return SqliteDatabase(settings)
+    return Database(settings)
+
+
+def flush_spool(settings: Settings) -> tuple[int, int]:
+    """`python -m pipeline flush`: replay the write spool without running
+    any source. Returns (batches sent, batches left)."""
+    db = _open_database(settings)
+    try:
+        return db.replay_spool()
+    finally:
+        db.close()
+
+
+def _flush_writes(
+    db: Database,
+    *,
+    http: PoliteClient,
+    fingerprints: Optional[FingerprintStore],
+    report: RunReport,
+) -> None:
+    """Send the write-behind buffer (or spool it, see Database.flush). A
+    source whose ipos rows made it to neither is marked failed in the
+    report and loses its validators and fingerprints, so the next run
+    fetches and writes it again (its scraping_runs row keeps the status
+    it finished with)."""
+    try:
+        db.flush(final=True)
+    except Exception as exc:  # noqa: BLE001
+        for name in sorted(db.unflushed_sources()):
+            log.error("buffered ipos writes not flushed", extra={"source": name}, exc_info=exc)
+            http.discard_validators(name)
+            if fingerprints is not None:
+                fingerprints.forget(name)
+            res = report.results.get(name)
+            if res is not None:
+                res.status = "failed"
+                res.errors.append(f"ipos flush failed: {type(exc).__name__}: {exc}")
+
 
+def _run_sequential(
+    sources: list[str],
+    *,
+    http: PoliteClient,
+    db: Database,
+    browser: Optional[HeadlessBrowser],
+    fingerprints: Optional[FingerprintStore],
+    settings: Settings,
+    report: RunReport,
+) -> None:
+    try:
+        for i, name in enumerate(sources):
             if i > 0:
                 time.sleep(settings.inter_source_gap_sec)
-
-            if cls.needs_browser and browser is None:
-                browser = HeadlessBrowser(settings)
-
-            log.info("starting source", extra={"source": name})
-            source = cls(http=http, db=db, browser=browser)
-            result = source.execute()
-            report.results[name] = result
-            log.info(
-                "finished source",
-                extra={
-                    "source": name,
-                    "status": result.status,
-                    "records_found": result.records_found,
-                    "records_updated": result.records_updated,
-                    "records_appended": result.records_appended,
-                    "errors": len(result.errors),
-                },
+            report.results[name] = _execute(
+                ALL_SOURCES[name], http=http, db=db, browser=browser, fingerprints=fingerprints
             )
     finally:
         if browser is not None:
             browser.close()
 
-    return report
+
+def _run_concurrent(
+    sources: list[str],
+    *,
+    http: PoliteClient,
+    db: Database,
+    browser: Optional[HeadlessBrowser],
+    fingerprints: Optional[FingerprintStore],
+    settings: Settings,
+    report: RunReport,
+) -> None:
+    lanes = {name: _lanes_for(ALL_SOURCES[name]) for name in sources}
+    pending = list(sources)
+    running: dict[Future, str] = {}
+    busy: set[str] = set()
+    done: set[str] = set()
+    results: dict[str, SourceResult] = {}
+
+    pool = ThreadPoolExecutor(
+        max_workers=max(1, settings.max_parallel_sources),
+        thread_name_prefix="source",
+    )
+    # Browser sources get their own single thread: Playwright's sync API
+    # must be driven (and closed) from the thread that started it.
+    browser_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="browser")
+    try:
+        while pending or running:
+            for name in _ready(pending, running.values(), done, lanes, busy):
+                cls = ALL_SOURCES[name]
+                executor = browser_pool if cls.needs_browser else pool
+                fut = executor.submit(
+                    _execute, cls, http=http, db=db, browser=browser, fingerprints=fingerprints
+                )
+                running[fut] = name
+                busy |= lanes[name]
+                pending.remove(name)
+
+            if not running:
+                # Nothing runnable and nothing in flight means the
+                # constraints can't be satisfied — bail rather than spin,
+                # reporting what was left as failed.
+                log.error("scheduler deadlock", extra={"sources": pending})
+                for name in pending:
+                    reason = _why_waiting(name, pending, lanes)
+                    results[name] = SourceResult(
+                        status="failed", errors=[f"not started, scheduler deadlock: {reason}"]
+                    )
+                break
+
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                busy -= lanes[name]
+                done.add(name)
+                results[name] = fut.result()
+    finally:
+        pool.shutdown(wait=True)
+        if browser is not None:
+            browser_pool.submit(browser.close).result()
+        browser_pool.shutdown(wait=True)
+
+    # Report in the order the sources were requested, not finish order.
+    for name in sources:
+        if name in results:
+            report.results[name] = results[name]
+
+
+def _ready(
+    pending: list[str],
+    running: Iterable[str],
+    done: set[str],
+    lanes: dict[str, frozenset[str]],
+    busy: set[str],
+) -> list[str]:
+    """Pending sources that can start right now, in listed order."""
+    in_run = set(pending) | set(running) | done
+    claimed = set(busy)
+    out: list[str] = []
+    for name in pending:
+        cls = ALL_SOURCES[name]
+        lane = lanes[name]
+        blocked = bool(lane & claimed)
+        # An earlier pending source on the same host goes first, even
+        # while it is itself waiting on a dependency.
+        claimed |= lane
+        if blocked:
+            continue
+        if cls.runs_last and in_run - done - {name}:
+            continue
+        if any(dep in in_run and dep not in done for dep in cls.runs_after):
+            continue
+        out.append(name)
+    return out
+
+
+def _why_waiting(name: str, pending: list[str], lanes: dict[str, frozenset[str]]) -> str:
+    """The `_ready` constraint holding back pending source `name` when
+    nothing is running (so every unfinished source is in `pending`)."""
+    cls = ALL_SOURCES[name]
+    for other in pending[: pending.index(name)]:
+        shared = lanes[other] & lanes[name]
+        if shared:
+            return f"lane {', '.join(sorted(shared))} held by {other}"
+    waiting = [dep for dep in cls.runs_after if dep in pending]
+    if waiting:
+        return f"runs_after {', '.join(waiting)} never finished"
+    if cls.runs_last:
+        return f"runs_last behind {', '.join(p for p in pending if p != name)}"
+    return "no constraint found"
+
+
+def _lanes_for(cls: Type[Source]) -> frozenset[str]:
+    lanes = set(cls.hosts)
+    if cls.needs_browser:
+        lanes.add(_BROWSER_LANE)
+    return frozenset(lanes)
+
+
+def _execute(
+    cls: Type[Source],
+    *,
+    http: PoliteClient,
+    db: Database,
+    browser: Optional[HeadlessBrowser],
+    fingerprints: Optional[FingerprintStore],
+) -> SourceResult:
+    log.info("starting source", extra={"source": cls.name})
+    source = cls(http=http, db=db, browser=browser, fingerprints=fingerprints)
+    result = source.execute()
+    log.info(
+        "finished source",
+        extra={
+            "source": cls.name,
+            "status": result.status,
+            "records_found": result.records_found,
+            "records_updated": result.records_updated,
+            "records_appended": result.records_appended,
+            "errors": len(result.errors),
+        },
+    )
+    return result
@@ -0,0 +1,129 @@
+"""Per-host HTTP session state carried between runs.
+
+Every scheduled run used to start with brand-new `requests.Session`s: a
+fresh User-Agent, an empty cookie jar, and a warm-up round-trip per host
+before any real request. To an anti-bot layer that is a new visitor
+every 30 minutes. This store keeps, per host:
+
+  * the cookie jar (including session cookies — the server-side session
+    usually outlives a single run by hours),
+  * the User-Agent the cookies were issued to (changing UA while keeping
+    the cookies is a stronger bot signal than either alone),
+  * the wall-clock time of the last request, so the politeness gap is
+    honoured across back-to-back runs,
+  * when the host was last warmed up, so `warm_up()` stays a no-op while
+    the cookies that warm-up earned are still around.
+
+Entries older than `session_ttl_sec` are dropped on load, as are hosts
+that blocked us during the run — those start the next run from scratch.
+Stored as JSON in `state_dir`; it holds cookies, so keep `state_dir` out
+of anything public (it is gitignored and only lives in the Actions cache).
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+import requests
+from requests.cookies import create_cookie
+
+from .logger import get_logger
+
+log = get_logger("pipeline.session_store")
+
+
+class SessionStore:
+    def __init__(self, path: Path, max_age_sec: float):
+        self.path = path
+        self.max_age_sec = max_age_sec
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            log.warning("session store unreadable, starting fresh: %s", exc)
+            return
+        if not isinstance(data, dict):
+            return
+        cutoff = time.time() - self.max_age_sec
+        self._entries = {
+            host: entry
+            for host, entry in data.items()
+            if isinstance(entry, dict) and entry.get("saved_at", 0) >= cutoff
+        }
+
+    def get(self, host: str) -> Optional[dict[str, Any]]:
+        return self._entries.get(host)
+
+    def put(
+        self,
+        host: str,
+        *,
+        session: requests.Session,
+        user_agent: str,
+        last_request_wall: float,
+        warmed_at: float,
+    ) -> None:
+        now = time.time()
+        cookies = [
+            {
+                "name": c.name,
+                "value": c.value,
+                "domain": c.domain,
+                "path": c.path,
+                "expires": c.expires,
+                "secure": c.secure,
+                "rest": dict(c._rest),  # HttpOnly etc.
+            }
+            for c in session.cookies
+            if c.expires is None or c.expires > now
+        ]
+        self._entries[host] = {
+            "user_agent": user_agent,
+            "cookies": cookies,
+            "last_request_at": last_request_wall,
+            "warmed_at": warmed_at,
+            "saved_at": now,
+        }
+
+    def drop(self, host: str) -> None:
+        self._entries.pop(host, None)
+
+    def save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._entries, sort_keys=True), encoding="utf-8")
+            tmp.replace(self.path)
+        except OSError as exc:
+            log.warning("session store not saved: %s", exc)
+
+
+def restore_cookies(session: requests.Session, cookies: list[dict[str, Any]]) -> int:
+    """Load persisted cookies into `session`, skipping expired ones."""
+    now = time.time()
+    restored = 0
+    for c in cookies:
+        expires = c.get("expires")
+        if expires is not None and expires <= now:
+            continue
+        session.cookies.set_cookie(
+            create_cookie(
+                c["name"],
+                c["value"],
+                domain=c.get("domain", ""),
+                path=c.get("path", "/"),
+                expires=expires,
+                secure=bool(c.get("secure")),
+                rest=c.get("rest") or {},
+            )
+        )
+        restored += 1
+    return restored
@@ -0,0 +1,123 @@
+"""Fetch → parse → write pipeline for sources that crawl one host page
+by page (`chittorgarh_detail`, `chittorgarh_history_backfill`).
+
+The fetch stage runs in the calling thread and is paced by PoliteClient,
+so it spends most of its time asleep in the per-host gap. Parsing
+(BeautifulSoup) runs in worker threads and DB writes in a single writer
+thread, each behind a bounded queue. While the fetcher waits out the
+6–10 s politeness gap, the previous page is being parsed and the one
+before that written — CPU and Supabase latency drop off the critical
+path entirely. The bounded queues give backpressure: if writes stall,
+fetching stops too instead of buffering the whole crawl in memory.
+
+Error handling:
+  * An exception from `parse` is handed to `on_error` (on the writer
+    thread) and the item is skipped — same as the old inline
+    try/except around the parser.
+  * An exception from `write`, `on_error` or `finish` stops the crawl
+    and is re-raised in the calling thread once the workers are
+    drained, so Source.execute records the source as failed exactly as
+    before. The writer keeps draining its queue either way, so a
+    failure never leaves the fetcher blocked on a full queue.
+  * Exceptions from `fetch` (HostBlocked included) propagate directly
+    after the workers are shut down.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import queue
+import threading
+from typing import Any, Callable, Iterable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_STOP = object()
+
+
+def run_staged(
+    items: Iterable[T],
+    *,
+    fetch: Callable[[T], Optional[Any]],
+    parse: Callable[[T, Any], Any],
+    write: Callable[[T, Any], None],
+    on_error: Callable[[T, BaseException], None],
+    finish: Optional[Callable[[], None]] = None,
+    queue_size: int = 4,
+    parse_workers: int = 1,
+) -> None:
+    """Run `fetch` for each item, then `parse` and `write` on worker threads.
+
+    `fetch` returning None skips the item (it is expected to have
+    recorded its own error). `write`, `on_error` and `finish` are only
+    ever called from one thread, so they may update counters without
+    locking. `finish` runs once after the last item (also after a
+    failed write), for a `write` that batches rows.
+    """
+    parse_q: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+    write_q: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+    workers = max(1, parse_workers)
+    write_failure: list[BaseException] = []
+
+    def _parser() -> None:
+        while True:
+            job = parse_q.get()
+            if job is _STOP:
+                write_q.put(_STOP)
+                return
+            item, payload = job
+            try:
+                write_q.put((item, parse(item, payload), None))
+            except Exception as exc:  # noqa: BLE001
+                write_q.put((item, None, exc))
+
+    def _writer() -> None:
+        stopped = 0
+        while stopped < workers:
+            job = write_q.get()
+            if job is _STOP:
+                stopped += 1
+                continue
+            if write_failure:
+                continue  # drain without writing once a write has failed
+            item, parsed, exc = job
+            try:
+                if exc is not None:
+                    on_error(item, exc)
+                else:
+                    write(item, parsed)
+            except BaseException as w_exc:  # noqa: BLE001
+                write_failure.append(w_exc)
+        if finish is not None:
+            try:
+                finish()
+            except BaseException as f_exc:  # noqa: BLE001
+                write_failure.append(f_exc)
+
+    # Workers run in a copy of the caller's context, so writes are
+    # attributed to the calling source (http_client.current_source).
+    ctx = contextvars.copy_context()
+    threads = [
+        threading.Thread(target=ctx.copy().run, args=(_parser,), name=f"parse-{i}", daemon=True)
+        for i in range(workers)
+    ]
+    threads.append(threading.Thread(target=ctx.copy().run, args=(_writer,), name="write", daemon=True))
+    for t in threads:
+        t.start()
+
+    try:
+        for item in items:
+            if write_failure:
+                break
+            payload = fetch(item)
+            if payload is None:
+                continue
+            parse_q.put((item, payload))
+    finally:
+        for _ in range(workers):
+            parse_q.put(_STOP)
+        for t in threads:
+            t.join()
+
+    if write_failure:
+        raise write_failure[0]
@@ -18,7 +18,8 @@ from typing import Any, Optional
 
 from ..browser import HeadlessBrowser
 from ..db import Database
-from ..http_client import HostBlocked, PoliteClient
+from ..fingerprints import FingerprintStore, fingerprint
+from ..http_client import HostBlocked, PoliteClient, current_source
 from ..logger import get_logger
 
 
@@ -29,7 +30,13 @@ class SourceResult:
     records_appended: int = 0
     errors: list[str] = field(default_factory=list)
     status: str = "success"  # success | partial | failed | skipped
+    # Final status of every request this source made, in order (0 = no
+    # response). Filled by Source.execute from the client's RequestStats.
     http_status_codes: list[int] = field(default_factory=list)
+    # Why a source did no work, when it chose not to: "not-modified"
+    # (HTTP 304), "unchanged-content" (fingerprint matched last run) or
+    # "schema-missing" (the SQL migration it relies on isn't applied).
+    skip_reason: Optional[str] = None
 
 
 class Source(ABC):
@@ -50,16 +57,46 @@ class Source(ABC):
     # entirely for runs that don't need it.
     needs_browser: bool = False
 
+    # Hosts this source talks to. The concurrent scheduler never runs two
+    # sources that share a host at the same time, so per-host pacing stays
+    # exactly as strict as in a sequential run. Browser sources implicitly
+    # share the single Chromium instance as well.
+    hosts: tuple[str, ...] = ()
+
+    # Ordering constraints for the concurrent scheduler. `runs_after`
+    # names sources that must have finished first *if they are part of
+    # the same run* (e.g. enrichment sources wait for the dashboards that
+    # seed `ipos`). `runs_last` holds a source back until everything else
+    # in the run is done.
+    runs_after: tuple[str, ...] = ()
+    runs_last: bool = False
+
     def __init__(
         self,
         http: PoliteClient,
         db: Database,
         browser: Optional[HeadlessBrowser] = None,
+        fingerprints: Optional[FingerprintStore] = None,
     ):
         self.http = http
         self.db = db
         self.browser = browser
+        self.fingerprints = fingerprints
         self.log = get_logger(f"pipeline.source.{self.name}")
+        self._pending_fingerprints: dict[str, str] = {}
+
+    def unchanged(self, key: str, payload: Any) -> bool:
+        """True if `payload` hashes the same as on this source's last
+        successful run, in which case the caller should skip parsing and
+        writing it. Otherwise the new digest is staged and only committed
+        if this run ends in "success"."""
+        if self.fingerprints is None:
+            return False
+        digest = fingerprint(payload)
+        if self.fingerprints.matches(self.name, key, digest):
+            return True
+        self._pending_fingerprints[key] = digest
+        return False
 
     # -------------------------------------------------------------- #
     # orchestration
@@ -70,6 +107,7 @@ class Source(ABC):
         row_id = self.db.start_run(self.name)
         started = time.monotonic()
         result = SourceResult()
+        token = current_source.set(self.name)
         try:
             result = self.run()
         except HostBlocked as exc:
@@ -87,6 +125,16 @@ class Source(ABC):
             result.status = "failed"
             result.errors.append(f"{type(exc).__name__}: {exc}")
             result.errors.append(traceback.format_exc(limit=3))
+        finally:
+            current_source.reset(token)
+        result.http_status_codes, request_stats = self.http.stats.pop(self.name)
+        if result.status in ("failed", "partial"):
+            # Whatever this source fetched may not have made it into the
+            # DB; don't let the next run short-circuit on a 304 for it.
+            self.http.discard_validators(self.name)
+        elif result.status == "success" and self.fingerprints is not None:
+            for key, digest in self._pending_fingerprints.items():
+                self.fingerprints.put(self.name, key, digest)
         duration_ms = int((time.monotonic() - started) * 1000)
         self.db.finish_run(
             row_id,
@@ -97,6 +145,8 @@ class Source(ABC):
             errors_count=len(result.errors),
             error_details={"errors": result.errors} if result.errors else None,
             duration_ms=duration_ms,
+            skip_reason=result.skip_reason,
+            request_stats=request_stats,
         )
         return result
 
@@ -36,6 +36,7 @@ BSE_URL = (
 class BSECurrentIssues(Source):
     name = "bse_current_issues"
     expected_flaky = True  # BSE blocks GH Actions IPs — don't alarm on it.
+    hosts = ("www.bseindia.com", "api.bseindia.com")
 
     def run(self) -> SourceResult:
         result = SourceResult()
@@ -73,6 +74,11 @@ class BSECurrentIssues(Source):
             result.status = "partial"
             return result
 
+        if self.unchanged("current-issues", items):
+            result.status = "skipped"
+            result.skip_reason = "unchanged-content"
+            return result
+
         now_iso = datetime.now(timezone.utc).isoformat()
         rows: list[dict[str, Any]] = []
 
@@ -29,6 +29,7 @@ _EVENT_FIELDS: tuple[tuple[str, str], ...] = (
 
 class CalendarEvents(Source):
     name = "calendar_events"
+    runs_last = True
 
     def run(self) -> SourceResult:
         result = SourceResult()
@@ -38,12 +39,18 @@ class CalendarEvents(Source):
             return result
 
         today = datetime.now(timezone.utc).date().isoformat()
+        # Event statuses flip on date boundaries, so today is part of the
+        # fingerprint alongside the date columns.
+        if self.unchanged("dates", [today, sorted(ipos, key=lambda r: r.get("slug") or "")]):
+            result.status = "skipped"
+            result.skip_reason = "unchanged-content"
+            return result
 
         # Update in place — do NOT upsert. Calendar events only has
         # {slug, timeline_events}, so an upsert that missed the slug
         # conflict target would trip NOT NULL on ipo_name for a brand-new
-        # row. `.update().eq("slug", …)` can only modify existing rows.
-        updated = 0
+        # row. bulk_update_ipos can only modify existing rows.
+        updates: list[dict[str, Any]] = []
         for ipo in ipos:
             slug = ipo.get("slug")
             if not slug:
@@ -51,16 +58,14 @@ class CalendarEvents(Source):
             events = _build_events(ipo, today)
             if not events:
                 continue
-            n = self.db.update_ipo_by_slug(slug, {"timeline_events": events})
-            if n > 0:
-                updated += 1
-            result.records_found += 1
+            updates.append({"slug": slug, "timeline_events": events})
+        result.records_found = len(updates)
 
         if result.records_found == 0:
             result.status = "skipped"
             return result
 
-        result.records_updated = updated
+        result.records_updated = self.db.bulk_update_ipos(updates)
         return result
 
 
@@ -15,25 +15,39 @@ ALLOTMENT_URL = "https://www.chittorgarh.com/report/ipo-allotment-status-nse-bse
 
 class ChittorgarhAllotment(Source):
     name = "chittorgarh_allotment"
+    hosts = ("www.chittorgarh.com",)
 
     def run(self) -> SourceResult:
         result = SourceResult()
         self.http.warm_up("https://www.chittorgarh.com/")
 
-        resp = self.http.get(ALLOTMENT_URL, referer="https://www.chittorgarh.com/")
+        resp = self.http.get(
+            ALLOTMENT_URL, referer="https://www.chittorgarh.com/", conditional=True
+        )
+        if resp is not None and resp.status_code == 304:
+            result.status = "skipped"
+            result.skip_reason = "not-modified"
+            return result
         if resp is None or resp.status_code != 200:
             result.errors.append(f"{ALLOTMENT_URL} → {getattr(resp, 'status_code', 'no-response')}")
             result.status = "failed"
             return result
 
         soup = BeautifulSoup(resp.text, "html.parser")
+        tables = []
+        for table in soup.find_all("table"):
+            headers_text = " ".join(th.get_text(" ", strip=True).lower() for th in table.find_all("th"))
+            if "registrar" in headers_text or "allotment" in headers_text:
+                tables.append(table)
+        if tables and self.unchanged("directory", tables):
+            result.status = "skipped"
+            result.skip_reason = "unchanged-content"
+            return result
+
         now_iso = datetime.now(timezone.utc).isoformat()
         rows: list[dict[str, Any]] = []
 
-        for table in soup.find_all("table"):
-            headers_text = " ".join(th.get_text(" ", strip=True).lower() for th in table.find_all("th"))
-            if "registrar" not in headers_text and "allotment" not in headers_text:
-                continue
+        for table in tables:
             for tr in table.find_all("tr")[1:]:
                 tds = tr.find_all("td")
                 if len(tds) < 2:
@@ -27,10 +27,12 @@ LIST_SME_URL = "https://www.chittorgarh.com/report/list-of-sme-ipo/83/"
 
 class ChittorgarhDashboard(Source):
     name = "chittorgarh_dashboard"
+    hosts = ("www.chittorgarh.com",)
 
     def run(self) -> SourceResult:
         result = SourceResult()
         rows: dict[str, dict[str, Any]] = {}
+        skipped: list[str] = []
 
         # Warm up session on the root so later requests carry cookies.
         self.http.warm_up("https://www.chittorgarh.com/")
@@ -40,7 +42,16 @@ class ChittorgarhDashboard(Source):
             (LIST_URL, "Mainboard"),
             (LIST_SME_URL, "SME"),
         ):
-            self._scrape_table(url, default_cat, rows, result)
+            reason = self._scrape_table(url, default_cat, rows, result)
+            if reason:
+                skipped.append(reason)
+
+        if not rows and skipped and not result.errors:
+            # Every page that had anything to say was unchanged — its rows
+            # are already in the DB from the run that last saw it change.
+            result.status = "skipped"
+            result.skip_reason = ",".join(sorted(set(skipped)))
+            return result
 
         if not rows:
             result.status = "failed"
@@ -74,13 +85,17 @@ class ChittorgarhDashboard(Source):
         default_category: str | None,
         rows: dict[str, dict[str, Any]],
         result: SourceResult,
-    ) -> None:
-        resp = self.http.get(url, referer="https://www.chittorgarh.com/")
+    ) -> str | None:
+        """Parse one listing page into `rows`. Returns a skip reason if the
+        page is unchanged since the last run, None if it was processed."""
+        resp = self.http.get(url, referer="https://www.chittorgarh.com/", conditional=True)
+        if resp is not None and resp.status_code == 304:
+            return "not-modified"
         if resp is None or resp.status_code != 200:
             result.errors.append(
                 describe_failure(resp, url=url, expected="dashboard page")
             )
-            return
+            return None
 
         tag = classify_response(resp)
         if tag != "ok":
@@ -90,16 +105,18 @@ class ChittorgarhDashboard(Source):
             result.errors.append(
                 f"{url} → 200 [{tag}]: {snippet(resp)}"
             )
-            return
+            return None
 
         soup = BeautifulSoup(resp.text, "html.parser")
-        tables = soup.find_all("table")
-        matched = 0
+        tables = [
+            table
+            for table in soup.find_all("table")
+            if "ipo" in " ".join(th.get_text(" ", strip=True).lower() for th in table.find_all("th"))
+        ]
+        if tables and self.unchanged(url, tables):
+            return "unchanged-content"
+
         for table in tables:
-            header_text = " ".join(th.get_text(" ", strip=True).lower() for th in table.find_all("th"))
-            if "ipo" not in header_text:
-                continue
-            matched += 1
             header_cols = [th.get_text(" ", strip=True).lower() for th in table.find_all("th")]
             idx = _column_indexes(header_cols)
 
@@ -164,7 +181,7 @@ class ChittorgarhDashboard(Source):
                     row.get("listing_date"),
                 )
 
-        if matched == 0:
+        if not tables:
             # 200 OK, looked like HTML, but no table had "ipo" in its
             # headers. Surface the first ~240 chars so we can tell
             # whether the page structure changed vs. the server
@@ -172,6 +189,7 @@ class ChittorgarhDashboard(Source):
             result.errors.append(
                 f"{url} → 200 [no-ipo-table]: {snippet(resp)}"
             )
+        return None
 
 
 def _column_indexes(headers: list[str]) -> dict[str, int]:
@@ -26,6 +26,7 @@ from ..parse import (
     parse_price_band,
 )
 from ._chittorgarh_history import parse_gmp_trend, parse_subscription_trend
+from ._staged import run_staged
 from .base import Source, SourceResult
 
 _MONEY_RE = re.compile(r"([\d,.]+)\s*(cr|crore|lakh|lac)?", re.IGNORECASE)
@@ -33,6 +34,7 @@ _MONEY_RE = re.compile(r"([\d,.]+)\s*(cr|crore|lakh|lac)?", re.IGNORECASE)
 
 class ChittorgarhDetail(Source):
     name = "chittorgarh_detail"
+    hosts = ("www.chittorgarh.com",)
 
     def run(self) -> SourceResult:
         result = SourceResult()
@@ -43,44 +45,75 @@ class ChittorgarhDetail(Source):
 
         self.http.warm_up("https://www.chittorgarh.com/")
         now_iso = datetime.now(timezone.utc).isoformat()
-        updates: list[dict[str, Any]] = []
-        gmp_rows: list[dict[str, Any]] = []
-        sub_rows: list[dict[str, Any]] = []
-
-        for ipo in candidates:
+        settings = self.db.settings
+        wrote: list[str] = []
+        # Written a batch at a time (write → flush), not one call per IPO.
+        rows: list[dict[str, Any]] = []
+        gmp_batch: list[dict[str, Any]] = []
+        sub_batch: list[dict[str, Any]] = []
+
+        def fetch(ipo: dict[str, Any]) -> Optional[str]:
             url = ipo.get("detail_url")
             if not url:
-                continue
-
+                return None
             resp = self.http.get(url, referer="https://www.chittorgarh.com/")
             if resp is None or resp.status_code != 200:
                 result.errors.append(f"{url} → {getattr(resp, 'status_code', 'no-response')}")
-                continue
-
-            try:
-                soup = BeautifulSoup(resp.text, "html.parser")
-                row = self._parse_detail(ipo["slug"], soup)
-                gmp_rows.extend(parse_gmp_trend(soup, ipo["slug"], self.name))
-                sub_rows.extend(parse_subscription_trend(soup, ipo["slug"], self.name))
-            except Exception as exc:  # noqa: BLE001
-                result.errors.append(f"{ipo['slug']}: {type(exc).__name__}: {exc}")
-                continue
-
+                return None
+            return resp.text
+
+        def parse(ipo: dict[str, Any], html: str):
+            soup = BeautifulSoup(html, "html.parser")
+            return (
+                self._parse_detail(ipo["slug"], soup),
+                parse_gmp_trend(soup, ipo["slug"], self.name),
+                parse_subscription_trend(soup, ipo["slug"], self.name),
+            )
+
+        def write(ipo: dict[str, Any], parsed) -> None:
+            row, gmp_rows, sub_rows = parsed
             if row:
                 row["last_scraped_at"] = now_iso
                 row["scrape_source"] = self.name
-                updates.append(row)
-
-        if updates:
-            result.records_updated = self.db.upsert_ipos(updates)
-            result.records_found = len(updates)
-
-        if gmp_rows:
-            result.records_appended += self.db.append_gmp_history_dedupe(gmp_rows)
-        if sub_rows:
-            result.records_appended += self.db.append_subscription_history_dedupe(sub_rows)
-
-        if not updates and not gmp_rows and not sub_rows:
+                rows.append(row)
+                result.records_found += 1
+            gmp_batch.extend(gmp_rows or ())
+            sub_batch.extend(sub_rows or ())
+            if row or gmp_rows or sub_rows:
+                wrote.append(ipo["slug"])
+            if len(rows) >= settings.upload_chunk_size:
+                flush()
+
+        def flush() -> None:
+            # Taken out before sending: a batch that fails isn't sent
+            # again by the final flush.
+            ipos, gmp, sub = rows[:], gmp_batch[:], sub_batch[:]
+            for batch in (rows, gmp_batch, sub_batch):
+                batch.clear()
+            if ipos:
+                result.records_updated += self.db.upsert_ipos(ipos)
+            if gmp:
+                result.records_appended += self.db.append_gmp_history_dedupe(gmp)
+            if sub:
+                result.records_appended += self.db.append_subscription_history_dedupe(sub)
+
+        def on_error(ipo: dict[str, Any], exc: BaseException) -> None:
+            result.errors.append(f"{ipo['slug']}: {type(exc).__name__}: {exc}")
+
+        # Fetch in this thread (paced by the per-host gap), parse and
+        # write behind it — see _staged.py.
+        run_staged(
+            candidates,
+            fetch=fetch,
+            parse=parse,
+            write=write,
+            on_error=on_error,
+            finish=flush,
+            queue_size=settings.stage_queue_size,
+            parse_workers=settings.parse_workers,
+        )
+
+        if not wrote:
             result.status = "partial" if result.errors else "skipped"
         return result
 
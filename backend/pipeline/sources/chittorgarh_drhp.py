@@ -9,7 +9,7 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from typing import Any
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 
 from ..parse import canonical_slug, clean_text, parse_date, parse_number
 from .base import Source, SourceResult
@@ -23,19 +23,34 @@ SOURCES = (
 
 class ChittorgarhDRHP(Source):
     name = "chittorgarh_drhp"
+    hosts = ("www.chittorgarh.com",)
 
     def run(self) -> SourceResult:
         result = SourceResult()
         self.http.warm_up("https://www.chittorgarh.com/")
         all_rows: dict[str, dict[str, Any]] = {}
         now_iso = datetime.now(timezone.utc).isoformat()
+        skipped: list[str] = []
 
         for url, kind in SOURCES:
-            resp = self.http.get(url, referer="https://www.chittorgarh.com/")
+            resp = self.http.get(url, referer="https://www.chittorgarh.com/", conditional=True)
+            if resp is not None and resp.status_code == 304:
+                skipped.append("not-modified")
+                continue
             if resp is None or resp.status_code != 200:
                 result.errors.append(f"{url} → {getattr(resp, 'status_code', 'no-response')}")
                 continue
-            self._parse_table(resp.text, kind, all_rows, now_iso)
+            tables = _listing_tables(BeautifulSoup(resp.text, "html.parser"))
+            if tables and self.unchanged(kind, tables):
+                skipped.append("unchanged-content")
+                continue
+            self._parse_table(tables, kind, all_rows, now_iso)
+
+        if not all_rows and skipped and not result.errors:
+            # Lists unchanged since the last run — nothing to write.
+            result.status = "skipped"
+            result.skip_reason = ",".join(sorted(set(skipped)))
+            return result
 
         if not all_rows:
             result.status = "failed"
@@ -49,16 +64,13 @@ class ChittorgarhDRHP(Source):
 
     def _parse_table(
         self,
-        html: str,
+        tables: list[Tag],
         kind: str,
         rows: dict[str, dict[str, Any]],
         now_iso: str,
     ) -> None:
-        soup = BeautifulSoup(html, "html.parser")
-        for table in soup.find_all("table"):
+        for table in tables:
             headers = [th.get_text(" ", strip=True).lower() for th in table.find_all("th")]
-            if not headers or "name" not in " ".join(headers):
-                continue
             col = _columns(headers)
             for tr in table.find_all("tr")[1:]:
                 tds = tr.find_all("td")
@@ -101,6 +113,15 @@ class ChittorgarhDRHP(Source):
                     row["industry_sector"] = industry
 
 
+def _listing_tables(soup: BeautifulSoup) -> list[Tag]:
+    out: list[Tag] = []
+    for table in soup.find_all("table"):
+        headers = [th.get_text(" ", strip=True).lower() for th in table.find_all("th")]
+        if headers and "name" in " ".join(headers):
+            out.append(table)
+    return out
+
+
 def _cell(tds, i):
     if i is None or i >= len(tds):
         return ""
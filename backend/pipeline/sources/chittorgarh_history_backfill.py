@@ -12,7 +12,9 @@ already covering.
 
 Throttle:
 - `detail_batch_size` (default 10) IPOs per invocation.
-- One request per IPO (reuses the existing detail URL).
+- One request per IPO (reuses the existing detail URL). Parsing and
+  history writes run behind the fetch loop (see `_staged.py`), so the
+  per-host gap is the only thing on the critical path.
 - The polite-client's per-host cap still applies globally.
 
 Run manually when needed, e.g. `python -m pipeline run backfill`.
@@ -20,14 +22,18 @@ Run manually when needed, e.g. `python -m pipeline run backfill`.
 
 from __future__ import annotations
 
+from typing import Any, Optional
+
 from bs4 import BeautifulSoup
 
 from ._chittorgarh_history import parse_gmp_trend, parse_subscription_trend
+from ._staged import run_staged
 from .base import Source, SourceResult
 
 
 class ChittorgarhHistoryBackfill(Source):
     name = "chittorgarh_history_backfill"
+    hosts = ("www.chittorgarh.com",)
 
     def run(self) -> SourceResult:
         result = SourceResult()
@@ -37,36 +43,50 @@ class ChittorgarhHistoryBackfill(Source):
             return result
 
         self.http.warm_up("https://www.chittorgarh.com/")
+        settings = self.db.settings
 
-        for ipo in candidates:
+        def fetch(ipo: dict[str, Any]) -> Optional[str]:
             url = ipo.get("detail_url")
             slug = ipo.get("slug")
             if not url or not slug:
-                continue
-
+                return None
             resp = self.http.get(url, referer="https://www.chittorgarh.com/")
             if resp is None or resp.status_code != 200:
                 result.errors.append(
                     f"{slug}: {url} → {getattr(resp, 'status_code', 'no-response')}"
                 )
-                continue
-
-            try:
-                soup = BeautifulSoup(resp.text, "html.parser")
-                gmp_rows = parse_gmp_trend(soup, slug, self.name)
-                sub_rows = parse_subscription_trend(soup, slug, self.name)
-            except Exception as exc:  # noqa: BLE001
-                result.errors.append(f"{slug}: {type(exc).__name__}: {exc}")
-                continue
-
+                return None
+            return resp.text
+
+        def parse(ipo: dict[str, Any], html: str):
+            soup = BeautifulSoup(html, "html.parser")
+            return (
+                parse_gmp_trend(soup, ipo["slug"], self.name),
+                parse_subscription_trend(soup, ipo["slug"], self.name),
+            )
+
+        def write(ipo: dict[str, Any], parsed) -> None:
+            gmp_rows, sub_rows = parsed
             if gmp_rows:
                 result.records_appended += self.db.append_gmp_history_dedupe(gmp_rows)
             if sub_rows:
                 result.records_appended += self.db.append_subscription_history_dedupe(sub_rows)
-
             if gmp_rows or sub_rows:
                 result.records_found += 1
 
+        def on_error(ipo: dict[str, Any], exc: BaseException) -> None:
+            result.errors.append(f"{ipo['slug']}: {type(exc).__name__}: {exc}")
+
+        run_staged(
+            candidates,
+            fetch=fetch,
+            parse=parse,
+            write=write,
+            on_error=on_error,
+            queue_size=settings.stage_queue_size,
+            parse_workers=settings.parse_workers,
+        )
+
         if result.records_found == 0:
             result.status = "partial" if result.errors else "skipped"
         return result
@@ -32,6 +32,8 @@ _WAIT_SELECTOR = 'th:has-text("QIB")'
 class ChittorgarhSubscription(Source):
     name = "chittorgarh_subscription"
     needs_browser = True
+    hosts = ("www.chittorgarh.com",)
+    runs_after = ("niftytrader_calendar", "chittorgarh_dashboard")
 
     def run(self) -> SourceResult:
         result = SourceResult()
@@ -89,6 +91,12 @@ class ChittorgarhSubscription(Source):
         # with late subscription updates still match.
         known = self.db.fetch_known_slugs()
 
+        # Include the known slugs — see investorgain_gmp.py.
+        if self.unchanged("subscription-table", [target, sorted(known)]):
+            result.status = "skipped"
+            result.skip_reason = "unchanged-content"
+            return result
+
         ipos_updates: list[dict[str, Any]] = []
         history_rows: list[dict[str, Any]] = []
         now_iso = datetime.now(timezone.utc).isoformat()
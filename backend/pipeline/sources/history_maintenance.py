@@ -0,0 +1,59 @@
+"""Housekeeping for `gmp_history` / `subscription_history`. Makes no
+network calls.
+
+  * Creates the monthly history partitions ahead of time
+    (`partition_months_ahead`, sql/0009) so inserts never land in the
+    default partition.
+  * Refreshes the `gmp_daily` / `subscription_daily` rollups (sql/0010)
+    for every day that got history rows since the last refresh, plus
+    yesterday and today so late rows are folded in.
+  * With `history_prune_months` > 0, deletes live intraday rows from
+    whole months older than that, once their day is rolled up. Each
+    day's last row and all dated trend rows are kept.
+
+Runs once a day from the "maintenance" group. Without the migrations
+applied it records "skipped" rather than failing.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from .base import Source, SourceResult
+
+
+class HistoryMaintenance(Source):
+    name = "history_maintenance"
+
+    def run(self) -> SourceResult:
+        result = SourceResult()
+        settings = self.db.settings
+        now = datetime.now(timezone.utc)
+
+        created = self.db.ensure_history_partitions(settings.partition_months_ahead)
+
+        since = (now - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        rolled = self.db.refresh_history_rollups(since.isoformat())
+        if rolled is None:
+            result.status = "skipped"
+            result.skip_reason = "schema-missing"
+            return result
+        result.records_updated = rolled
+
+        pruned = 0
+        if settings.history_prune_months > 0:
+            cutoff = _months_before(now, settings.history_prune_months)
+            pruned = self.db.prune_history(cutoff.isoformat()) or 0
+
+        self.log.info(
+            "history maintenance: %d partition(s) created, %d rollup row(s), %d row(s) pruned",
+            created or 0, rolled, pruned,
+            extra={"source": self.name, "records": rolled},
+        )
+        return result
+
+
+def _months_before(now: datetime, months: int) -> datetime:
+    """Midnight UTC on the first of the month `months` before `now`'s."""
+    index = now.year * 12 + (now.month - 1) - months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
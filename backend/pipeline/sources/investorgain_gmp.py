@@ -54,6 +54,8 @@ _PERCENT_RE = re.compile(r"\(([-+\d.]+)\s*%\)")
 class InvestorgainGMP(Source):
     name = "investorgain_gmp"
     needs_browser = True
+    hosts = ("www.investorgain.com",)
+    runs_after = ("niftytrader_calendar", "chittorgarh_dashboard")
 
     def run(self) -> SourceResult:
         result = SourceResult()
@@ -118,6 +120,14 @@ class InvestorgainGMP(Source):
         # for just-listed IPOs.
         known = self.db.fetch_known_slugs()
 
+        # The known-slug set is part of the fingerprint: a slug the
+        # dashboards added since last run must still get enriched even
+        # when the GMP table itself hasn't moved.
+        if self.unchanged("gmp-table", [target, sorted(known)]):
+            result.status = "skipped"
+            result.skip_reason = "unchanged-content"
+            return result
+
         ipos_updates: list[dict[str, Any]] = []
         history_rows: list[dict[str, Any]] = []
         now_iso = datetime.now(timezone.utc).isoformat()
@@ -20,6 +20,8 @@ LIST_URL = "https://ipocentral.in/ipo-calendar/"
 
 class IPOCentralShareholder(Source):
     name = "ipocentral_shareholder"
+    hosts = ("ipocentral.in",)
+    runs_after = ("niftytrader_calendar", "chittorgarh_dashboard")
 
     def run(self) -> SourceResult:
         result = SourceResult()
@@ -33,6 +35,11 @@ class IPOCentralShareholder(Source):
 
         soup = BeautifulSoup(resp.text, "html.parser")
         active = self.db.fetch_active_slugs()
+        if self.unchanged("calendar", [soup.find_all("table"), sorted(active)]):
+            result.status = "skipped"
+            result.skip_reason = "unchanged-content"
+            return result
+
         now_iso = datetime.now(timezone.utc).isoformat()
         rows: list[dict[str, Any]] = []
 
@@ -42,6 +42,8 @@ _TRAILING_STAR_RE = re.compile(r"\s*\*+\s*$")
 
 class IpojiShareholderQuota(Source):
     name = "ipoji_shareholder_quota"
+    hosts = ("www.ipoji.com",)
+    runs_after = ("niftytrader_calendar", "chittorgarh_dashboard")
 
     def run(self) -> SourceResult:
         result = SourceResult()
@@ -73,9 +75,14 @@ class IpojiShareholderQuota(Source):
             return result
 
         active_slugs = self.db.fetch_active_slugs()
+        if self.unchanged("quota-table", [target, sorted(active_slugs)]):
+            result.status = "skipped"
+            result.skip_reason = "unchanged-content"
+            return result
+
         now_iso = datetime.now(timezone.utc).isoformat()
 
-        updated_count = 0
+        updates: list[dict[str, Any]] = []
         skipped_unknown = 0
 
         for tr in target.find_all("tr")[1:]:
@@ -99,17 +106,17 @@ class IpojiShareholderQuota(Source):
                 skipped_unknown += 1
                 continue
 
-            updated = self.db.update_ipo_by_slug(
-                slug,
+            updates.append(
                 {
+                    "slug": slug,
                     "shareholder_quota": True,
                     "parent_company": parent,
                     "last_scraped_at": now_iso,
                     "scrape_source": self.name,
-                },
+                }
             )
-            updated_count += updated
 
+        updated_count = self.db.bulk_update_ipos(updates)
         result.records_found = updated_count + skipped_unknown
         result.records_updated = updated_count
         if skipped_unknown:
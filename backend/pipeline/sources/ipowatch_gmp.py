@@ -22,12 +22,17 @@ _PERCENT_RE = re.compile(r"\(([-+\d.]+)\s*%\)")
 
 class IPOWatchGMP(Source):
     name = "ipowatch_gmp"
+    hosts = ("ipowatch.in",)
 
     def run(self) -> SourceResult:
         result = SourceResult()
         self.http.warm_up("https://ipowatch.in/")
 
-        resp = self.http.get(IPOWATCH_URL, referer="https://ipowatch.in/")
+        resp = self.http.get(IPOWATCH_URL, referer="https://ipowatch.in/", conditional=True)
+        if resp is not None and resp.status_code == 304:
+            result.status = "skipped"
+            result.skip_reason = "not-modified"
+            return result
         if resp is None or resp.status_code != 200:
             result.errors.append(f"{IPOWATCH_URL} → {getattr(resp, 'status_code', 'no-response')}")
             result.status = "failed"
@@ -40,6 +45,10 @@ class IPOWatchGMP(Source):
             result.errors.append("no tables found")
             return result
         target = tables[0]
+        if self.unchanged("gmp-table", target):
+            result.status = "skipped"
+            result.skip_reason = "unchanged-content"
+            return result
 
         history: list[dict[str, Any]] = []
         now_iso = datetime.now(timezone.utc).isoformat()
@@ -52,12 +52,17 @@ _STATUS_MAP = {
 
 class NiftytraderCalendar(Source):
     name = "niftytrader_calendar"
+    hosts = ("www.niftytrader.in", "webapi.niftytrader.in")
 
     def run(self) -> SourceResult:
         result = SourceResult()
 
         self.http.warm_up("https://www.niftytrader.in/")
-        resp = self.http.get(API_URL, referer=REFERER)
+        resp = self.http.get(API_URL, referer=REFERER, conditional=True)
+        if resp is not None and resp.status_code == 304:
+            result.status = "skipped"
+            result.skip_reason = "not-modified"
+            return result
         if resp is None or resp.status_code != 200:
             result.status = "failed"
             result.errors.append(
@@ -83,6 +88,11 @@ class NiftytraderCalendar(Source):
             )
             return result
 
+        if self.unchanged("company-list", records):
+            result.status = "skipped"
+            result.skip_reason = "unchanged-content"
+            return result
+
         now_iso = datetime.now(timezone.utc).isoformat()
         ipos_updates: list[dict[str, Any]] = []
 
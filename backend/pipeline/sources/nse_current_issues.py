@@ -27,13 +27,14 @@ NSE_URL = "https://www.nseindia.com/api/ipo-current-issues"
 class NSECurrentIssues(Source):
     name = "nse_current_issues"
     expected_flaky = True  # NSE blocks datacenter IPs — skip, don't fail.
+    hosts = ("www.nseindia.com",)
 
     def run(self) -> SourceResult:
         result = SourceResult()
-        # Warm up twice — NSE assigns cookies on first hit but fully clears
-        # bot flags only after a second page view.
-        self.http.warm_up(NSE_ROOT)
-        self.http.warm_up(NSE_ROOT + "market-data/new-stock-exchange-listings-recent")
+        # Warm up with two page views — NSE assigns cookies on first hit
+        # but fully clears bot flags only after a second one. Both are
+        # skipped while the host's warm-up is still fresh.
+        self.http.warm_up(NSE_ROOT, NSE_ROOT + "market-data/new-stock-exchange-listings-recent")
 
         resp = self.http.get(NSE_URL, referer=NSE_ROOT, accept_json=True)
         if resp is None or resp.status_code != 200:
@@ -66,6 +67,11 @@ class NSECurrentIssues(Source):
             )
             return result
 
+        if self.unchanged("current-issues", items):
+            result.status = "skipped"
+            result.skip_reason = "unchanged-content"
+            return result
+
         now_iso = datetime.now(timezone.utc).isoformat()
         rows: list[dict[str, Any]] = []
 
@@ -0,0 +1,102 @@
+"""Local write-ahead spool for DB writes that couldn't be sent.
+
+When Supabase is down, `Database._execute` gives up after its retries
+and the rows would be gone — for GMP / subscription observations that
+means for good, since yesterday's live numbers can't be scraped again.
+Instead the batch is appended here, one JSON object per line:
+
+    {"op": "append", "table": "gmp_history", "at": "...", "rows": [...]}
+
+and `Database.replay_spool` sends it at the start of the next run (or
+from `python -m pipeline flush`). Replays are idempotent, see there.
+
+Stored next to the other cross-run state in `state_dir`. Lines are
+fsynced as they're written; a torn last line from a crash is skipped
+with a warning. Batches the database rejects on replay (bad rows rather
+than an outage) are moved to spool.quarantine.jsonl, same format plus
+an "error" key, for a human to look at.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .logger import get_logger
+
+log = get_logger("pipeline.spool")
+
+
+class WriteSpool:
+    def __init__(self, path: Path):
+        self.path = path
+        self.quarantine_path = path.with_suffix(".quarantine.jsonl")
+        self._lock = threading.Lock()
+
+    def append(self, op: str, table: str, rows: list[dict[str, Any]]) -> None:
+        """Journal one batch. Raises OSError if it can't be written."""
+        entry = {
+            "op": op,
+            "table": table,
+            "at": datetime.now(timezone.utc).isoformat(),
+            "rows": rows,
+        }
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as fh:
+                fh.write(_line(entry))
+                fh.flush()
+                os.fsync(fh.fileno())
+        log.warning("spooled %s for %s", op, table, extra={"records": len(rows)})
+
+    def entries(self) -> list[dict[str, Any]]:
+        """Spooled batches, oldest first."""
+        with self._lock:
+            return self._read()
+
+    def discard(self, count: int) -> None:
+        """Drop the `count` oldest batches (the ones a replay sent).
+        Batches spooled since `entries()` was read are kept."""
+        with self._lock:
+            rest = self._read()[count:]
+            if not rest:
+                self.path.unlink(missing_ok=True)
+                return
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text("".join(_line(e) for e in rest), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def quarantine(self, entry: dict[str, Any], error: str) -> None:
+        """Set `entry` aside with the error that rejected it. It stays in
+        the spool until `discard` drops it."""
+        with self._lock:
+            with self.quarantine_path.open("a", encoding="utf-8") as fh:
+                fh.write(_line({**entry, "error": error}))
+                fh.flush()
+                os.fsync(fh.fileno())
+
+    def _read(self) -> list[dict[str, Any]]:
+        try:
+            text = self.path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return []
+        out: list[dict[str, Any]] = []
+        for n, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                log.warning("spool line %d unreadable, skipped", n)
+                continue
+            if isinstance(entry, dict) and entry.get("op") and isinstance(entry.get("rows"), list):
+                out.append(entry)
+        return out
+
+
+def _line(entry: dict[str, Any]) -> str:
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
@@ -0,0 +1,479 @@
+"""Local SQLite backend: `Database` over one file, no credentials.
+
+    DB_BACKEND=sqlite python -m pipeline run all
+    DB_BACKEND=sqlite SQLITE_PATH=/tmp/ipos.sqlite python -m pipeline run core
+
+For runs without Supabase — CI without secrets, throughput benchmarks
+of the sources, or a local replica to point analytical queries at.
+The schema is sql/local/sqlite_schema.sql (the tables of the numbered
+migrations in SQLite form), applied when the file is opened.
+
+Same public surface and the same write-behind / diff / snapshot logic
+as `db.Database`; this only replaces the wire. Values go in and come
+out in the shapes PostgREST uses: ISO strings for dates and
+timestamps, numbers, and lists / dicts for jsonb and array columns
+(stored as JSON text). A column the schema doesn't know is added on
+first write, with a warning, instead of failing the run.
+
+One connection shared by all threads, serialised by a lock — SQLite
+allows a single writer anyway.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from .db import _TOUCH_COLUMN, Database, _chunks, _sanitize, _stamp_observations
+from .logger import get_logger
+
+log = get_logger("pipeline.sqlite_db")
+
+_SCHEMA = Path(__file__).resolve().parent.parent / "sql" / "local" / "sqlite_schema.sql"
+
+# Declared column types whose values are stored as JSON text.
+_JSON_TYPES = ("JSONB", "TEXT_ARRAY")
+
+
+class SqliteDatabase(Database):
+    # Bound parameters per `slug IN (...)`; well under SQLite's limit.
+    _in_list_size = 500
+    _write_chunk_size = 1000  # rows per executemany
+    _json_bodies = False  # no request bodies; chunk by rows only
+    _upload_workers = 1  # one writer at a time anyway
+
+    def _connect(self) -> Any:
+        path = Path(self.settings.sqlite_path or Path(self.settings.state_dir) / "pipeline.sqlite")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA.read_text(encoding="utf-8"))
+        # table → {column: declared type}; refreshed when a column is added.
+        self._columns: dict[str, dict[str, str]] = {}
+        log.info("sqlite backend at %s", path)
+        return None  # no PostgREST client on this backend
+
+    def close(self) -> None:
+        super().close()
+        with self._lock:
+            self.conn.close()
+
+    def _transient(self, exc: Exception) -> bool:
+        # Another process holding the file, or the disk: worth a retry.
+        # Constraint and schema errors are not.
+        if isinstance(exc, sqlite3.OperationalError):
+            return (getattr(exc, "sqlite_errorcode", 0) & 0xFF) in _TRANSIENT_SQLITE_CODES
+        return super()._transient(exc)
+
+    # -------------------------------------------------------------- #
+    # plumbing
+    # -------------------------------------------------------------- #
+
+    def _tx(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run `fn` in one transaction under the connection lock."""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(self.conn)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return out
+
+    def _table_columns(self, table: str) -> dict[str, str]:
+        with self._lock:
+            cols = self._columns.get(table)
+            if cols is None:
+                cols = self._columns[table] = {
+                    r["name"]: (r["type"] or "").upper()
+                    for r in self.conn.execute(f'PRAGMA table_info("{table}")')
+                }
+            return cols
+
+    def _ensure_columns(self, table: str, names: Iterable[str]) -> None:
+        known = self._table_columns(table)
+        for name in names:
+            if name in known:
+                continue
+            log.warning("sqlite: adding unknown column %s.%s", table, name)
+            with self._lock:
+                self.conn.execute(f'ALTER TABLE "{table}" ADD COLUMN {_ident(name)}')
+                self._columns.pop(table, None)
+            known = self._table_columns(table)
+
+    def _select(self, table: str, query: str, params: Iterable[Any] = ()) -> list[dict[str, Any]]:
+        types = self._table_columns(table)
+        with self._lock:
+            rows = self.conn.execute(query, tuple(params)).fetchall()
+        return [_decode(r, types) for r in rows]
+
+    # -------------------------------------------------------------- #
+    # reads
+    # -------------------------------------------------------------- #
+
+    def iter_rows(
+        self,
+        table: str,
+        columns: str = "*",
+        *,
+        key: str = "id",
+        where: Optional[Callable[[Any], Any]] = None,
+        page_size: Optional[int] = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Every row of `table` ordered by `key`, keyset-paged so the
+        connection lock isn't held while the caller works. `where` is a
+        PostgREST filter hook and has no equivalent here."""
+        if where is not None:
+            raise TypeError("SqliteDatabase.iter_rows does not take a PostgREST `where`")
+        size = page_size or self.settings.read_page_size
+        names = [c.strip() for c in columns.split(",") if c.strip()]
+        if "*" in names:
+            select = "*"
+        else:
+            select = ", ".join(_ident(c) for c in dict.fromkeys(names + [key]))
+        last: Any = None
+        while True:
+            cond = f"WHERE {_ident(key)} > ?" if last is not None else ""
+            page = self._select(
+                table,
+                f"SELECT {select} FROM {_ident(table)} {cond} ORDER BY {_ident(key)} LIMIT ?",
+                ([last] if last is not None else []) + [size],
+            )
+            if not page:
+                return
+            yield from page
+            last = page[-1].get(key)
+
+    def _select_ipos(self, columns: list[str], slugs: list[str]) -> list[dict[str, Any]]:
+        self._ensure_columns("ipos", columns)
+        marks = ", ".join("?" * len(slugs))
+        cols = ", ".join(_ident(c) for c in columns)
+        return self._select("ipos", f"SELECT {cols} FROM ipos WHERE slug IN ({marks})", slugs)
+
+    def fetch_ipos_missing_detail(self, limit: int) -> list[dict[str, Any]]:
+        self._checkpoint()  # read from the DB: buffered rows must be there
+        return self._select(
+            "ipos",
+            "SELECT slug, ipo_name, company_name, category, status,"
+            "       detail_url, open_date, last_scraped_at"
+            "  FROM ipos"
+            " WHERE detail_url IS NOT NULL"
+            "   AND status IN ('upcoming', 'open', 'closed', 'listed')"
+            " ORDER BY open_date IS NOT NULL, open_date DESC"
+            " LIMIT ?",
+            [limit],
+        )
+
+    def fetch_ipos_missing_history(self, limit: int) -> list[dict[str, Any]]:
+        # The anti-join from sql/0005.
+        self._checkpoint()  # read from the DB: buffered rows must be there
+        return self._select(
+            "ipos",
+            "SELECT i.slug, i.ipo_name, i.detail_url, i.open_date, i.status"
+            "  FROM ipos i"
+            " WHERE i.detail_url IS NOT NULL"
+            "   AND i.status IN ('closed', 'listed', 'open', 'upcoming')"
+            "   AND NOT ("
+            "           EXISTS (SELECT 1 FROM gmp_history g WHERE g.ipo_slug = i.slug)"
+            "       AND EXISTS (SELECT 1 FROM subscription_history s WHERE s.ipo_slug = i.slug)"
+            "   )"
+            " ORDER BY i.open_date IS NULL, i.open_date ASC"
+            " LIMIT ?",
+            [max(limit, 0)],
+        )
+
+    # -------------------------------------------------------------- #
+    # ipos writes
+    # -------------------------------------------------------------- #
+
+    def _upsert_chunk(self, chunk: list[dict[str, Any]]) -> None:
+        # Every row in `chunk` has the same columns (see _send_upserts).
+        columns = sorted(chunk[0])
+        self._ensure_columns("ipos", columns)
+        updates = [c for c in columns if c != "slug"]
+        on_conflict = (
+            "DO UPDATE SET " + ", ".join(f"{_ident(c)} = excluded.{_ident(c)}" for c in updates)
+            if updates
+            else "DO NOTHING"
+        )
+        query = (
+            f"INSERT INTO ipos ({', '.join(map(_ident, columns))})"
+            f" VALUES ({', '.join('?' * len(columns))})"
+            f" ON CONFLICT (slug) {on_conflict}"
+        )
+        rows = [[_encode(r[c]) for c in columns] for r in chunk]
+        self._tx(lambda conn: conn.executemany(query, rows))
+
+    def _send_updates(self, updates: dict[str, dict[str, Any]]) -> int:
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for slug, changes in updates.items():
+            groups.setdefault(tuple(sorted(changes)), []).append({**changes, "slug": slug})
+        sent = 0
+        for columns, group in groups.items():
+            self._ensure_columns("ipos", columns)
+            query = "UPDATE ipos SET {} WHERE slug = ?".format(
+                ", ".join(f"{_ident(c)} = ?" for c in columns)
+            )
+            for chunk in _chunks(group, self._write_chunk_size):
+                params = [[_encode(r[c]) for c in columns] + [r["slug"]] for r in chunk]
+                sent += self._tx(lambda conn: conn.executemany(query, params).rowcount)
+                self._remember(chunk, insert=False)
+                self._note_written({r["slug"]: r for r in chunk}, insert=False)
+        if sent:
+            log.info("bulk-updated ipos", extra={"records": sent})
+        return sent
+
+    def _touch_chunk(self, slugs: list[str], stamp: str) -> int:
+        marks = ", ".join("?" * len(slugs))
+        query = f"UPDATE ipos SET {_ident(_TOUCH_COLUMN)} = ? WHERE slug IN ({marks})"
+        return self._tx(lambda conn: conn.execute(query, [stamp, *slugs]).rowcount)
+
+    # -------------------------------------------------------------- #
+    # history tables
+    # -------------------------------------------------------------- #
+
+    def _append(self, table: str, rows: Iterable[dict[str, Any]]) -> int:
+        items = [_sanitize(r) for r in rows if r.get("ipo_slug")]
+        if not items:
+            return 0
+        sent = self._insert(table, items, "")
+        log.info("appended history", extra={"records": sent, "source": table})
+        return sent
+
+    def _append_observations(self, table: str, items: list[dict[str, Any]], key: tuple[str, ...]) -> int:
+        inserted = self._insert(
+            table,
+            _stamp_observations(items),
+            f"ON CONFLICT ({', '.join(key)}) DO NOTHING",
+        )
+        log.info("appended history", extra={"records": inserted, "source": table})
+        return inserted
+
+    def _history_stamps(self, table: str, slugs: list[str]) -> list[dict[str, Any]]:
+        out: list[dict[str, Any]] = []
+        for chunk in _chunks(slugs, self._in_list_size):
+            marks = ", ".join("?" * len(chunk))
+            query = f"SELECT ipo_slug, scraped_at FROM {_ident(table)} WHERE ipo_slug IN ({marks})"
+            out.extend(self._select(table, query, chunk))
+        return out
+
+    def _latest_history(self, table: str, slugs: list[str]) -> list[dict[str, Any]]:
+        marks = ", ".join("?" * len(slugs))
+        rows = self._select(
+            table,
+            "SELECT * FROM ("
+            "  SELECT *, ROW_NUMBER() OVER ("
+            "           PARTITION BY ipo_slug, source ORDER BY scraped_at DESC, id DESC"
+            "         ) AS _rank"
+            f"   FROM {_ident(table)} WHERE ipo_slug IN ({marks})"
+            ") WHERE _rank = 1",
+            slugs,
+        )
+        for r in rows:
+            r.pop("_rank", None)
+        return rows
+
+    def _insert(self, table: str, rows: list[dict[str, Any]], tail: str) -> int:
+        """INSERT `rows` grouped by column set (a missing column gets its
+        default, not NULL). Returns rows actually inserted."""
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for r in rows:
+            groups.setdefault(tuple(sorted(r)), []).append(r)
+        for columns in groups:
+            self._ensure_columns(table, columns)
+
+        def go(conn: sqlite3.Connection) -> int:
+            before = conn.total_changes
+            for columns, group in groups.items():
+                query = (
+                    f"INSERT INTO {_ident(table)} ({', '.join(map(_ident, columns))})"
+                    f" VALUES ({', '.join('?' * len(columns))}) {tail}"
+                )
+                conn.executemany(query, [[_encode(r[c]) for c in columns] for r in group])
+            return conn.total_changes - before
+
+        return self._tx(go)
+
+    def seed(self, table: str, rows: list[dict[str, Any]]) -> int:
+        """Insert `rows` as they are, e.g. a cassette's recorded snapshot."""
+        items = [_sanitize(r) for r in rows]
+        return self._insert(table, items, "") if items else 0
+
+    # -------------------------------------------------------------- #
+    # history maintenance
+    # -------------------------------------------------------------- #
+
+    def ensure_history_partitions(self, months_ahead: int) -> Optional[int]:
+        return 0  # no partitions in SQLite
+
+    def refresh_history_rollups(self, since: str) -> Optional[int]:
+        """What sql/0010's refresh_history_rollups does, in SQLite."""
+
+        def go(conn: sqlite3.Connection) -> int:
+            before = conn.total_changes
+            for table, (rollup, ohlc, last) in _ROLLUPS.items():
+                row = conn.execute(
+                    "SELECT last_id FROM history_rollup_state WHERE table_name = ?", [table]
+                ).fetchone()
+                seen = row[0] if row else 0
+                top = conn.execute(f"SELECT max(id) FROM {table} WHERE id > ?", [seen]).fetchone()[0]
+                conn.execute(_rollup_sql(table, rollup, ohlc, last), [seen, since])
+                conn.execute(
+                    "INSERT INTO history_rollup_state (table_name, last_id, refreshed_at)"
+                    " VALUES (?, ?, strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))"
+                    " ON CONFLICT (table_name) DO UPDATE"
+                    " SET last_id = excluded.last_id, refreshed_at = excluded.refreshed_at",
+                    [table, top if top is not None else seen],
+                )
+            # Less the history_rollup_state upserts.
+            return conn.total_changes - before - len(_ROLLUPS)
+
+        return self._tx(go)
+
+    def prune_history(self, before: str) -> Optional[int]:
+        """What sql/0010's prune_history does, in SQLite."""
+
+        def go(conn: sqlite3.Connection) -> int:
+            deleted = 0
+            for table, (rollup, _, _) in _ROLLUPS.items():
+                deleted += conn.execute(
+                    f"DELETE FROM {table}"
+                    "  WHERE observation_date IS NULL AND scraped_at < ?"
+                    "    AND scraped_at < ("
+                    f"       SELECT d.last_scraped_at FROM {rollup} d"
+                    f"        WHERE d.ipo_slug = {table}.ipo_slug AND d.source = {table}.source"
+                    f"          AND d.day = substr({table}.scraped_at, 1, 10))",
+                    [before],
+                ).rowcount
+            return deleted
+
+        return self._tx(go)
+
+    # -------------------------------------------------------------- #
+    # scraping_runs
+    # -------------------------------------------------------------- #
+
+    def _insert_run(self, row: dict[str, Any]) -> int:
+        query = "INSERT INTO scraping_runs ({}) VALUES ({})".format(
+            ", ".join(map(_ident, row)), ", ".join("?" * len(row))
+        )
+        return self._tx(lambda conn: conn.execute(query, [_encode(v) for v in row.values()]).lastrowid)
+
+    def _update_run(self, row_id: int, payload: dict[str, Any]) -> None:
+        query = "UPDATE scraping_runs SET {} WHERE id = ?".format(
+            ", ".join(f"{_ident(k)} = ?" for k in payload)
+        )
+        self._tx(lambda conn: conn.execute(query, [_encode(v) for v in payload.values()] + [row_id]))
+
+    def _run_logged(self, run_id: str, source: str) -> bool:
+        query = "SELECT 1 FROM scraping_runs WHERE run_id = ? AND source = ? LIMIT 1"
+        return bool(self._select("scraping_runs", query, [run_id, source]))
+
+
+# History table → (daily rollup table, (column, prefix) rolled up as
+# <prefix>_open/high/low/close, columns whose last non-NULL value is kept).
+_ROLLUPS: dict[str, tuple[str, Optional[tuple[str, str]], tuple[str, ...]]] = {
+    "gmp_history": (
+        "gmp_daily",
+        ("gmp_amount", "gmp"),
+        ("gmp_percentage", "kostak_rate", "subject_rate", "issue_price", "expected_listing_price"),
+    ),
+    "subscription_history": (
+        "subscription_daily",
+        None,
+        (
+            "subscription_retail",
+            "subscription_nii",
+            "subscription_bnii",
+            "subscription_snii",
+            "subscription_qib",
+            "subscription_employee",
+            "subscription_shareholder",
+            "subscription_total",
+            "day_number",
+        ),
+    ),
+}
+
+
+def _rollup_sql(table: str, rollup: str, ohlc: Optional[tuple[str, str]], last: tuple[str, ...]) -> str:
+    """Upsert the rollups of every (ipo_slug, source, UTC day) of `table`
+    with a row past id ? or scraped at or after ?. Keeps an existing
+    rollup built from more rows (the day was pruned since)."""
+    key = "PARTITION BY ipo_slug, source, day"
+    windows, aggregates = [], []
+    if ohlc:
+        col, prefix = ohlc
+        windows += [
+            f"first_value({col}) OVER ({key} ORDER BY {col} IS NULL, scraped_at, id) AS _open",
+            f"first_value({col}) OVER ({key} ORDER BY {col} IS NULL, scraped_at DESC, id DESC) AS _close",
+        ]
+        aggregates += [
+            f"max(_open) AS {prefix}_open",
+            f"max({col}) AS {prefix}_high",
+            f"min({col}) AS {prefix}_low",
+            f"max(_close) AS {prefix}_close",
+        ]
+    for col in last:
+        windows.append(f"first_value({col}) OVER ({key} ORDER BY {col} IS NULL, scraped_at DESC, id DESC) AS _last_{col}")
+        aggregates.append(f"max(_last_{col}) AS {col}")
+    aggregates += [
+        "count(*) AS samples",
+        "min(scraped_at) AS first_scraped_at",
+        "max(scraped_at) AS last_scraped_at",
+    ]
+    columns = ["ipo_slug", "source", "day"] + [a.rsplit(" AS ", 1)[1] for a in aggregates]
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns[3:])
+    return (
+        "WITH touched AS ("
+        f"  SELECT DISTINCT ipo_slug, source, substr(scraped_at, 1, 10) AS day FROM {table}"
+        "    WHERE id > ? OR scraped_at >= ?"
+        "), obs AS ("
+        f"  SELECT h.*, t.day FROM touched t JOIN {table} h"
+        "      ON h.ipo_slug = t.ipo_slug AND h.source = t.source"
+        "     AND h.scraped_at >= t.day AND h.scraped_at < date(t.day, '+1 day')"
+        "), ranked AS ("
+        f"  SELECT *, {', '.join(windows)} FROM obs"
+        ")"
+        f" INSERT INTO {rollup} ({', '.join(columns)})"
+        f" SELECT ipo_slug, source, day, {', '.join(aggregates)}"
+        "   FROM ranked WHERE true GROUP BY ipo_slug, source, day"
+        f" ON CONFLICT (ipo_slug, source, day) DO UPDATE SET {updates}"
+        f"  WHERE excluded.samples >= {rollup}.samples"
+    )
+
+
+def _ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+# SQLITE_BUSY, SQLITE_LOCKED, SQLITE_IOERR, SQLITE_FULL (primary codes).
+_TRANSIENT_SQLITE_CODES = (5, 6, 10, 13)
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _decode(row: sqlite3.Row, types: dict[str, str]) -> dict[str, Any]:
+    out: dict[str, Any] = {}
+    for k in row.keys():
+        v = row[k]
+        if isinstance(v, str) and types.get(k) in _JSON_TYPES:
+            try:
+                v = json.loads(v)
+            except ValueError:
+                pass
+        elif types.get(k) == "BOOLEAN" and v is not None:
+            v = bool(v)
+        out[k] = v
+    return out
@@ -0,0 +1,17 @@
+-- ============================================================
+-- 0003_skip_reason — record why a source did no work.
+--
+-- Sources now short-circuit when a page answers 304 Not Modified
+-- ("not-modified") or when the content they read hashes the same as
+-- on the last successful run ("unchanged-content"). The reason lands
+-- here so the amount of avoided work is queryable:
+--
+--   select source, skip_reason, count(*)
+--   from scraping_runs
+--   where started_at > now() - interval '7 days'
+--   group by 1, 2 order by 1, 2;
+--
+-- Idempotent. Safe to re-run.
+-- ============================================================
+
+ALTER TABLE public.scraping_runs ADD COLUMN IF NOT EXISTS skip_reason text;
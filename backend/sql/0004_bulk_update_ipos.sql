@@ -0,0 +1,111 @@
+-- ============================================================
+-- 0004_bulk_update_ipos — partial updates of many IPOs in one call.
+--
+-- Enrichment sources (investorgain_gmp, chittorgarh_subscription,
+-- ipoji_shareholder_quota, calendar_events) only ever UPDATE existing
+-- rows with a partial payload. They can't use upsert — NOT NULL is
+-- checked on the INSERT side before ON CONFLICT resolves — so the
+-- pipeline used to send one PostgREST PATCH per IPO. This function
+-- takes the whole batch as JSON and applies it with one UPDATE … FROM:
+--
+--   select public.bulk_update_ipos('[
+--     {"slug": "acme-ipo", "changes": {"current_gmp": 42, "last_scraped_at": "…"}},
+--     {"slug": "foo-ipo",  "changes": {"subscription_total": 3.1}}
+--   ]'::jsonb);
+--
+-- Each row only has the columns named in its own `changes` touched;
+-- other columns keep their value. Unknown slugs are ignored (no
+-- insert); unknown column names raise, like PostgREST would. Returns
+-- the number of rows updated.
+--
+-- Called by Database.bulk_update_ipos via `rpc()`; the client falls
+-- back to per-row updates if this migration hasn't been applied.
+--
+-- Idempotent. Safe to re-run.
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION public.bulk_update_ipos(updates jsonb)
+RETURNS integer
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+    touched   text[];
+    unknown   text[];
+    set_list  text;
+    n         integer;
+BEGIN
+    IF updates IS NULL OR jsonb_typeof(updates) <> 'array' OR jsonb_array_length(updates) = 0 THEN
+        RETURN 0;
+    END IF;
+
+    -- Columns named anywhere in the batch.
+    SELECT array_agg(DISTINCT k)
+      INTO touched
+      FROM jsonb_array_elements(updates) u,
+           jsonb_object_keys(u->'changes') k
+     WHERE k <> 'slug';
+
+    IF touched IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    SELECT array_agg(k)
+      INTO unknown
+      FROM unnest(touched) k
+     WHERE NOT EXISTS (
+           SELECT 1 FROM information_schema.columns c
+            WHERE c.table_schema = 'public'
+              AND c.table_name = 'ipos'
+              AND c.column_name = k
+              AND c.is_generated = 'NEVER'
+     );
+    IF unknown IS NOT NULL THEN
+        RAISE EXCEPTION 'bulk_update_ipos: unknown column(s) %', unknown
+            USING ERRCODE = '42703';
+    END IF;
+
+    -- Column k takes the new value only for rows whose changes name it.
+    -- jsonb_populate_record over (current row || changes) does the
+    -- per-column type casting for us.
+    SELECT string_agg(
+               format('%1$I = CASE WHEN m.changes ? %2$L THEN (m.merged).%1$I ELSE t.%1$I END', k, k),
+               ', '
+           )
+      INTO set_list
+      FROM unnest(touched) k;
+
+    EXECUTE format(
+        $sql$
+        UPDATE public.ipos t
+           SET %s
+          FROM (
+                SELECT i.slug,
+                       u.changes,
+                       jsonb_populate_record(i, to_jsonb(i) || u.changes) AS merged
+                  FROM (
+                        -- Last entry wins if a slug appears twice.
+                        SELECT DISTINCT ON (e->>'slug')
+                               e->>'slug'     AS slug,
+                               e->'changes'   AS changes
+                          FROM jsonb_array_elements($1) WITH ORDINALITY AS x(e, ord)
+                         WHERE e->>'slug' IS NOT NULL
+                           AND jsonb_typeof(e->'changes') = 'object'
+                         ORDER BY e->>'slug', ord DESC
+                       ) u
+                  JOIN public.ipos i ON i.slug = u.slug
+               ) m
+         WHERE t.slug = m.slug
+        $sql$,
+        set_list
+    ) USING updates;
+
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END;
+$$;
+
+-- Backend-only: the service role calls it, the public API does not.
+REVOKE ALL ON FUNCTION public.bulk_update_ipos(jsonb) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.bulk_update_ipos(jsonb) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.bulk_update_ipos(jsonb) TO service_role;
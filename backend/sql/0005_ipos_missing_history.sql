@@ -0,0 +1,49 @@
+-- ============================================================
+-- 0005_ipos_missing_history — backfill candidates computed in SQL.
+--
+-- chittorgarh_history_backfill wants IPOs with a detail_url that are
+-- missing gmp_history or subscription_history rows. The client used
+-- to download every ipo_slug from both history tables and diff them in
+-- Python — a payload that grows forever, and one PostgREST silently
+-- truncates at its max-rows limit (1000), so the answer was wrong as
+-- well as slow. This does the anti-join where the data lives:
+--
+--   select * from public.ipos_missing_history(10);
+--
+-- The EXISTS probes are served by idx_gmp_history_slug_time and
+-- idx_sub_history_slug_time (ipo_slug, scraped_at) from 0001.
+--
+-- Idempotent. Safe to re-run.
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION public.ipos_missing_history(max_rows integer)
+RETURNS TABLE (
+    slug       text,
+    ipo_name   text,
+    detail_url text,
+    open_date  text,
+    status     text
+)
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+    -- Casts keep the result shape independent of how the pre-existing
+    -- ipos columns were declared (varchar vs text, enum status, ...).
+    SELECT i.slug::text, i.ipo_name::text, i.detail_url::text, i.open_date::text, i.status::text
+      FROM public.ipos i
+     WHERE i.detail_url IS NOT NULL
+       AND i.status IN ('closed', 'listed', 'open', 'upcoming')
+       -- Only IPOs already covered by *both* histories are done.
+       AND NOT (
+               EXISTS (SELECT 1 FROM public.gmp_history g WHERE g.ipo_slug = i.slug)
+           AND EXISTS (SELECT 1 FROM public.subscription_history s WHERE s.ipo_slug = i.slug)
+       )
+     -- Oldest first: listed/closed IPOs that predate the pipeline.
+     ORDER BY i.open_date ASC NULLS LAST
+     LIMIT greatest(max_rows, 0);
+$$;
+
+REVOKE ALL ON FUNCTION public.ipos_missing_history(integer) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.ipos_missing_history(integer) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.ipos_missing_history(integer) TO service_role;
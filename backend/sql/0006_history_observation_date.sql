@@ -0,0 +1,82 @@
+-- ============================================================
+-- 0006_history_observation_date — unique daily observations.
+--
+-- The detail scraper and history backfill re-read Chittorgarh's
+-- day-wise GMP / subscription tables on every pass. Dedupe used to
+-- select every (ipo_slug, scraped_at) for the batch's IPOs and diff
+-- dates in Python — a full read of each IPO's history per pass, blind
+-- to `source`, and racy when two workflow runs overlap.
+--
+-- Rows that represent "the value on day D" now carry
+-- `observation_date = D`, and a unique index on
+-- (ipo_slug, source, observation_date) lets the client insert with
+-- ON CONFLICT DO NOTHING (PostgREST `resolution=ignore-duplicates`).
+--
+-- Live intraday snapshots (investorgain_gmp, ipowatch_gmp,
+-- chittorgarh_subscription) leave observation_date NULL. NULLs never
+-- collide in a unique index, so those keep appending every run.
+--
+-- Backfill is non-destructive: for existing trend rows (stamped at
+-- UTC midnight by the parser) only the first row per key gets its
+-- observation_date; older duplicates stay, with NULL.
+--
+-- Idempotent. Safe to re-run.
+-- ============================================================
+
+ALTER TABLE public.gmp_history          ADD COLUMN IF NOT EXISTS observation_date date;
+ALTER TABLE public.subscription_history ADD COLUMN IF NOT EXISTS observation_date date;
+
+WITH firsts AS (
+    SELECT DISTINCT ON (ipo_slug, source, (scraped_at AT TIME ZONE 'UTC')::date)
+           id, (scraped_at AT TIME ZONE 'UTC')::date AS d
+      FROM public.gmp_history
+     WHERE observation_date IS NULL
+       AND source IN ('chittorgarh_detail', 'chittorgarh_history_backfill')
+       AND (scraped_at AT TIME ZONE 'UTC')::time = '00:00'
+     ORDER BY ipo_slug, source, (scraped_at AT TIME ZONE 'UTC')::date, id
+)
+UPDATE public.gmp_history h
+   SET observation_date = f.d
+  FROM firsts f
+ WHERE h.id = f.id
+   AND NOT EXISTS (
+       SELECT 1 FROM public.gmp_history o
+        WHERE o.ipo_slug = h.ipo_slug
+          AND o.source = h.source
+          AND o.observation_date = f.d
+   );
+
+WITH firsts AS (
+    SELECT DISTINCT ON (ipo_slug, source, (scraped_at AT TIME ZONE 'UTC')::date)
+           id, (scraped_at AT TIME ZONE 'UTC')::date AS d
+      FROM public.subscription_history
+     WHERE observation_date IS NULL
+       AND source IN ('chittorgarh_detail', 'chittorgarh_history_backfill')
+       AND (scraped_at AT TIME ZONE 'UTC')::time = '00:00'
+     ORDER BY ipo_slug, source, (scraped_at AT TIME ZONE 'UTC')::date, id
+)
+UPDATE public.subscription_history h
+   SET observation_date = f.d
+  FROM firsts f
+ WHERE h.id = f.id
+   AND NOT EXISTS (
+       SELECT 1 FROM public.subscription_history o
+        WHERE o.ipo_slug = h.ipo_slug
+          AND o.source = h.source
+          AND o.observation_date = f.d
+   );
+
+-- Checked by name rather than IF NOT EXISTS: once 0009 has partitioned
+-- the tables, Postgres rejects this column list before looking at the
+-- name (0009 keeps the name, with scraped_at added).
+DO $$
+BEGIN
+    IF to_regclass('public.uq_gmp_history_observation') IS NULL THEN
+        CREATE UNIQUE INDEX uq_gmp_history_observation
+            ON public.gmp_history (ipo_slug, source, observation_date);
+    END IF;
+    IF to_regclass('public.uq_sub_history_observation') IS NULL THEN
+        CREATE UNIQUE INDEX uq_sub_history_observation
+            ON public.subscription_history (ipo_slug, source, observation_date);
+    END IF;
+END $$;
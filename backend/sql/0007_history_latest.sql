@@ -0,0 +1,58 @@
+-- ============================================================
+-- 0007_history_latest — last observation per (ipo_slug, source).
+--
+-- The live sources (investorgain_gmp, ipowatch_gmp,
+-- chittorgarh_subscription) used to append a row for every listed
+-- IPO on every `hot` run, whether or not the number had moved. With
+-- Settings.history_change_only the client now appends a row only when
+-- it differs from the last stored one for that (ipo_slug, source), or
+-- when that one is older than the heartbeat. To compare, it fetches
+-- the last stored rows once per run for the slugs in the batch:
+--
+--   select * from public.latest_gmp_history(array['acme-ipo', 'foo-ipo']);
+--
+-- Served by the new (ipo_slug, source, scraped_at DESC) indexes: one
+-- index probe per key instead of a walk over each IPO's history.
+-- Without this migration the client reads the batch's history rows
+-- and picks the latest itself (with a warning).
+--
+-- Idempotent. Safe to re-run.
+-- ============================================================
+
+CREATE INDEX IF NOT EXISTS idx_gmp_history_slug_source_time
+    ON public.gmp_history (ipo_slug, source, scraped_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_sub_history_slug_source_time
+    ON public.subscription_history (ipo_slug, source, scraped_at DESC);
+
+CREATE OR REPLACE FUNCTION public.latest_gmp_history(slugs text[])
+RETURNS SETOF public.gmp_history
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+    SELECT DISTINCT ON (ipo_slug, source) *
+      FROM public.gmp_history
+     WHERE ipo_slug = ANY(slugs)
+     ORDER BY ipo_slug, source, scraped_at DESC, id DESC;
+$$;
+
+CREATE OR REPLACE FUNCTION public.latest_subscription_history(slugs text[])
+RETURNS SETOF public.subscription_history
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+    SELECT DISTINCT ON (ipo_slug, source) *
+      FROM public.subscription_history
+     WHERE ipo_slug = ANY(slugs)
+     ORDER BY ipo_slug, source, scraped_at DESC, id DESC;
+$$;
+
+REVOKE ALL ON FUNCTION public.latest_gmp_history(text[]) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.latest_gmp_history(text[]) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.latest_gmp_history(text[]) TO service_role;
+
+REVOKE ALL ON FUNCTION public.latest_subscription_history(text[]) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.latest_subscription_history(text[]) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.latest_subscription_history(text[]) TO service_role;
@@ -0,0 +1,233 @@
+-- ============================================================
+-- 0008_latest_tables — latest value per (ipo_slug, source), kept
+-- up to date on insert.
+--
+-- `v_latest_gmp` / `v_latest_subscription` used to DISTINCT ON over
+-- the whole of gmp_history / subscription_history on every read:
+-- years of rows sorted to return one per IPO. They now read
+-- `latest_gmp` / `latest_subscription`, one row per
+-- (ipo_slug, source), so a page that lists every IPO touches
+-- O(#IPOs × sources) rows:
+--
+--   select * from public.v_latest_gmp where ipo_slug = 'acme-ipo';
+--
+-- The tables are maintained by statement-level AFTER INSERT triggers
+-- on the history tables, so every writer is covered (PostgREST,
+-- the direct Postgres backend's COPY, manual inserts). Each batch
+-- is folded in with one upsert; a row only replaces the stored one if
+-- it's at least as recent, so backfilling old trend rows leaves
+-- today's value alone. Reading the transition table instead of firing
+-- per row keeps a 5000-row backfill to one extra statement.
+--
+-- The views keep their columns and meaning (latest row per IPO
+-- across sources). Existing history is seeded below.
+--
+-- History stays append-only; the latest tables aren't touched on
+-- UPDATE or DELETE of history rows. After a manual cleanup, re-run
+-- this file to reseed.
+--
+-- Idempotent. Safe to re-run.
+-- ============================================================
+
+-- ---------- tables --------------------------------------------
+CREATE TABLE IF NOT EXISTS public.latest_gmp (
+    ipo_slug        text        NOT NULL,
+    source          text        NOT NULL,
+    gmp_amount      numeric,
+    gmp_percentage  numeric,
+    kostak_rate     numeric,
+    subject_rate    numeric,
+    issue_price     numeric,
+    expected_listing_price numeric,
+    scraped_at      timestamptz NOT NULL,
+    PRIMARY KEY (ipo_slug, source)
+);
+
+CREATE TABLE IF NOT EXISTS public.latest_subscription (
+    ipo_slug        text        NOT NULL,
+    source          text        NOT NULL,
+    subscription_retail      numeric,
+    subscription_nii         numeric,
+    subscription_bnii        numeric,
+    subscription_snii        numeric,
+    subscription_qib         numeric,
+    subscription_employee    numeric,
+    subscription_shareholder numeric,
+    subscription_total       numeric,
+    day_number      int,
+    scraped_at      timestamptz NOT NULL,
+    PRIMARY KEY (ipo_slug, source)
+);
+
+-- ---------- maintenance ---------------------------------------
+CREATE OR REPLACE FUNCTION public.fold_latest_gmp()
+RETURNS trigger
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+    INSERT INTO public.latest_gmp AS l (
+        ipo_slug, source, gmp_amount, gmp_percentage, kostak_rate,
+        subject_rate, issue_price, expected_listing_price, scraped_at
+    )
+    SELECT DISTINCT ON (ipo_slug, source)
+           ipo_slug, source, gmp_amount, gmp_percentage, kostak_rate,
+           subject_rate, issue_price, expected_listing_price, scraped_at
+      FROM new_rows
+     ORDER BY ipo_slug, source, scraped_at DESC, id DESC
+    ON CONFLICT (ipo_slug, source) DO UPDATE
+       SET gmp_amount             = EXCLUDED.gmp_amount,
+           gmp_percentage         = EXCLUDED.gmp_percentage,
+           kostak_rate            = EXCLUDED.kostak_rate,
+           subject_rate           = EXCLUDED.subject_rate,
+           issue_price            = EXCLUDED.issue_price,
+           expected_listing_price = EXCLUDED.expected_listing_price,
+           scraped_at             = EXCLUDED.scraped_at
+     WHERE l.scraped_at <= EXCLUDED.scraped_at;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.fold_latest_subscription()
+RETURNS trigger
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+    INSERT INTO public.latest_subscription AS l (
+        ipo_slug, source, subscription_retail, subscription_nii,
+        subscription_bnii, subscription_snii, subscription_qib,
+        subscription_employee, subscription_shareholder,
+        subscription_total, day_number, scraped_at
+    )
+    SELECT DISTINCT ON (ipo_slug, source)
+           ipo_slug, source, subscription_retail, subscription_nii,
+           subscription_bnii, subscription_snii, subscription_qib,
+           subscription_employee, subscription_shareholder,
+           subscription_total, day_number, scraped_at
+      FROM new_rows
+     ORDER BY ipo_slug, source, scraped_at DESC, id DESC
+    ON CONFLICT (ipo_slug, source) DO UPDATE
+       SET subscription_retail      = EXCLUDED.subscription_retail,
+           subscription_nii         = EXCLUDED.subscription_nii,
+           subscription_bnii        = EXCLUDED.subscription_bnii,
+           subscription_snii        = EXCLUDED.subscription_snii,
+           subscription_qib         = EXCLUDED.subscription_qib,
+           subscription_employee    = EXCLUDED.subscription_employee,
+           subscription_shareholder = EXCLUDED.subscription_shareholder,
+           subscription_total       = EXCLUDED.subscription_total,
+           day_number               = EXCLUDED.day_number,
+           scraped_at               = EXCLUDED.scraped_at
+     WHERE l.scraped_at <= EXCLUDED.scraped_at;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_gmp_history_latest ON public.gmp_history;
+CREATE TRIGGER trg_gmp_history_latest
+    AFTER INSERT ON public.gmp_history
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.fold_latest_gmp();
+
+DROP TRIGGER IF EXISTS trg_sub_history_latest ON public.subscription_history;
+CREATE TRIGGER trg_sub_history_latest
+    AFTER INSERT ON public.subscription_history
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.fold_latest_subscription();
+
+REVOKE ALL ON FUNCTION public.fold_latest_gmp() FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.fold_latest_subscription() FROM PUBLIC;
+
+-- ---------- seed from existing history ------------------------
+INSERT INTO public.latest_gmp AS l (
+    ipo_slug, source, gmp_amount, gmp_percentage, kostak_rate,
+    subject_rate, issue_price, expected_listing_price, scraped_at
+)
+SELECT DISTINCT ON (ipo_slug, source)
+       ipo_slug, source, gmp_amount, gmp_percentage, kostak_rate,
+       subject_rate, issue_price, expected_listing_price, scraped_at
+  FROM public.gmp_history
+ ORDER BY ipo_slug, source, scraped_at DESC, id DESC
+ON CONFLICT (ipo_slug, source) DO UPDATE
+   SET gmp_amount             = EXCLUDED.gmp_amount,
+       gmp_percentage         = EXCLUDED.gmp_percentage,
+       kostak_rate            = EXCLUDED.kostak_rate,
+       subject_rate           = EXCLUDED.subject_rate,
+       issue_price            = EXCLUDED.issue_price,
+       expected_listing_price = EXCLUDED.expected_listing_price,
+       scraped_at             = EXCLUDED.scraped_at;
+
+INSERT INTO public.latest_subscription AS l (
+    ipo_slug, source, subscription_retail, subscription_nii,
+    subscription_bnii, subscription_snii, subscription_qib,
+    subscription_employee, subscription_shareholder,
+    subscription_total, day_number, scraped_at
+)
+SELECT DISTINCT ON (ipo_slug, source)
+       ipo_slug, source, subscription_retail, subscription_nii,
+       subscription_bnii, subscription_snii, subscription_qib,
+       subscription_employee, subscription_shareholder,
+       subscription_total, day_number, scraped_at
+  FROM public.subscription_history
+ ORDER BY ipo_slug, source, scraped_at DESC, id DESC
+ON CONFLICT (ipo_slug, source) DO UPDATE
+   SET subscription_retail      = EXCLUDED.subscription_retail,
+       subscription_nii         = EXCLUDED.subscription_nii,
+       subscription_bnii        = EXCLUDED.subscription_bnii,
+       subscription_snii        = EXCLUDED.subscription_snii,
+       subscription_qib         = EXCLUDED.subscription_qib,
+       subscription_employee    = EXCLUDED.subscription_employee,
+       subscription_shareholder = EXCLUDED.subscription_shareholder,
+       subscription_total       = EXCLUDED.subscription_total,
+       day_number               = EXCLUDED.day_number,
+       scraped_at               = EXCLUDED.scraped_at;
+
+-- ---------- views ---------------------------------------------
+-- Same columns and meaning as in 0001: the latest row per IPO across
+-- all sources. Now a sort over one row per (ipo_slug, source).
+CREATE OR REPLACE VIEW public.v_latest_gmp AS
+SELECT DISTINCT ON (ipo_slug)
+    ipo_slug,
+    gmp_amount,
+    gmp_percentage,
+    kostak_rate,
+    subject_rate,
+    issue_price,
+    expected_listing_price,
+    source,
+    scraped_at
+FROM public.latest_gmp
+ORDER BY ipo_slug, scraped_at DESC;
+
+CREATE OR REPLACE VIEW public.v_latest_subscription AS
+SELECT DISTINCT ON (ipo_slug)
+    ipo_slug,
+    subscription_retail,
+    subscription_nii,
+    subscription_bnii,
+    subscription_snii,
+    subscription_qib,
+    subscription_employee,
+    subscription_shareholder,
+    subscription_total,
+    day_number,
+    source,
+    scraped_at
+FROM public.latest_subscription
+ORDER BY ipo_slug, scraped_at DESC;
+
+-- ---------- RLS: same as the history tables -------------------
+ALTER TABLE public.latest_gmp          ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.latest_subscription ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_policies WHERE tablename='latest_gmp' AND policyname='anon read latest_gmp') THEN
+        CREATE POLICY "anon read latest_gmp" ON public.latest_gmp
+            FOR SELECT TO anon USING (true);
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_policies WHERE tablename='latest_subscription' AND policyname='anon read latest_subscription') THEN
+        CREATE POLICY "anon read latest_subscription" ON public.latest_subscription
+            FOR SELECT TO anon USING (true);
+    END IF;
+END $$;
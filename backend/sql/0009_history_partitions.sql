@@ -0,0 +1,271 @@
+-- ============================================================
+-- 0009_history_partitions — monthly partitions for the history tables.
+--
+-- gmp_history and subscription_history grow every 30 minutes, forever.
+-- They become tables range-partitioned by scraped_at month:
+--
+--   gmp_history_p202610, gmp_history_p202611, …, gmp_history_default
+--
+-- so a chart or backfill check for a recent IPO touches a few small
+-- partitions (and their indexes) instead of one ever-growing heap, and
+-- old months can be vacuumed or pruned on their own.
+--
+-- Postgres can't turn an existing table into a partitioned one, so the
+-- first run of this file, inside one DO block:
+--   1. renames the table to <name>_unpartitioned;
+--   2. creates the partitioned table under the old name (same columns
+--      and defaults, same id sequence), with a partition for every
+--      month that has rows, the next three months, and a default;
+--   3. copies the rows over and drops the old table;
+--   4. rebuilds the indexes from 0001 / 0006 / 0007.
+-- It holds an exclusive lock for the copy: run it when no workflow is
+-- scraping. If anything else depends on the old table (a view of your
+-- own, say), the DROP fails and the whole block rolls back untouched.
+-- Later runs see the tables are already partitioned and skip it.
+--
+-- A unique index on a partitioned table has to include the partition
+-- key, so the daily-observation index from 0006 (same name, so 0006
+-- still re-runs cleanly) becomes
+-- (ipo_slug, source, observation_date, scraped_at). Dated rows are
+-- always stamped at UTC midnight of observation_date, so it allows
+-- exactly what the old one did; the client switches ON CONFLICT
+-- targets on its own.
+--
+-- New months need a partition before their rows arrive (otherwise they
+-- land in the default partition). The history_maintenance source calls
+--
+--   select public.ensure_history_partitions(3);
+--
+-- which creates this month's and the next three months' partitions,
+-- and moves rows that ended up in the default partition (e.g. history
+-- backfilled for a 2019 IPO) into partitions of their own.
+--
+-- Re-creates what dropping the old tables took with them: 0007's
+-- latest_* functions, 0008's triggers, the RLS policies from 0001.
+-- Apply 0008 first.
+--
+-- Idempotent. Safe to re-run.
+-- ============================================================
+
+-- ---------- partition helpers ---------------------------------
+CREATE OR REPLACE FUNCTION public.create_history_partition(parent text, month_start date)
+RETURNS boolean
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    lo   timestamptz := date_trunc('month', month_start::timestamp) AT TIME ZONE 'UTC';
+    hi   timestamptz := (date_trunc('month', month_start::timestamp) + interval '1 month') AT TIME ZONE 'UTC';
+    part text := format('%s_p%s', parent, to_char(month_start, 'YYYYMM'));
+BEGIN
+    IF to_regclass(format('public.%I', part)) IS NOT NULL THEN
+        RETURN false;
+    END IF;
+    EXECUTE format(
+        'CREATE TABLE public.%I (LIKE public.%I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        part, parent
+    );
+    -- Rows of this month that went to the default partition move first;
+    -- ATTACH refuses while the default still holds any.
+    IF to_regclass(format('public.%I', parent || '_default')) IS NOT NULL THEN
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM public.%I WHERE scraped_at >= $1 AND scraped_at < $2 RETURNING *)'
+            ' INSERT INTO public.%I SELECT * FROM moved',
+            parent || '_default', part
+        ) USING lo, hi;
+    END IF;
+    -- Builds the parent's indexes on the new partition as well.
+    EXECUTE format(
+        'ALTER TABLE public.%I ATTACH PARTITION public.%I FOR VALUES FROM (%L) TO (%L)',
+        parent, part, lo, hi
+    );
+    -- Partitions are read through the parent (which has the policies);
+    -- keep them out of the anon / authenticated API.
+    EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', part);
+    EXECUTE format('REVOKE ALL ON public.%I FROM anon, authenticated', part);
+    RETURN true;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.ensure_history_partitions(months_ahead integer)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    t text;
+    m date;
+    n integer := 0;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['gmp_history', 'subscription_history'] LOOP
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(format('public.%I', t))
+        ) THEN
+            CONTINUE;
+        END IF;
+        FOR m IN EXECUTE format(
+            'SELECT DISTINCT date_trunc(''month'', scraped_at AT TIME ZONE ''UTC'')::date FROM public.%I',
+            t || '_default'
+        ) LOOP
+            IF public.create_history_partition(t, m) THEN
+                n := n + 1;
+            END IF;
+        END LOOP;
+        FOR i IN 0 .. greatest(months_ahead, 0) LOOP
+            m := (date_trunc('month', now() AT TIME ZONE 'UTC') + make_interval(months => i))::date;
+            IF public.create_history_partition(t, m) THEN
+                n := n + 1;
+            END IF;
+        END LOOP;
+    END LOOP;
+    RETURN n;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.create_history_partition(text, date) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.create_history_partition(text, date) FROM anon, authenticated;
+
+REVOKE ALL ON FUNCTION public.ensure_history_partitions(integer) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.ensure_history_partitions(integer) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.ensure_history_partitions(integer) TO service_role;
+
+-- ---------- one-time conversion -------------------------------
+DO $$
+DECLARE
+    t     text;
+    old   text;
+    seq   text;
+    m     date;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['gmp_history', 'subscription_history'] LOOP
+        IF EXISTS (
+            SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(format('public.%I', t))
+        ) THEN
+            CONTINUE;
+        END IF;
+        old := t || '_unpartitioned';
+
+        EXECUTE format('ALTER TABLE public.%I RENAME TO %I', t, old);
+        -- 0007's function returns the old table's row type; re-created below.
+        EXECUTE format('DROP FUNCTION IF EXISTS public.%I(text[])', 'latest_' || t);
+        EXECUTE format(
+            'CREATE TABLE public.%I (LIKE public.%I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+            ' PARTITION BY RANGE (scraped_at)',
+            t, old
+        );
+        FOR m IN EXECUTE format(
+            'SELECT DISTINCT date_trunc(''month'', scraped_at AT TIME ZONE ''UTC'')::date FROM public.%I',
+            old
+        ) LOOP
+            PERFORM public.create_history_partition(t, m);
+        END LOOP;
+        FOR i IN 0 .. 3 LOOP
+            PERFORM public.create_history_partition(
+                t, (date_trunc('month', now() AT TIME ZONE 'UTC') + make_interval(months => i))::date
+            );
+        END LOOP;
+        EXECUTE format('CREATE TABLE public.%I PARTITION OF public.%I DEFAULT', t || '_default', t);
+        EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', t || '_default');
+        EXECUTE format('REVOKE ALL ON public.%I FROM anon, authenticated', t || '_default');
+
+        EXECUTE format('INSERT INTO public.%I SELECT * FROM public.%I', t, old);
+        -- Keep the bigserial sequence (and its position) alive past the DROP.
+        seq := pg_get_serial_sequence(format('public.%I', old), 'id');
+        IF seq IS NOT NULL THEN
+            EXECUTE format('ALTER SEQUENCE %s OWNED BY public.%I.id', seq, t);
+        END IF;
+        EXECUTE format('DROP TABLE public.%I', old);
+
+        -- The primary key has to carry the partition key too.
+        EXECUTE format('ALTER TABLE public.%I ADD PRIMARY KEY (id, scraped_at)', t);
+        RAISE NOTICE '% is now partitioned by month', t;
+    END LOOP;
+END $$;
+
+-- ---------- indexes (0001, 0006, 0007), per partition ---------
+CREATE INDEX IF NOT EXISTS idx_gmp_history_slug_time
+    ON public.gmp_history (ipo_slug, scraped_at DESC);
+CREATE INDEX IF NOT EXISTS idx_gmp_history_time
+    ON public.gmp_history (scraped_at DESC);
+CREATE INDEX IF NOT EXISTS idx_gmp_history_slug_source_time
+    ON public.gmp_history (ipo_slug, source, scraped_at DESC);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_gmp_history_observation
+    ON public.gmp_history (ipo_slug, source, observation_date, scraped_at);
+
+CREATE INDEX IF NOT EXISTS idx_sub_history_slug_time
+    ON public.subscription_history (ipo_slug, scraped_at DESC);
+CREATE INDEX IF NOT EXISTS idx_sub_history_slug_source_time
+    ON public.subscription_history (ipo_slug, source, scraped_at DESC);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_sub_history_observation
+    ON public.subscription_history (ipo_slug, source, observation_date, scraped_at);
+
+-- ---------- 0007: last observation per (ipo_slug, source) -----
+CREATE OR REPLACE FUNCTION public.latest_gmp_history(slugs text[])
+RETURNS SETOF public.gmp_history
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+    SELECT DISTINCT ON (ipo_slug, source) *
+      FROM public.gmp_history
+     WHERE ipo_slug = ANY(slugs)
+     ORDER BY ipo_slug, source, scraped_at DESC, id DESC;
+$$;
+
+CREATE OR REPLACE FUNCTION public.latest_subscription_history(slugs text[])
+RETURNS SETOF public.subscription_history
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+    SELECT DISTINCT ON (ipo_slug, source) *
+      FROM public.subscription_history
+     WHERE ipo_slug = ANY(slugs)
+     ORDER BY ipo_slug, source, scraped_at DESC, id DESC;
+$$;
+
+REVOKE ALL ON FUNCTION public.latest_gmp_history(text[]) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.latest_gmp_history(text[]) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.latest_gmp_history(text[]) TO service_role;
+
+REVOKE ALL ON FUNCTION public.latest_subscription_history(text[]) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.latest_subscription_history(text[]) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.latest_subscription_history(text[]) TO service_role;
+
+-- ---------- 0008: latest-value triggers ------------------------
+-- Statement-level with transition tables: allowed on the partitioned
+-- parent, and it sees rows routed to every partition.
+DROP TRIGGER IF EXISTS trg_gmp_history_latest ON public.gmp_history;
+CREATE TRIGGER trg_gmp_history_latest
+    AFTER INSERT ON public.gmp_history
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.fold_latest_gmp();
+
+DROP TRIGGER IF EXISTS trg_sub_history_latest ON public.subscription_history;
+CREATE TRIGGER trg_sub_history_latest
+    AFTER INSERT ON public.subscription_history
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.fold_latest_subscription();
+
+-- ---------- 0001: grants and RLS ------------------------------
+GRANT ALL ON TABLE public.gmp_history          TO service_role;
+GRANT ALL ON TABLE public.subscription_history TO service_role;
+GRANT SELECT ON TABLE public.gmp_history          TO anon, authenticated;
+GRANT SELECT ON TABLE public.subscription_history TO anon, authenticated;
+
+ALTER TABLE public.gmp_history          ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.subscription_history ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_policies WHERE tablename='gmp_history' AND policyname='anon read gmp_history') THEN
+        CREATE POLICY "anon read gmp_history" ON public.gmp_history
+            FOR SELECT TO anon USING (true);
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_policies WHERE tablename='subscription_history' AND policyname='anon read sub_history') THEN
+        CREATE POLICY "anon read sub_history" ON public.subscription_history
+            FOR SELECT TO anon USING (true);
+    END IF;
+END $$;
@@ -0,0 +1,317 @@
+-- ============================================================
+-- 0010_history_rollups — daily rollups of the history tables, and
+-- pruning of old intraday rows.
+--
+-- Charts and reports that want "GMP per day" shouldn't have to read
+-- every 30-minute snapshot. Two rollup tables hold one row per
+-- (ipo_slug, source, UTC day):
+--
+--   gmp_daily           open / high / low / close of gmp_amount, and
+--                       the day's last gmp_percentage, kostak_rate,
+--                       subject_rate, issue_price, expected_listing_price
+--   subscription_daily  the day's last value of every subscription
+--                       category, and day_number
+--
+-- both with `samples` (history rows that day) and the first / last
+-- scraped_at. "Last" means the latest non-NULL value.
+--
+-- The history_maintenance source keeps them current:
+--
+--   select public.refresh_history_rollups(now() - interval '1 day');
+--
+-- recomputes every day that got history rows since the previous call
+-- (tracked by id in history_rollup_state), plus every day with rows
+-- scraped at or after `since`. The first call builds everything. Rows
+-- committed out of id order by a transaction still open during a
+-- refresh are picked up by the `since` window, or by the next refresh
+-- of their day; `refresh_history_rollups('-infinity')` rebuilds all.
+--
+--   select public.prune_history(date_trunc('month', now()) - interval '6 months');
+--
+-- deletes live intraday rows (observation_date IS NULL) scraped before
+-- the cutoff. For each (ipo_slug, source, day) it keeps the last row,
+-- and only touches days that already have a rollup, so the raw history
+-- still has a daily point per IPO and source. The backfill check and
+-- the latest_* lookups see the same IPOs as before. Day-wise rows from
+-- the detail / backfill scrapers are never pruned. A recomputed day
+-- never replaces a rollup built from more rows, so pruning doesn't
+-- degrade the rollups.
+--
+-- Works with or without the partitioning from 0009.
+--
+-- Idempotent. Safe to re-run.
+-- ============================================================
+
+-- ---------- tables --------------------------------------------
+CREATE TABLE IF NOT EXISTS public.gmp_daily (
+    ipo_slug        text        NOT NULL,
+    source          text        NOT NULL,
+    day             date        NOT NULL,
+    gmp_open        numeric,
+    gmp_high        numeric,
+    gmp_low         numeric,
+    gmp_close       numeric,
+    gmp_percentage  numeric,
+    kostak_rate     numeric,
+    subject_rate    numeric,
+    issue_price     numeric,
+    expected_listing_price numeric,
+    samples         int         NOT NULL,
+    first_scraped_at timestamptz NOT NULL,
+    last_scraped_at  timestamptz NOT NULL,
+    PRIMARY KEY (ipo_slug, source, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_gmp_daily_day ON public.gmp_daily (day DESC);
+
+CREATE TABLE IF NOT EXISTS public.subscription_daily (
+    ipo_slug        text        NOT NULL,
+    source          text        NOT NULL,
+    day             date        NOT NULL,
+    subscription_retail      numeric,
+    subscription_nii         numeric,
+    subscription_bnii        numeric,
+    subscription_snii        numeric,
+    subscription_qib         numeric,
+    subscription_employee    numeric,
+    subscription_shareholder numeric,
+    subscription_total       numeric,
+    day_number      int,
+    samples         int         NOT NULL,
+    first_scraped_at timestamptz NOT NULL,
+    last_scraped_at  timestamptz NOT NULL,
+    PRIMARY KEY (ipo_slug, source, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sub_daily_day ON public.subscription_daily (day DESC);
+
+-- Highest history id already rolled up, per history table.
+CREATE TABLE IF NOT EXISTS public.history_rollup_state (
+    table_name   text PRIMARY KEY,
+    last_id      bigint      NOT NULL DEFAULT 0,
+    refreshed_at timestamptz
+);
+
+-- ---------- refresh -------------------------------------------
+CREATE OR REPLACE FUNCTION public.refresh_history_rollups(since timestamptz)
+RETURNS integer
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+    seen    bigint;
+    top     bigint;
+    written integer;
+    n       integer := 0;
+BEGIN
+    -- gmp_history → gmp_daily
+    SELECT s.last_id INTO seen FROM public.history_rollup_state s WHERE s.table_name = 'gmp_history';
+    seen := coalesce(seen, 0);
+    SELECT max(id) INTO top FROM public.gmp_history WHERE id > seen;
+
+    WITH touched AS (
+        SELECT DISTINCT ipo_slug, source, (scraped_at AT TIME ZONE 'UTC')::date AS day
+          FROM public.gmp_history
+         WHERE id > seen OR scraped_at >= since
+    ), days AS (
+        SELECT t.ipo_slug, t.source, t.day,
+               (array_agg(h.gmp_amount ORDER BY h.scraped_at, h.id)
+                    FILTER (WHERE h.gmp_amount IS NOT NULL))[1]                AS gmp_open,
+               max(h.gmp_amount)                                               AS gmp_high,
+               min(h.gmp_amount)                                               AS gmp_low,
+               (array_agg(h.gmp_amount ORDER BY h.scraped_at DESC, h.id DESC)
+                    FILTER (WHERE h.gmp_amount IS NOT NULL))[1]                AS gmp_close,
+               (array_agg(h.gmp_percentage ORDER BY h.scraped_at DESC, h.id DESC)
+                    FILTER (WHERE h.gmp_percentage IS NOT NULL))[1]            AS gmp_percentage,
+               (array_agg(h.kostak_rate ORDER BY h.scraped_at DESC, h.id DESC)
+                    FILTER (WHERE h.kostak_rate IS NOT NULL))[1]               AS kostak_rate,
+               (array_agg(h.subject_rate ORDER BY h.scraped_at DESC, h.id DESC)
+                    FILTER (WHERE h.subject_rate IS NOT NULL))[1]              AS subject_rate,
+               (array_agg(h.issue_price ORDER BY h.scraped_at DESC, h.id DESC)
+                    FILTER (WHERE h.issue_price IS NOT NULL))[1]               AS issue_price,
+               (array_agg(h.expected_listing_price ORDER BY h.scraped_at DESC, h.id DESC)
+                    FILTER (WHERE h.expected_listing_price IS NOT NULL))[1]    AS expected_listing_price,
+               count(*)          AS samples,
+               min(h.scraped_at) AS first_scraped_at,
+               max(h.scraped_at) AS last_scraped_at
+          FROM touched t
+          JOIN public.gmp_history h
+            ON h.ipo_slug = t.ipo_slug
+           AND h.source = t.source
+           AND h.scraped_at >= t.day::timestamp AT TIME ZONE 'UTC'
+           AND h.scraped_at <  (t.day + 1)::timestamp AT TIME ZONE 'UTC'
+         GROUP BY t.ipo_slug, t.source, t.day
+    )
+    INSERT INTO public.gmp_daily AS d (
+        ipo_slug, source, day, gmp_open, gmp_high, gmp_low, gmp_close,
+        gmp_percentage, kostak_rate, subject_rate, issue_price,
+        expected_listing_price, samples, first_scraped_at, last_scraped_at
+    )
+    SELECT ipo_slug, source, day, gmp_open, gmp_high, gmp_low, gmp_close,
+           gmp_percentage, kostak_rate, subject_rate, issue_price,
+           expected_listing_price, samples, first_scraped_at, last_scraped_at
+      FROM days
+    ON CONFLICT (ipo_slug, source, day) DO UPDATE
+       SET gmp_open               = EXCLUDED.gmp_open,
+           gmp_high               = EXCLUDED.gmp_high,
+           gmp_low                = EXCLUDED.gmp_low,
+           gmp_close              = EXCLUDED.gmp_close,
+           gmp_percentage         = EXCLUDED.gmp_percentage,
+           kostak_rate            = EXCLUDED.kostak_rate,
+           subject_rate           = EXCLUDED.subject_rate,
+           issue_price            = EXCLUDED.issue_price,
+           expected_listing_price = EXCLUDED.expected_listing_price,
+           samples                = EXCLUDED.samples,
+           first_scraped_at       = EXCLUDED.first_scraped_at,
+           last_scraped_at        = EXCLUDED.last_scraped_at
+     -- A pruned day recomputes from fewer rows; keep what we had.
+     WHERE EXCLUDED.samples >= d.samples;
+    GET DIAGNOSTICS written = ROW_COUNT;
+    n := n + written;
+
+    INSERT INTO public.history_rollup_state (table_name, last_id, refreshed_at)
+    VALUES ('gmp_history', coalesce(top, seen), now())
+    ON CONFLICT (table_name) DO UPDATE
+       SET last_id = EXCLUDED.last_id, refreshed_at = EXCLUDED.refreshed_at;
+
+    -- subscription_history → subscription_daily
+    SELECT s.last_id INTO seen FROM public.history_rollup_state s WHERE s.table_name = 'subscription_history';
+    seen := coalesce(seen, 0);
+    SELECT max(id) INTO top FROM public.subscription_history WHERE id > seen;
+
+    WITH touched AS (
+        SELECT DISTINCT ipo_slug, source, (scraped_at AT TIME ZONE 'UTC')::date AS day
+          FROM public.subscription_history
+         WHERE id > seen OR scraped_at >= since
+    ), days AS (
+        SELECT t.ipo_slug, t.source, t.day,
+               (array_agg(h.subscription_retail ORDER BY h.scraped_at DESC, h.id DESC)
+                    FILTER (WHERE h.subscription_retail IS NOT NULL))[1]       AS subscription_retail,
+               (array_agg(h.subscription_nii ORDER BY h.scraped_at DESC, h.id DESC)
+                    FILTER (WHERE h.subscription_nii IS NOT NULL))[1]          AS subscription_nii,
+               (array_agg(h.subscription_bnii ORDER BY h.scraped_at DESC, h.id DESC)
+                    FILTER (WHERE h.subscription_bnii IS NOT NULL))[1]         AS subscription_bnii,
+               (array_agg(h.subscription_snii ORDER BY h.scraped_at DESC, h.id DESC)
+                    FILTER (WHERE h.subscription_snii IS NOT NULL))[1]         AS subscription_snii,
+               (array_agg(h.subscription_qib ORDER BY h.scraped_at DESC, h.id DESC)
+                    FILTER (WHERE h.subscription_qib IS NOT NULL))[1]          AS subscription_qib,
+               (array_agg(h.subscription_employee ORDER BY h.scraped_at DESC, h.id DESC)
+                    FILTER (WHERE h.subscription_employee IS NOT NULL))[1]     AS subscription_employee,
+               (array_agg(h.subscription_shareholder ORDER BY h.scraped_at DESC, h.id DESC)
+                    FILTER (WHERE h.subscription_shareholder IS NOT NULL))[1]  AS subscription_shareholder,
+               (array_agg(h.subscription_total ORDER BY h.scraped_at DESC, h.id DESC)
+                    FILTER (WHERE h.subscription_total IS NOT NULL))[1]        AS subscription_total,
+               (array_agg(h.day_number ORDER BY h.scraped_at DESC, h.id DESC)
+                    FILTER (WHERE h.day_number IS NOT NULL))[1]                AS day_number,
+               count(*)          AS samples,
+               min(h.scraped_at) AS first_scraped_at,
+               max(h.scraped_at) AS last_scraped_at
+          FROM touched t
+          JOIN public.subscription_history h
+            ON h.ipo_slug = t.ipo_slug
+           AND h.source = t.source
+           AND h.scraped_at >= t.day::timestamp AT TIME ZONE 'UTC'
+           AND h.scraped_at <  (t.day + 1)::timestamp AT TIME ZONE 'UTC'
+         GROUP BY t.ipo_slug, t.source, t.day
+    )
+    INSERT INTO public.subscription_daily AS d (
+        ipo_slug, source, day, subscription_retail, subscription_nii,
+        subscription_bnii, subscription_snii, subscription_qib,
+        subscription_employee, subscription_shareholder,
+        subscription_total, day_number, samples, first_scraped_at,
+        last_scraped_at
+    )
+    SELECT ipo_slug, source, day, subscription_retail, subscription_nii,
+           subscription_bnii, subscription_snii, subscription_qib,
+           subscription_employee, subscription_shareholder,
+           subscription_total, day_number, samples, first_scraped_at,
+           last_scraped_at
+      FROM days
+    ON CONFLICT (ipo_slug, source, day) DO UPDATE
+       SET subscription_retail      = EXCLUDED.subscription_retail,
+           subscription_nii         = EXCLUDED.subscription_nii,
+           subscription_bnii        = EXCLUDED.subscription_bnii,
+           subscription_snii        = EXCLUDED.subscription_snii,
+           subscription_qib         = EXCLUDED.subscription_qib,
+           subscription_employee    = EXCLUDED.subscription_employee,
+           subscription_shareholder = EXCLUDED.subscription_shareholder,
+           subscription_total       = EXCLUDED.subscription_total,
+           day_number               = EXCLUDED.day_number,
+           samples                  = EXCLUDED.samples,
+           first_scraped_at         = EXCLUDED.first_scraped_at,
+           last_scraped_at          = EXCLUDED.last_scraped_at
+     WHERE EXCLUDED.samples >= d.samples;
+    GET DIAGNOSTICS written = ROW_COUNT;
+    n := n + written;
+
+    INSERT INTO public.history_rollup_state (table_name, last_id, refreshed_at)
+    VALUES ('subscription_history', coalesce(top, seen), now())
+    ON CONFLICT (table_name) DO UPDATE
+       SET last_id = EXCLUDED.last_id, refreshed_at = EXCLUDED.refreshed_at;
+
+    RETURN n;
+END;
+$$;
+
+-- ---------- prune ---------------------------------------------
+CREATE OR REPLACE FUNCTION public.prune_history(before timestamptz)
+RETURNS integer
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+    deleted integer;
+    n       integer := 0;
+BEGIN
+    -- Strictly before the day's last_scraped_at: the last row stays.
+    DELETE FROM public.gmp_history h
+     USING public.gmp_daily d
+     WHERE h.scraped_at < before
+       AND h.observation_date IS NULL
+       AND d.ipo_slug = h.ipo_slug
+       AND d.source = h.source
+       AND d.day = (h.scraped_at AT TIME ZONE 'UTC')::date
+       AND h.scraped_at < d.last_scraped_at;
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+    n := n + deleted;
+
+    DELETE FROM public.subscription_history h
+     USING public.subscription_daily d
+     WHERE h.scraped_at < before
+       AND h.observation_date IS NULL
+       AND d.ipo_slug = h.ipo_slug
+       AND d.source = h.source
+       AND d.day = (h.scraped_at AT TIME ZONE 'UTC')::date
+       AND h.scraped_at < d.last_scraped_at;
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+    n := n + deleted;
+
+    RETURN n;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.refresh_history_rollups(timestamptz) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.refresh_history_rollups(timestamptz) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.refresh_history_rollups(timestamptz) TO service_role;
+
+REVOKE ALL ON FUNCTION public.prune_history(timestamptz) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.prune_history(timestamptz) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.prune_history(timestamptz) TO service_role;
+
+-- ---------- RLS: rollups readable like the history tables -----
+ALTER TABLE public.gmp_daily            ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.subscription_daily   ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.history_rollup_state ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_policies WHERE tablename='gmp_daily' AND policyname='anon read gmp_daily') THEN
+        CREATE POLICY "anon read gmp_daily" ON public.gmp_daily
+            FOR SELECT TO anon USING (true);
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_policies WHERE tablename='subscription_daily' AND policyname='anon read subscription_daily') THEN
+        CREATE POLICY "anon read subscription_daily" ON public.subscription_daily
+            FOR SELECT TO anon USING (true);
+    END IF;
+    -- history_rollup_state stays service-role only; no anon read policy.
+END $$;
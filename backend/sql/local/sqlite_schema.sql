@@ -0,0 +1,201 @@
+-- ============================================================
+-- SQLite schema for the local backend (DB_BACKEND=sqlite).
+--
+-- Not a migration — never run this against Supabase. It is the
+-- tables from 0001, 0002, 0003, 0006 and 0010 (plus the frontend-owned
+-- columns of `ipos` that predate them, and the indexes from 0007) in
+-- SQLite form, applied by pipeline/sqlite_db.py when it opens the
+-- file. No partitions (0009): SQLite has none. Keep it in step with new numbered migrations that add
+-- columns the pipeline writes.
+--
+-- Postgres types are kept as declared type names so the backend
+-- knows how to decode them: `jsonb` and `text_array` hold JSON text,
+-- `date` / `timestamptz` hold ISO-8601 strings (UTC), `boolean` is
+-- 0/1. Type affinity does the rest (numeric → REAL/INTEGER).
+--
+-- Idempotent. Safe to re-run.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS ipos (
+    id                       integer PRIMARY KEY,
+    slug                     text NOT NULL UNIQUE,
+    ipo_name                 text NOT NULL,
+    company_name             text,
+    category                 text,
+    status                   text,
+    issue_type               text,
+    issue_size_cr            numeric,
+    fresh_issue_size_cr      numeric,
+    ofs_size_cr              numeric,
+    lot_size                 integer,
+    min_price                numeric,
+    max_price                numeric,
+    issue_price              numeric,
+    final_price              numeric,
+    face_value               numeric,
+    open_date                date,
+    close_date               date,
+    allotment_date           date,
+    refund_date              date,
+    demat_credit_date        date,
+    listing_date             date,
+    parent_company           text,
+    company_description      text,
+    industry_sector          text,
+    company_website          text,
+    registrar                text,
+    registrar_website        text,
+    allotment_link           text,
+    allotment_link_active    boolean DEFAULT 0,
+    lead_managers            text_array,
+    exchange                 text_array,
+    drhp_status              text,
+    drhp_filed_date          date,
+    rhp_status               text,
+    rhp_filed_date           date,
+    sebi_approval_date       date,
+    current_gmp              numeric,
+    gmp_percentage           numeric,
+    expected_listing_price   numeric,
+    kostak_rate              numeric,
+    subject_rate             numeric,
+    subscription_retail      numeric,
+    subscription_nii         numeric,
+    subscription_bnii        numeric,
+    subscription_snii        numeric,
+    subscription_qib         numeric,
+    subscription_employee    numeric,
+    subscription_shareholder numeric,
+    subscription_total       numeric,
+    actual_listing_price     numeric,
+    listing_gain_percent     numeric,
+    about_company            text,
+    detail_url               text,
+    financials               jsonb DEFAULT '[]',
+    shareholding             jsonb DEFAULT '[]',
+    objectives               jsonb DEFAULT '[]',
+    faqs                     jsonb DEFAULT '[]',
+    documents                jsonb DEFAULT '[]',
+    anchor_investors         jsonb DEFAULT '[]',
+    comparables              jsonb DEFAULT '[]',
+    reviews                  jsonb DEFAULT '[]',
+    reservations             jsonb DEFAULT '[]',
+    risks                    jsonb DEFAULT '[]',
+    technical_analysis_data  jsonb DEFAULT '{}',
+    timeline_events          jsonb DEFAULT '[]',
+    shareholder_quota        boolean DEFAULT 0,
+    prospectus_url           text,
+    drhp_url                 text,
+    anchor_amount_cr         numeric,
+    is_featured              boolean DEFAULT 0,
+    last_scraped_at          timestamptz,
+    scrape_source            text,
+    data_quality_score       integer
+);
+
+CREATE INDEX IF NOT EXISTS idx_ipos_status    ON ipos (status);
+CREATE INDEX IF NOT EXISTS idx_ipos_open_date ON ipos (open_date);
+
+CREATE TABLE IF NOT EXISTS gmp_history (
+    id                     integer PRIMARY KEY,
+    ipo_slug               text NOT NULL,
+    gmp_amount             numeric,
+    gmp_percentage         numeric,
+    kostak_rate            numeric,
+    subject_rate           numeric,
+    issue_price            numeric,
+    expected_listing_price numeric,
+    source                 text NOT NULL,
+    scraped_at             timestamptz NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    observation_date       date
+);
+
+CREATE INDEX IF NOT EXISTS idx_gmp_history_slug_time ON gmp_history (ipo_slug, scraped_at);
+CREATE INDEX IF NOT EXISTS idx_gmp_history_slug_source_time ON gmp_history (ipo_slug, source, scraped_at);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_gmp_history_observation
+    ON gmp_history (ipo_slug, source, observation_date);
+
+CREATE TABLE IF NOT EXISTS subscription_history (
+    id                       integer PRIMARY KEY,
+    ipo_slug                 text NOT NULL,
+    subscription_retail      numeric,
+    subscription_nii         numeric,
+    subscription_bnii        numeric,
+    subscription_snii        numeric,
+    subscription_qib         numeric,
+    subscription_employee    numeric,
+    subscription_shareholder numeric,
+    subscription_total       numeric,
+    day_number               integer,
+    source                   text NOT NULL,
+    scraped_at               timestamptz NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    observation_date         date
+);
+
+CREATE INDEX IF NOT EXISTS idx_sub_history_slug_time ON subscription_history (ipo_slug, scraped_at);
+CREATE INDEX IF NOT EXISTS idx_sub_history_slug_source_time ON subscription_history (ipo_slug, source, scraped_at);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_sub_history_observation
+    ON subscription_history (ipo_slug, source, observation_date);
+
+CREATE TABLE IF NOT EXISTS scraping_runs (
+    id                integer PRIMARY KEY,
+    run_id            text NOT NULL,
+    source            text NOT NULL,
+    status            text NOT NULL,
+    skip_reason       text,
+    records_found     integer DEFAULT 0,
+    records_updated   integer DEFAULT 0,
+    records_appended  integer DEFAULT 0,
+    errors_count      integer DEFAULT 0,
+    error_details     jsonb,
+    http_status_codes jsonb,
+    started_at        timestamptz NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    finished_at       timestamptz,
+    duration_ms       integer
+);
+
+CREATE INDEX IF NOT EXISTS idx_runs_source_time ON scraping_runs (source, started_at);
+
+CREATE TABLE IF NOT EXISTS gmp_daily (
+    ipo_slug               text NOT NULL,
+    source                 text NOT NULL,
+    day                    date NOT NULL,
+    gmp_open               numeric,
+    gmp_high               numeric,
+    gmp_low                numeric,
+    gmp_close              numeric,
+    gmp_percentage         numeric,
+    kostak_rate            numeric,
+    subject_rate           numeric,
+    issue_price            numeric,
+    expected_listing_price numeric,
+    samples                integer NOT NULL,
+    first_scraped_at       timestamptz NOT NULL,
+    last_scraped_at        timestamptz NOT NULL,
+    PRIMARY KEY (ipo_slug, source, day)
+);
+
+CREATE TABLE IF NOT EXISTS subscription_daily (
+    ipo_slug                 text NOT NULL,
+    source                   text NOT NULL,
+    day                      date NOT NULL,
+    subscription_retail      numeric,
+    subscription_nii         numeric,
+    subscription_bnii        numeric,
+    subscription_snii        numeric,
+    subscription_qib         numeric,
+    subscription_employee    numeric,
+    subscription_shareholder numeric,
+    subscription_total       numeric,
+    day_number               integer,
+    samples                  integer NOT NULL,
+    first_scraped_at         timestamptz NOT NULL,
+    last_scraped_at          timestamptz NOT NULL,
+    PRIMARY KEY (ipo_slug, source, day)
+);
+
+CREATE TABLE IF NOT EXISTS history_rollup_state (
+    table_name   text PRIMARY KEY,
+    last_id      integer NOT NULL DEFAULT 0,
+    refreshed_at timestamptz
+);
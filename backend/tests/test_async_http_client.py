@@ -0,0 +1,130 @@
+"""AsyncPoliteClient against httpx.MockTransport: per-host pacing that
+doesn't hold up other hosts, and the PoliteClient state it shares."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from pipeline.async_http_client import AsyncPoliteClient
+from pipeline.cassette import Cassette
+from pipeline.config import Settings
+from pipeline.http_client import HostBlocked, PoliteClient, current_source
+
+
+def polite(tmp_path, cassette=None, **overrides):
+    settings = Settings(
+        supabase_url="",
+        supabase_key="",
+        state_dir=str(tmp_path),
+        per_host_min_gap_sec=0.2,
+        per_host_jitter_sec=0.0,
+        adaptive_rate=False,
+        backoff_base_sec=0.01,
+        backoff_cap_sec=0.05,
+        persist_sessions=False,
+        **overrides,
+    )
+    return PoliteClient(settings, cassette)
+
+
+def fetch(http, handler, urls, *, transport=None, **kwargs):
+    async def go():
+        async with AsyncPoliteClient(http, transport=transport or httpx.MockTransport(handler)) as client:
+            return await client.get_many(urls, **kwargs)
+
+    return asyncio.run(go())
+
+
+def test_hosts_are_paced_apart_but_not_behind_each_other(tmp_path):
+    sent: dict[str, list[float]] = {}
+
+    def handler(request):
+        sent.setdefault(request.url.host, []).append(time.monotonic())
+        return httpx.Response(200, text="ok")
+
+    urls = [f"https://{host}/{n}" for n in range(3) for host in ("a.test", "b.test")]
+    started = time.monotonic()
+    responses = fetch(polite(tmp_path), handler, urls)
+    elapsed = time.monotonic() - started
+
+    assert [r.status_code for r in responses] == [200] * 6
+    for times in sent.values():
+        assert all(later - earlier >= 0.19 for earlier, later in zip(times, times[1:]))
+    # Two gaps per host, waited side by side rather than four in a row.
+    assert elapsed < 0.7
+
+
+def test_retry_after_then_success(tmp_path):
+    replies = iter([httpx.Response(429, headers={"Retry-After": "0.01"}), httpx.Response(200, text="ok")])
+    http = polite(tmp_path)
+    token = current_source.set("src")
+    try:
+        (resp,) = fetch(http, lambda request: next(replies), ["https://a.test/x"])
+    finally:
+        current_source.reset(token)
+    assert resp.status_code == 200
+    _, stats = http.stats.pop("src")
+    host = stats["hosts"]["a.test"]
+    assert (host["requests"], host["attempts"], host["status"]) == (1, 2, {"200": 1})
+    assert host["backoff_sec"] > 0
+
+
+def test_two_blocks_trip_the_shared_circuit_breaker(tmp_path):
+    http = polite(tmp_path, max_retries=2)
+    (resp,) = fetch(http, lambda request: httpx.Response(403), ["https://a.test/x"])
+    assert resp is None
+    assert fetch(http, lambda request: httpx.Response(200), ["https://a.test/y"]) == [None]
+    with pytest.raises(HostBlocked):
+        http.get("https://a.test/z")  # the sync client sees the same host state
+
+
+def test_request_cap_counts_both_clients(tmp_path):
+    http = polite(tmp_path, per_host_max_requests_per_run=2)
+    http._state_for("a.test").request_count = 1  # one request through PoliteClient
+    responses = fetch(http, lambda request: httpx.Response(200), ["https://a.test/1", "https://a.test/2"])
+    assert [r is not None for r in responses] == [True, False]
+
+
+def test_conditional_get_shares_the_validator_cache(tmp_path):
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, headers={"ETag": '"v1"'}, text="body")
+
+    http = polite(tmp_path)
+    assert fetch(http, handler, ["https://a.test/x"], conditional=True)[0].status_code == 200
+    assert fetch(http, handler, ["https://a.test/x"], conditional=True)[0].status_code == 304
+    assert seen == [None, '"v1"']
+    assert http.cache.conditional_headers("https://a.test/x") == {"If-None-Match": '"v1"'}
+
+
+def test_cookies_land_in_the_sync_session(tmp_path):
+    http = polite(tmp_path)
+    fetch(http, lambda request: httpx.Response(200, headers={"Set-Cookie": "sid=abc; Path=/"}), ["https://a.test/"])
+    assert http._state_for("a.test").session.cookies.get("sid") == "abc"
+
+
+def test_cassette_record_then_replay(tmp_path):
+    root = tmp_path / "cassette"
+    recording = Cassette(root, replay=False)
+    fetch(
+        polite(tmp_path, recording),
+        lambda request: httpx.Response(200, json={"n": 1}),
+        ["https://a.test/data"],
+    )
+    recording.save()
+
+    replaying = Cassette(root, replay=True)
+    (resp,) = fetch(
+        polite(tmp_path, replaying),
+        lambda request: pytest.fail("replay must not reach the network"),
+        ["https://a.test/data"],
+    )
+    assert resp.json() == {"n": 1}
@@ -0,0 +1,115 @@
+"""bulk_update_ipos through the sql/0004 RPC: one call per upload
+chunk, and the row-by-row fallback when the function isn't installed."""
+
+from __future__ import annotations
+
+import json
+import threading
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from pipeline.config import Settings
+from pipeline.db import Database
+
+
+class RowUpdates:
+    """supabase-py stand-in for the per-row fallback:
+    `table("ipos").update(changes).eq("slug", slug).execute()`."""
+
+    def __init__(self):
+        self.calls: list[tuple[str, dict]] = []
+        self._changes = None
+
+    def table(self, name):
+        assert name == "ipos"
+        return self
+
+    def update(self, changes):
+        self._changes = changes
+        return self
+
+    def eq(self, column, slug):
+        self.calls.append((slug, self._changes))
+        return self
+
+    def execute(self):
+        return type("Resp", (), {"data": [{}]})()
+
+
+def rest_db(tmp_path, handler, client=None, **overrides):
+    settings = Settings(
+        supabase_url="",
+        supabase_key="",
+        state_dir=str(tmp_path),
+        write_behind=False,
+        diff_writes=False,
+        **overrides,
+    )
+    db = Database(settings, client=client or RowUpdates())
+    db._rest = httpx.Client(base_url="https://db.test/rest/v1", transport=httpx.MockTransport(handler))
+    return db
+
+
+def updates(n):
+    return [{"slug": f"s{i}", "status": "closed", "gmp": i} for i in range(n)]
+
+
+def test_one_rpc_per_chunk(tmp_path):
+    bodies = []
+    lock = threading.Lock()
+
+    def handler(request):
+        assert request.url.path == "/rest/v1/rpc/bulk_update_ipos"
+        body = json.loads(request.content)
+        with lock:
+            bodies.append(body)
+        return httpx.Response(200, json=len(body["updates"]))
+
+    db = rest_db(tmp_path, handler, upload_chunk_size=2, upload_workers=2)
+    assert db.bulk_update_ipos(updates(5)) == 5
+    assert sorted(len(b["updates"]) for b in bodies) == [1, 2, 2]
+    sent = sorted((u["slug"], u["changes"]["gmp"]) for b in bodies for u in b["updates"])
+    assert sent == [(f"s{i}", i) for i in range(5)]
+
+
+def test_same_slug_twice_sends_the_merged_changes(tmp_path):
+    bodies = []
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, json=1)
+
+    db = rest_db(tmp_path, handler)
+    db.bulk_update_ipos([{"slug": "a", "status": "open", "gmp": 1}, {"slug": "a", "gmp": 2, "lot_size": None}])
+    assert bodies == [{"updates": [{"slug": "a", "changes": {"status": "open", "gmp": 2}}]}]
+
+
+def test_missing_function_falls_back_to_row_updates(tmp_path):
+    rpc_calls = []
+
+    def handler(request):
+        rpc_calls.append(request)
+        return httpx.Response(
+            404,
+            json={"code": "PGRST202", "message": "Could not find the function public.bulk_update_ipos"},
+        )
+
+    client = RowUpdates()
+    db = rest_db(tmp_path, handler, client=client)
+    assert db.bulk_update_ipos(updates(3)) == 3
+    assert sorted(slug for slug, _ in client.calls) == ["s0", "s1", "s2"]
+    assert len(rpc_calls) == 1  # a missing function isn't retried
+
+    # The rest of the run skips the RPC.
+    assert db.bulk_update_ipos(updates(1)) == 1
+    assert len(rpc_calls) == 1
+
+
+def test_other_errors_are_raised(tmp_path, monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda sec: None)  # _execute's backoff
+    db = rest_db(tmp_path, lambda request: httpx.Response(400, json={"code": "22P02", "message": "bad input"}))
+    with pytest.raises(APIError) as caught:
+        db.bulk_update_ipos(updates(1))
+    assert caught.value.code == "22P02"
@@ -0,0 +1,132 @@
+"""Cassette record / replay through PoliteClient (HTTPAdapter.send
+patched as the live site), plus the replay database round trip."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from pipeline.cassette import Cassette, cassette_settings
+from pipeline.config import Settings
+from pipeline.http_client import PoliteClient
+
+
+def settings(tmp_path, *, replay):
+    return cassette_settings(
+        Settings(
+            supabase_url="",
+            supabase_key="",
+            state_dir=str(tmp_path / "state"),
+            per_host_min_gap_sec=0.0,
+            per_host_jitter_sec=0.0,
+            backoff_base_sec=0.0,
+            backoff_cap_sec=0.0,
+            adaptive_rate=False,
+            persist_sessions=False,
+            max_retries=2,
+        ),
+        replay=replay,
+    )
+
+
+@pytest.fixture
+def live(monkeypatch):
+    """The 'network': each URL answers with its next queued (status, body)."""
+    replies: dict[str, list[tuple[int, str]]] = {}
+
+    def send(self, request, **kwargs):
+        status, body = replies[request.url].pop(0)
+        resp = requests.Response()
+        resp.status_code = status
+        resp.headers.update({"Content-Type": "text/html; charset=utf-8", "Content-Encoding": "gzip"})
+        resp._content = body.encode()
+        resp.encoding = "utf-8"
+        resp.url = request.url
+        resp.request = request
+        return resp
+
+    monkeypatch.setattr(HTTPAdapter, "send", send)
+    return replies
+
+
+def record(tmp_path, live, urls):
+    cassette = Cassette(tmp_path / "cassette", replay=False)
+    http = PoliteClient(settings(tmp_path, replay=False), cassette)
+    responses = [http.get(url) for url in urls]
+    cassette.save()
+    return responses
+
+
+def replayer(tmp_path):
+    cassette = Cassette(tmp_path / "cassette", replay=True)
+    return PoliteClient(settings(tmp_path, replay=True), cassette), cassette
+
+
+def test_replay_serves_the_recorded_responses(tmp_path, live, monkeypatch):
+    live["https://a.test/x"] = [(200, "<p>x</p>")]
+    live["https://b.test/y"] = [(200, "<p>y</p>")]
+    record(tmp_path, live, ["https://a.test/x", "https://b.test/y"])
+
+    monkeypatch.undo()  # no network from here on
+    http, _ = replayer(tmp_path)
+    x = http.get("https://a.test/x")
+    assert (x.status_code, x.text, x.url) == (200, "<p>x</p>", "https://a.test/x")
+    assert "Content-Encoding" not in x.headers  # bodies are stored decoded
+    assert http.get("https://b.test/y").text == "<p>y</p>"
+
+
+def test_retries_replay_as_recorded_and_the_last_response_repeats(tmp_path, live):
+    live["https://a.test/x"] = [(503, "busy"), (200, "first"), (200, "second")]
+    record(tmp_path, live, ["https://a.test/x", "https://a.test/x"])
+
+    http, _ = replayer(tmp_path)
+    assert http.get("https://a.test/x").text == "first"  # after the recorded 503
+    assert http.get("https://a.test/x").text == "second"
+    assert http.get("https://a.test/x").text == "second"
+    _, stats = http.stats.pop("")
+    assert stats["hosts"]["a.test"]["attempts"] == 4
+
+
+def test_miss_is_a_failed_request(tmp_path, live):
+    live["https://a.test/x"] = [(200, "x")]
+    record(tmp_path, live, ["https://a.test/x"])
+    http, _ = replayer(tmp_path)
+    assert http.get("https://a.test/other") is None
+
+
+def test_html_record_and_replay(tmp_path):
+    recording = Cassette(tmp_path / "cassette", replay=False)
+    recording.record_html("https://a.test/app", "<div>rendered</div>")
+    recording.save()
+    replaying = Cassette(tmp_path / "cassette", replay=True)
+    assert replaying.replay_html("https://a.test/app") == "<div>rendered</div>"
+
+
+def test_replay_db_is_seeded_and_dumped(tmp_path, make_db):
+    live_db = make_db()
+    live_db.seed("ipos", [{"slug": "a", "ipo_name": "A", "status": "open"}])
+    recording = Cassette(tmp_path / "cassette", replay=False)
+    recording.record_seed(live_db)
+    recording.save()
+
+    replaying = Cassette(tmp_path / "cassette", replay=True)
+    db = replaying.open_replay_db(settings(tmp_path, replay=True))
+    try:
+        db.bulk_update_ipos([{"slug": "a", "status": "closed"}])
+        db.flush()
+        replaying.dump_db(db)
+    finally:
+        db.close()
+    dumped = json.loads((tmp_path / "cassette" / "replay-db.json").read_text())
+    (row,) = dumped["ipos"]
+    assert (row["slug"], row["status"]) == ("a", "closed")
+
+
+def test_cassette_settings_turn_off_caches_and_sleeps(tmp_path):
+    recording, replaying = settings(tmp_path, replay=False), settings(tmp_path, replay=True)
+    assert not recording.http_cache and not recording.content_hash
+    assert not replaying.write_spool and not replaying.persist_sessions
+    assert replaying.inter_source_gap_sec == 0.0
@@ -0,0 +1,128 @@
+"""Content fingerprints: what counts as the same payload, and when a
+digest becomes "the last run" (only after a successful run)."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from pipeline.fingerprints import FingerprintStore, fingerprint
+from pipeline.http_client import PoliteClient
+from pipeline.runner import RunReport, _flush_writes
+from pipeline.sources.base import Source, SourceResult
+
+
+def test_fingerprint_ignores_whitespace_and_key_order():
+    assert fingerprint("<td> 10 </td>\n<td>12</td>") == fingerprint("<td> 10 </td> <td>12</td>")
+    assert fingerprint({"a": 1, "b": [2, 3]}) == fingerprint({"b": [2, 3], "a": 1})
+    assert fingerprint({"a": 1}) != fingerprint({"a": 2})
+    assert fingerprint(b"x  y") == fingerprint("x y")
+
+
+def test_store_round_trip_and_expiry(tmp_path, monkeypatch):
+    path = tmp_path / "fingerprints.json"
+    store = FingerprintStore(path, max_age_sec=60)
+    store.put("src", "page", "d1")
+    store.save()
+
+    loaded = FingerprintStore(path, max_age_sec=60)
+    assert loaded.matches("src", "page", "d1")
+    assert not loaded.matches("src", "page", "d2")
+    assert not loaded.matches("other", "page", "d1")
+
+    later = time.time() + 61
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert not loaded.matches("src", "page", "d1")
+
+
+def test_unreadable_store_starts_empty(tmp_path):
+    path = tmp_path / "fingerprints.json"
+    path.write_text("{torn", encoding="utf-8")
+    assert not FingerprintStore(path, max_age_sec=60).matches("src", "page", "d1")
+
+
+def test_forget_drops_only_that_source(tmp_path):
+    store = FingerprintStore(tmp_path / "fingerprints.json", max_age_sec=60)
+    store.put("src", "a", "d1")
+    store.put("src", "b", "d2")
+    store.put("srcx", "a", "d3")
+    store.forget("src")
+    assert not store.matches("src", "a", "d1") and not store.matches("src", "b", "d2")
+    assert store.matches("srcx", "a", "d3")
+
+
+class PageSource(Source):
+    """Skips when the page is unchanged; `fail` makes the write fail."""
+
+    name = "page_source"
+    page = "v1"
+    fail = False
+
+    def run(self) -> SourceResult:
+        result = SourceResult()
+        if self.unchanged("page", self.page):
+            result.status = "skipped"
+            result.skip_reason = "unchanged-content"
+            return result
+        if self.fail:
+            raise RuntimeError("write failed")
+        result.records_found = 1
+        return result
+
+
+@pytest.fixture
+def run_source(make_db, tmp_path):
+    db = make_db()
+    http = PoliteClient(db.settings)
+    store = FingerprintStore(tmp_path / "fingerprints.json", max_age_sec=3600)
+
+    def run(page="v1", fail=False):
+        source = PageSource(http=http, db=db, fingerprints=store)
+        source.page, source.fail = page, fail
+        return source.execute()
+
+    run.store = store
+    run.db = db
+    run.http = http
+    return run
+
+
+def test_success_commits_the_digest(run_source):
+    assert run_source().status == "success"
+    second = run_source()
+    assert (second.status, second.skip_reason) == ("skipped", "unchanged-content")
+
+
+def test_failed_run_keeps_the_previous_digest(run_source):
+    run_source(page="v1")
+    assert run_source(page="v2", fail=True).status == "failed"
+    assert run_source.store.matches("page_source", "page", fingerprint("v1"))
+    assert not run_source.store.matches("page_source", "page", fingerprint("v2"))
+    # v2 never reached the DB, so the next run does it again.
+    assert run_source(page="v2").status == "success"
+    assert run_source.store.matches("page_source", "page", fingerprint("v2"))
+
+
+def test_failed_first_run_stores_nothing(run_source):
+    assert run_source(fail=True).status == "failed"
+    assert not run_source.store.matches("page_source", "page", fingerprint("v1"))
+    assert run_source().status == "success"
+
+
+def test_lost_ipos_flush_forgets_the_source(run_source, monkeypatch):
+    run_source()
+    db = run_source.db
+    db.upsert_ipos([{"slug": "a", "ipo_name": "A"}])
+    monkeypatch.setattr(db, "unflushed_sources", lambda: {"page_source"})
+
+    def flush(final=False):
+        raise ValueError("rejected")
+
+    monkeypatch.setattr(db, "flush", flush)
+    report = RunReport(results={"page_source": SourceResult()})
+    _flush_writes(db, http=run_source.http, fingerprints=run_source.store, report=report)
+
+    assert report.results["page_source"].status == "failed"
+    assert report.results["page_source"].errors == ["ipos flush failed: ValueError: rejected"]
+    assert not run_source.store.matches("page_source", "page", fingerprint("v1"))
@@ -0,0 +1,77 @@
+"""Change-only history appends (Settings.history_change_only): repeats of
+the last stored value are dropped until the heartbeat is due."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+
+def ago(**delta):
+    return (datetime.now(timezone.utc) - timedelta(**delta)).isoformat()
+
+
+def gmp(amount, at, slug="a", source="investorgain_gmp", **extra):
+    return {"ipo_slug": slug, "gmp_amount": amount, "source": source, "scraped_at": at, **extra}
+
+
+def amounts(db):
+    return [r["gmp_amount"] for r in db.conn.execute("SELECT gmp_amount FROM gmp_history ORDER BY id")]
+
+
+def test_repeats_are_dropped_and_changes_kept(make_db):
+    db = make_db()
+    assert db.append_gmp_history([gmp(10, ago(minutes=30))]) == 1
+    assert db.append_gmp_history([gmp(10, ago(minutes=20))]) == 0
+    assert db.append_gmp_history([gmp(12, ago(minutes=10))]) == 1
+    assert db.append_gmp_history([gmp(10, ago(minutes=0))]) == 1
+    assert amounts(db) == [10, 12, 10]
+
+
+def test_round_trip_representation_counts_as_same(make_db):
+    db = make_db()
+    db.append_gmp_history([gmp(10, ago(minutes=30))])
+    assert db.append_gmp_history([gmp(10.0, ago(minutes=0))]) == 0
+
+
+def test_missing_value_column_counts_as_null(make_db):
+    db = make_db()
+    db.append_gmp_history([gmp(10, ago(minutes=30), kostak_rate=500)])
+    assert db.append_gmp_history([gmp(10, ago(minutes=0))]) == 1
+
+
+def test_heartbeat_appends_a_repeat_once_the_last_row_is_old(make_db):
+    db = make_db(history_heartbeat_sec=3600)
+    db.seed("gmp_history", [gmp(10, ago(hours=2))])
+    assert db.append_gmp_history([gmp(10, ago(minutes=0))]) == 1
+    # The heartbeat row is now the last one, so the next repeat waits again.
+    assert db.append_gmp_history([gmp(10, ago(minutes=0))]) == 0
+    assert amounts(db) == [10, 10]
+
+
+def test_last_row_is_read_from_the_database(make_db):
+    make_db().append_gmp_history([gmp(10, ago(minutes=30))])
+    fresh = make_db()  # a later run, nothing cached
+    assert fresh.append_gmp_history([gmp(10, ago(minutes=0))]) == 0
+    assert fresh.append_gmp_history([gmp(11, ago(minutes=0))]) == 1
+
+
+def test_series_are_per_slug_and_source(make_db):
+    db = make_db()
+    db.append_gmp_history([gmp(10, ago(minutes=30))])
+    assert db.append_gmp_history([
+        gmp(10, ago(minutes=0)),
+        gmp(10, ago(minutes=0), source="ipowatch_gmp"),
+        gmp(10, ago(minutes=0), slug="b"),
+    ]) == 2
+
+
+def test_rows_without_slug_are_dropped(make_db):
+    db = make_db()
+    assert db.append_gmp_history([gmp(10, ago(minutes=0), slug="")]) == 0
+
+
+def test_change_only_off_appends_everything(make_db):
+    db = make_db(history_change_only=False)
+    db.append_gmp_history([gmp(10, ago(minutes=30))])
+    assert db.append_gmp_history([gmp(10, ago(minutes=0))]) == 1
+    assert amounts(db) == [10, 10]
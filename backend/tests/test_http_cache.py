@@ -0,0 +1,157 @@
+"""Conditional-GET validator cache: HttpCache on its own, then through
+PoliteClient.get with a requests adapter standing in for the server."""
+
+from __future__ import annotations
+
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from pipeline.config import Settings
+from pipeline.http_cache import HttpCache
+from pipeline.http_client import PoliteClient, current_source
+
+URL = "https://a.test/page"
+
+
+def response(status, headers=None, body=b""):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers.update(headers or {})
+    resp._content = body
+    resp.url = URL
+    return resp
+
+
+# ------------------------------------------------------------------ #
+# HttpCache
+# ------------------------------------------------------------------ #
+
+
+def test_validators_become_conditional_headers(tmp_path):
+    cache = HttpCache(tmp_path / "http_cache.json")
+    assert cache.conditional_headers(URL) == {}
+    cache.store(URL, response(200, {"ETag": '"v1"', "Last-Modified": "Wed, 01 Oct 2026 10:00:00 GMT"}))
+    assert cache.conditional_headers(URL) == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Wed, 01 Oct 2026 10:00:00 GMT",
+    }
+
+
+def test_response_without_validators_drops_the_entry(tmp_path):
+    cache = HttpCache(tmp_path / "http_cache.json")
+    cache.store(URL, response(200, {"ETag": '"v1"'}))
+    cache.store(URL, response(200))
+    assert cache.conditional_headers(URL) == {}
+
+
+def test_saved_and_loaded(tmp_path):
+    path = tmp_path / "http_cache.json"
+    cache = HttpCache(path)
+    cache.store(URL, response(200, {"ETag": '"v1"'}))
+    cache.save()
+    assert HttpCache(path).conditional_headers(URL) == {"If-None-Match": '"v1"'}
+
+
+def test_full_fetch_is_due_after_max_age(tmp_path, monkeypatch):
+    cache = HttpCache(tmp_path / "http_cache.json", max_age_sec=60)
+    cache.store(URL, response(200, {"ETag": '"v1"'}))
+    later = time.time() + 61
+    monkeypatch.setattr(time, "time", lambda: later)
+    cache.touch(URL)  # a 304 confirms the validators, not the body
+    assert cache.conditional_headers(URL) == {}
+
+
+def test_discard_owner_forgets_only_its_urls(tmp_path):
+    cache = HttpCache(tmp_path / "http_cache.json")
+    cache.store(URL, response(200, {"ETag": '"v1"'}), owner="failed_source")
+    cache.store("https://a.test/other", response(200, {"ETag": '"v2"'}), owner="good_source")
+    cache.discard_owner("failed_source")
+    assert cache.conditional_headers(URL) == {}
+    assert cache.conditional_headers("https://a.test/other") == {"If-None-Match": '"v2"'}
+
+
+# ------------------------------------------------------------------ #
+# PoliteClient.get(conditional=True)
+# ------------------------------------------------------------------ #
+
+
+class Server(HTTPAdapter):
+    """Answers with a 304 when the request carries the current ETag."""
+
+    def __init__(self, etag='"v1"'):
+        super().__init__()
+        self.etag = etag
+        self.seen: list[dict[str, str]] = []
+
+    def send(self, request, **kwargs):
+        self.seen.append(dict(request.headers))
+        if request.headers.get("If-None-Match") == self.etag:
+            resp = response(304)
+        else:
+            resp = response(200, {"ETag": self.etag}, b"<html>page</html>")
+        resp.request = request
+        return resp
+
+
+def polite(tmp_path, server, **overrides):
+    settings = Settings(
+        supabase_url="",
+        supabase_key="",
+        state_dir=str(tmp_path),
+        per_host_min_gap_sec=0.0,
+        per_host_jitter_sec=0.0,
+        adaptive_rate=False,
+        persist_sessions=False,
+        **overrides,
+    )
+    http = PoliteClient(settings)
+    http._state_for("a.test").session.mount("https://", server)
+    return http
+
+
+def test_second_fetch_is_a_304(tmp_path):
+    server = Server()
+    http = polite(tmp_path, server)
+    assert http.get(URL, conditional=True).status_code == 200
+    assert http.get(URL, conditional=True).status_code == 304
+    assert "If-None-Match" not in server.seen[0]
+    assert server.seen[1]["If-None-Match"] == '"v1"'
+
+
+def test_changed_page_comes_back_whole(tmp_path):
+    server = Server()
+    http = polite(tmp_path, server)
+    http.get(URL, conditional=True)
+    server.etag = '"v2"'
+    resp = http.get(URL, conditional=True)
+    assert (resp.status_code, resp.text) == (200, "<html>page</html>")
+    assert http.cache.conditional_headers(URL) == {"If-None-Match": '"v2"'}
+
+
+def test_unconditional_get_sends_no_validators(tmp_path):
+    server = Server()
+    http = polite(tmp_path, server)
+    http.get(URL, conditional=True)
+    assert http.get(URL).status_code == 200
+    assert "If-None-Match" not in server.seen[1]
+
+
+def test_failed_source_discards_its_validators(tmp_path):
+    server = Server()
+    http = polite(tmp_path, server)
+    token = current_source.set("detail")
+    try:
+        http.get(URL, conditional=True)
+    finally:
+        current_source.reset(token)
+    http.discard_validators("detail")
+    assert http.get(URL, conditional=True).status_code == 200
+
+
+def test_cache_off(tmp_path):
+    server = Server()
+    http = polite(tmp_path, server, http_cache=False)
+    http.get(URL, conditional=True)
+    assert http.get(URL, conditional=True).status_code == 200
@@ -0,0 +1,105 @@
+"""A run during a database outage: Source.execute still scrapes, and its
+observations and scraping_runs row go to the spool for the next run."""
+
+from __future__ import annotations
+
+import httpx
+
+from pipeline.config import Settings
+from pipeline.db import Database
+from pipeline.http_client import PoliteClient
+from pipeline.sources.base import Source, SourceResult
+
+
+class GmpSource(Source):
+    name = "investorgain_gmp"
+
+    def run(self) -> SourceResult:
+        result = SourceResult(records_found=1)
+        result.records_appended = self.db.append_gmp_history(
+            [{"ipo_slug": "a", "gmp_amount": 10, "source": self.name, "scraped_at": "2026-10-01T10:00:00+00:00"}]
+        )
+        return result
+
+
+class DownClient:
+    """A Supabase client whose every request fails to connect."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        raise httpx.ConnectError("connection refused")
+
+
+def go_down(db, monkeypatch, *hooks):
+    def refuse(*args, **kwargs):
+        raise OSError("connection refused")
+
+    for hook in hooks:
+        monkeypatch.setattr(db, hook, refuse)
+
+
+def runs(db):
+    return [dict(r) for r in db.conn.execute("SELECT * FROM scraping_runs ORDER BY id")]
+
+
+def test_source_runs_and_spools_when_the_database_is_down(make_db, monkeypatch):
+    db = make_db()
+    go_down(db, monkeypatch, "_insert_run", "_update_run", "_append")
+    http = PoliteClient(db.settings)
+
+    result = GmpSource(http, db).execute()
+
+    assert result.status == "success"
+    assert [(e["op"], e["table"]) for e in db.spool.entries()] == [
+        ("append", "gmp_history"),
+        ("insert_run", "scraping_runs"),
+    ]
+    monkeypatch.undo()
+
+    assert db.replay_spool() == (2, 0)
+    (run,) = runs(db)
+    assert (run["run_id"], run["source"], run["status"], run["records_found"]) == (
+        str(db.run_id), "investorgain_gmp", "success", 1,
+    )
+    assert db.conn.execute("SELECT count(*) FROM gmp_history").fetchone()[0] == 1
+
+
+def test_spooled_run_row_is_inserted_once(make_db, monkeypatch):
+    db = make_db()
+    go_down(db, monkeypatch, "_insert_run", "_update_run", "_append")
+    GmpSource(PoliteClient(db.settings), db).execute()
+    monkeypatch.undo()
+    entries = db.spool.entries()
+
+    assert db.replay_spool() == (2, 0)
+    for entry in entries:  # sent, but the discard never happened
+        db.spool.append(entry["op"], entry["table"], entry["rows"])
+    assert db.replay_spool() == (2, 0)
+    assert len(runs(db)) == 1
+
+
+def test_outage_after_start_spools_the_run_update(make_db, monkeypatch):
+    db = make_db()
+    go_down(db, monkeypatch, "_update_run", "_append")
+    GmpSource(PoliteClient(db.settings), db).execute()
+    assert [e["op"] for e in db.spool.entries()] == ["append", "update_run"]
+    assert runs(db)[0]["status"] == "running"
+    monkeypatch.undo()
+
+    assert db.replay_spool() == (2, 0)
+    assert runs(db)[0]["status"] == "success"
+
+
+def test_unreachable_supabase_doesnt_crash_the_source(tmp_path, monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda sec: None)  # _execute's backoff
+    settings = Settings(supabase_url="", supabase_key="", state_dir=str(tmp_path), write_behind=False)
+    db = Database(settings, client=DownClient())
+
+    result = GmpSource(PoliteClient(settings), db).execute()
+
+    assert result.status == "success"
+    assert [e["op"] for e in db.spool.entries()] == ["append", "insert_run"]
+    (entry,) = [e for e in db.spool.entries() if e["op"] == "insert_run"]
+    assert entry["rows"][0]["status"] == "success"
@@ -0,0 +1,116 @@
+"""AimdController: the per-host gap widens on pushback, narrows after a
+window of clean responses, stays in bounds and carries over runs."""
+
+from __future__ import annotations
+
+import json
+import time
+
+import requests
+
+from pipeline.config import Settings
+from pipeline.rate_control import AimdController
+
+
+def settings(tmp_path, **overrides):
+    values = dict(
+        supabase_url="",
+        supabase_key="",
+        state_dir=str(tmp_path),
+        per_host_min_gap_sec=4.0,
+        aimd_floor_sec=3.0,
+        aimd_ceiling_sec=20.0,
+        aimd_increase_factor=2.0,
+        aimd_decrease_step_sec=0.5,
+        aimd_success_window=3,
+    )
+    values.update(overrides)
+    return Settings(**values)
+
+
+def response(status, body="<html>ok</html>"):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = body.encode()
+    resp.encoding = "utf-8"
+    return resp
+
+
+def test_starts_at_the_configured_gap(tmp_path):
+    rate = AimdController(settings(tmp_path))
+    assert rate.gap("a.test") == 4.0
+    # Bounded hosts start inside their own bounds (chittorgarh: >= 6 s).
+    assert rate.gap("www.chittorgarh.com") == 6.0
+
+
+def test_pushback_multiplies_the_gap(tmp_path):
+    rate = AimdController(settings(tmp_path))
+    rate.observe("a.test", response(429))
+    assert rate.gap("a.test") == 8.0
+    rate.observe("a.test", response(403))
+    assert rate.gap("a.test") == 16.0
+    rate.observe("a.test", response(429))
+    assert rate.gap("a.test") == 20.0  # the ceiling
+
+
+def test_retry_after_sets_a_minimum(tmp_path):
+    rate = AimdController(settings(tmp_path))
+    rate.observe("a.test", response(503), retry_after=15.0)
+    assert rate.gap("a.test") == 15.0
+
+
+def test_challenge_page_counts_as_pushback(tmp_path):
+    rate = AimdController(settings(tmp_path))
+    rate.observe("a.test", response(200, "<title>Just a moment...</title>"))
+    assert rate.gap("a.test") == 8.0
+
+
+def test_clean_window_narrows_down_to_the_floor(tmp_path):
+    rate = AimdController(settings(tmp_path))
+    for _ in range(2):
+        rate.observe("a.test", response(200))
+    assert rate.gap("a.test") == 4.0  # window not full yet
+    rate.observe("a.test", response(304))
+    assert rate.gap("a.test") == 3.5
+    for _ in range(6):
+        rate.observe("a.test", response(200))
+    assert rate.gap("a.test") == 3.0
+
+
+def test_pushback_restarts_the_clean_window(tmp_path):
+    rate = AimdController(settings(tmp_path))
+    rate.observe("a.test", response(200))
+    rate.observe("a.test", response(200))
+    rate.observe("a.test", response(429))
+    rate.observe("a.test", response(200))
+    assert rate.gap("a.test") == 8.0
+
+
+def test_errors_are_neither_pushback_nor_success(tmp_path):
+    rate = AimdController(settings(tmp_path))
+    for resp in (response(404), response(500), None):
+        for _ in range(3):
+            rate.observe("a.test", resp)
+    assert rate.gap("a.test") == 4.0
+
+
+def test_hosts_are_independent(tmp_path):
+    rate = AimdController(settings(tmp_path))
+    rate.observe("a.test", response(429))
+    assert rate.gap("b.test") == 4.0
+
+
+def test_learned_gap_carries_over_and_expires(tmp_path):
+    path = tmp_path / "rate_control.json"
+    rate = AimdController(settings(tmp_path), path)
+    rate.observe("a.test", response(429))
+    rate.save()
+    assert AimdController(settings(tmp_path), path).gap("a.test") == 8.0
+
+    # A tighter ceiling next run still applies to the loaded gap.
+    assert AimdController(settings(tmp_path, aimd_ceiling_sec=6.0), path).gap("a.test") == 6.0
+
+    entries = json.loads(path.read_text())
+    entries["a.test"]["updated_at"] = time.time() - 8 * 24 * 3600
+    path.write_text(json.dumps(entries))
+    assert AimdController(settings(tmp_path), path).gap("a.test") == 4.0
@@ -0,0 +1,118 @@
+"""Request timing and byte rollups (request_stats.py): the accumulator,
+what PoliteClient records per fetch, and the scraping_runs row."""
+
+from __future__ import annotations
+
+import json
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from pipeline.config import Settings
+from pipeline.http_client import PoliteClient, current_source
+from pipeline.request_stats import RequestRecord, RequestStats
+from pipeline.sources.base import Source, SourceResult
+
+
+def test_rollup_per_source_and_host():
+    stats = RequestStats()
+    stats.record("src", RequestRecord(host="a.test", status=200, attempts=1, network_sec=0.5, body_bytes=100))
+    stats.record("src", RequestRecord(host="a.test", status=503, attempts=3, backoff_sec=2.0, ttfb_sec=0.3))
+    stats.record("src", RequestRecord(host="b.test", status=200, attempts=1, ttfb_sec=0.1, wire_bytes=40))
+    stats.record("other", RequestRecord(host="a.test", status=200, attempts=1))
+
+    statuses, rollup = stats.pop("src")
+    assert statuses == [200, 503, 200]
+    assert rollup["status"] == {"200": 2, "503": 1}
+    a = rollup["hosts"]["a.test"]
+    assert (a["requests"], a["attempts"], a["status"]) == (2, 4, {"200": 1, "503": 1})
+    assert (a["network_sec"], a["backoff_sec"], a["ttfb_max_sec"], a["body_bytes"]) == (0.5, 2.0, 0.3, 100)
+    assert rollup["hosts"]["b.test"]["wire_bytes"] == 40
+
+    assert stats.pop("src") == ([], None)  # popped once
+    assert stats.pop("other")[0] == [200]
+
+
+class Flaky(HTTPAdapter):
+    """Replies with `statuses` in turn; None raises a connection error."""
+
+    def __init__(self, *statuses):
+        super().__init__()
+        self.statuses = list(statuses)
+
+    def send(self, request, **kwargs):
+        status = self.statuses.pop(0)
+        if status is None:
+            raise requests.ConnectionError("connection reset")
+        resp = requests.Response()
+        resp.status_code = status
+        resp._content = b"x" * 10
+        resp.url = request.url
+        resp.request = request
+        return resp
+
+
+def polite(tmp_path, adapter):
+    settings = Settings(
+        supabase_url="",
+        supabase_key="",
+        state_dir=str(tmp_path),
+        per_host_min_gap_sec=0.0,
+        per_host_jitter_sec=0.0,
+        adaptive_rate=False,
+        persist_sessions=False,
+        backoff_base_sec=0.01,
+        backoff_cap_sec=0.02,
+        max_retries=3,
+    )
+    http = PoliteClient(settings)
+    http._state_for("a.test").session.mount("https://", adapter)
+    return http
+
+
+def fetch(http, url="https://a.test/x"):
+    token = current_source.set("src")
+    try:
+        return http.get(url)
+    finally:
+        current_source.reset(token)
+
+
+def test_retries_are_one_request_with_several_attempts(tmp_path):
+    http = polite(tmp_path, Flaky(None, 503, 200))
+    assert fetch(http).status_code == 200
+
+    statuses, rollup = http.stats.pop("src")
+    assert statuses == [200]
+    host = rollup["hosts"]["a.test"]
+    assert (host["requests"], host["attempts"], host["status"]) == (1, 3, {"200": 1})
+    assert host["backoff_sec"] > 0
+    assert host["body_bytes"] == 20  # the 503 body counts too
+
+
+def test_no_response_at_all_is_status_0(tmp_path):
+    http = polite(tmp_path, Flaky(None, None, None))
+    assert fetch(http) is None
+    statuses, rollup = http.stats.pop("src")
+    assert statuses == [0]
+    assert rollup["hosts"]["a.test"]["attempts"] == 3
+
+
+class Fetcher(Source):
+    name = "fetcher"
+
+    def run(self) -> SourceResult:
+        self.http.get("https://a.test/x")
+        return SourceResult(records_found=1)
+
+
+def test_rollup_lands_in_the_run_row(make_db, tmp_path):
+    db = make_db()
+    http = polite(tmp_path, Flaky(200))
+    result = Fetcher(http=http, db=db).execute()
+
+    assert result.http_status_codes == [200]
+    (stored,) = [r["http_status_codes"] for r in db.conn.execute("SELECT http_status_codes FROM scraping_runs")]
+    rollup = json.loads(stored)
+    assert rollup["status"] == {"200": 1}
+    assert rollup["hosts"]["a.test"]["requests"] == 1
@@ -0,0 +1,107 @@
+"""Writes posted as pre-encoded bodies on the Database's own REST
+session (httpx.MockTransport standing in for PostgREST)."""
+
+from __future__ import annotations
+
+import json
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from pipeline.config import Settings
+from pipeline.db import Database
+
+
+class NoClient:
+    """supabase-py client that must not be used for writes."""
+
+    def __getattr__(self, name):
+        pytest.fail(f"supabase-py client used: {name}")
+
+
+def rest_db(tmp_path, handler, **overrides):
+    settings = Settings(
+        supabase_url="",
+        supabase_key="",
+        state_dir=str(tmp_path),
+        write_behind=False,
+        diff_writes=False,
+        history_change_only=False,
+        **overrides,
+    )
+    db = Database(settings, client=NoClient())
+    db._rest = httpx.Client(base_url="https://db.test/rest/v1", transport=httpx.MockTransport(handler))
+    return db
+
+
+def test_upsert_posts_the_encoded_rows_once(tmp_path):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(201)
+
+    db = rest_db(tmp_path, handler)
+    assert db.upsert_ipos([{"slug": "a", "ipo_name": "A\x00 Ltd", "status": None}]) == 1
+
+    (request,) = seen
+    assert request.url.path == "/rest/v1/ipos"
+    assert request.url.params["on_conflict"] == "slug"
+    assert request.url.params["columns"] == '"slug","ipo_name"'
+    assert request.headers["Prefer"] == "return=minimal,resolution=merge-duplicates"
+    assert json.loads(request.content) == [{"slug": "a", "ipo_name": "A Ltd"}]
+
+
+def test_bulk_update_goes_through_the_rpc(tmp_path):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json=2)
+
+    db = rest_db(tmp_path, handler)
+    assert db.bulk_update_ipos([{"slug": "a", "status": "open"}, {"slug": "b", "gmp": 5}]) == 2
+
+    (request,) = seen
+    assert request.url.path == "/rest/v1/rpc/bulk_update_ipos"
+    assert "Prefer" not in request.headers
+    assert json.loads(request.content) == {
+        "updates": [{"slug": "a", "changes": {"status": "open"}}, {"slug": "b", "changes": {"gmp": 5}}]
+    }
+
+
+def test_history_append_keeps_nulls_in_the_column_list(tmp_path):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(201)
+
+    db = rest_db(tmp_path, handler)
+    rows = [
+        {"ipo_slug": "a", "gmp_amount": 10, "kostak_rate": None, "source": "s", "scraped_at": "2026-10-01T10:00:00+00:00"},
+    ]
+    assert db.append_gmp_history(rows) == 1
+
+    (request,) = seen
+    assert request.url.path == "/rest/v1/gmp_history"
+    assert request.url.params["columns"] == '"ipo_slug","gmp_amount","kostak_rate","source","scraped_at"'
+    assert json.loads(request.content) == rows
+
+
+def test_error_responses_raise_api_error(tmp_path):
+    db = rest_db(tmp_path, lambda request: httpx.Response(
+        400, json={"code": "23502", "message": "null value in column", "hint": None, "details": None},
+    ))
+    with pytest.raises(APIError) as caught:
+        db._send_upserts([{"slug": "a"}])
+    assert caught.value.code == "23502"
+
+
+def test_gateway_error_is_an_outage(tmp_path, monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda sec: None)  # _execute's backoff
+    db = rest_db(tmp_path, lambda request: httpx.Response(502, text="<html>Bad Gateway</html>"))
+    db.upsert_ipos([{"slug": "a", "ipo_name": "A"}])  # deferred to the flush
+    db.flush(final=True)
+    assert [e["op"] for e in db.spool.entries()] == ["upsert_ipos"]
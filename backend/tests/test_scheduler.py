@@ -0,0 +1,110 @@
+"""runner._ready: which pending sources the concurrent scheduler may
+start, given what is running, done and holding which host lanes; and
+what _run_concurrent reports when none of them ever can."""
+
+from __future__ import annotations
+
+from pipeline.http_client import PoliteClient
+from pipeline.registry import ALL_SOURCES
+from pipeline.runner import RunReport, _lanes_for, _ready, _run_concurrent
+from pipeline.sources.base import Source, SourceResult
+
+
+def ready(pending, running=(), done=(), busy=()):
+    names = set(pending) | set(running) | set(done)
+    lanes = {name: _lanes_for(ALL_SOURCES[name]) for name in names}
+    return _ready(list(pending), list(running), set(done), lanes, set(busy))
+
+
+def test_disjoint_hosts_start_together():
+    pending = ["niftytrader_calendar", "chittorgarh_dashboard", "bse_current_issues"]
+    assert ready(pending) == pending
+
+
+def test_same_host_goes_one_at_a_time_in_listed_order():
+    assert ready(["chittorgarh_dashboard", "chittorgarh_detail"]) == ["chittorgarh_dashboard"]
+
+
+def test_busy_lane_blocks():
+    busy = _lanes_for(ALL_SOURCES["chittorgarh_dashboard"])
+    assert ready(["chittorgarh_detail", "bse_current_issues"], running=["chittorgarh_dashboard"], busy=busy) == [
+        "bse_current_issues"
+    ]
+
+
+def test_runs_after_waits_for_dependencies_in_the_run():
+    pending = ["investorgain_gmp"]
+    assert ready(pending, running=["niftytrader_calendar"]) == []
+    assert ready(pending, done=["niftytrader_calendar"], running=["chittorgarh_dashboard"]) == []
+    assert ready(pending, done=["niftytrader_calendar", "chittorgarh_dashboard"]) == pending
+
+
+def test_runs_after_ignores_dependencies_outside_the_run():
+    assert ready(["investorgain_gmp"]) == ["investorgain_gmp"]
+
+
+def test_waiting_source_still_holds_its_host():
+    # chittorgarh_subscription waits on niftytrader_calendar; the detail
+    # scrape behind it on the same host doesn't jump the queue.
+    pending = ["niftytrader_calendar", "chittorgarh_subscription", "chittorgarh_detail"]
+    assert ready(pending) == ["niftytrader_calendar"]
+
+
+def test_runs_last_waits_for_everything_else():
+    assert ready(["calendar_events", "bse_current_issues"]) == ["bse_current_issues"]
+    assert ready(["calendar_events"], running=["bse_current_issues"]) == []
+    assert ready(["calendar_events"], done=["bse_current_issues"]) == ["calendar_events"]
+
+
+# ------------------------------------------------------------------ #
+# runner._run_concurrent
+# ------------------------------------------------------------------ #
+
+
+class Quick(Source):
+    hosts = ("quick.test",)
+
+    def run(self) -> SourceResult:
+        return SourceResult(records_found=1)
+
+
+def fake(monkeypatch, name, *, hosts=(), **attrs):
+    cls = type(name, (Quick,), {"name": name, "hosts": hosts or (f"{name}.test",), **attrs})
+    monkeypatch.setitem(ALL_SOURCES, name, cls)
+    return name
+
+
+def run_concurrent(make_db, names):
+    db = make_db()
+    report = RunReport()
+    _run_concurrent(
+        names,
+        http=PoliteClient(db.settings),
+        db=db,
+        browser=None,
+        fingerprints=None,
+        settings=db.settings,
+        report=report,
+    )
+    return report
+
+
+def test_deadlocked_sources_are_reported_failed(make_db, monkeypatch):
+    names = [
+        fake(monkeypatch, "first", runs_after=("second",)),
+        fake(monkeypatch, "second", runs_after=("first",)),
+        fake(monkeypatch, "free"),
+        fake(monkeypatch, "behind", hosts=("first.test",)),
+    ]
+    report = run_concurrent(make_db, names)
+
+    assert list(report.results) == names  # requested order
+    assert report.results["free"].status == "success"
+    assert report.any_failed
+    errors = {name: report.results[name].errors for name in ("first", "second", "behind")}
+    assert errors == {
+        "first": ["not started, scheduler deadlock: runs_after second never finished"],
+        "second": ["not started, scheduler deadlock: runs_after first never finished"],
+        "behind": ["not started, scheduler deadlock: lane first.test held by first"],
+    }
+    assert all(report.results[name].status == "failed" for name in errors)
@@ -0,0 +1,55 @@
+"""db._sized_chunks: upload batches capped by row count and encoded size,
+each carrying the JSON body it was sized with."""
+
+from __future__ import annotations
+
+import json
+
+from pipeline.db import _sized_chunks, encode_row
+
+
+def rows(n, width=10):
+    return [{"slug": f"ipo-{i}", "note": "x" * width} for i in range(n)]
+
+
+def test_row_limit_only():
+    chunks = list(_sized_chunks(rows(7), 3, 0))
+    assert [len(c) for c in chunks] == [3, 3, 1]
+
+
+def test_byte_limit():
+    data = rows(10)
+    per_row = len(encode_row(data[0]))
+    # Brackets plus three rows, each counted with a comma.
+    limit = 2 + 3 * (per_row + 1)
+    chunks = list(_sized_chunks(data, 100, limit))
+    assert [len(c) for c in chunks] == [3, 3, 3, 1]
+    assert all(len(c.body) <= limit for c in chunks)
+
+
+def test_chunks_keep_order_and_every_row():
+    data = rows(25, width=50)
+    chunks = list(_sized_chunks(data, 4, 300))
+    assert [r for c in chunks for r in c] == data
+
+
+def test_body_is_the_chunk_as_json():
+    data = rows(5) + [{"slug": "ipo-x", "note": None}]
+    for chunk in _sized_chunks(data, 2, 0):
+        assert json.loads(chunk.body) == [{k: v for k, v in r.items() if v is not None} for r in chunk]
+
+
+def test_drop_none_false_keeps_nulls():
+    (chunk,) = _sized_chunks([{"slug": "a", "note": None}], 10, 0, drop_none=False)
+    assert json.loads(chunk.body) == [{"slug": "a", "note": None}]
+
+
+def test_oversized_row_goes_alone():
+    data = rows(1) + rows(1, width=1000) + rows(1)
+    chunks = list(_sized_chunks(data, 10, 200))
+    assert [len(c) for c in chunks] == [1, 1, 1]
+    assert chunks[1][0]["note"] == "x" * 1000
+
+
+def test_empty_input():
+    assert list(_sized_chunks([], 10, 100)) == []
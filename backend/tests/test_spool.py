@@ -0,0 +1,171 @@
+"""WriteSpool journal handling and Database.replay_spool against the
+SQLite backend."""
+
+from __future__ import annotations
+
+import json
+
+from pipeline.spool import WriteSpool
+
+
+def gmp(slug, amount, at, source="investorgain_gmp"):
+    return {"ipo_slug": slug, "gmp_amount": amount, "source": source, "scraped_at": at}
+
+
+def history(db):
+    return [
+        (r["ipo_slug"], r["gmp_amount"], r["scraped_at"])
+        for r in db.conn.execute("SELECT * FROM gmp_history ORDER BY id")
+    ]
+
+
+def ipo(db, slug):
+    row = db.conn.execute("SELECT * FROM ipos WHERE slug = ?", (slug,)).fetchone()
+    return dict(row) if row else None
+
+
+# ------------------------------------------------------------------ #
+# WriteSpool
+# ------------------------------------------------------------------ #
+
+
+def test_append_and_entries_keep_order(tmp_path):
+    spool = WriteSpool(tmp_path / "spool.jsonl")
+    assert spool.entries() == []
+    spool.append("append", "gmp_history", [{"ipo_slug": "a"}])
+    spool.append("upsert_ipos", "ipos", [{"slug": "b"}])
+    entries = spool.entries()
+    assert [(e["op"], e["table"], e["rows"]) for e in entries] == [
+        ("append", "gmp_history", [{"ipo_slug": "a"}]),
+        ("upsert_ipos", "ipos", [{"slug": "b"}]),
+    ]
+    assert all(e["at"] for e in entries)
+
+
+def test_discard_drops_oldest_and_keeps_later_batches(tmp_path):
+    spool = WriteSpool(tmp_path / "spool.jsonl")
+    for n in range(3):
+        spool.append("append", "gmp_history", [{"n": n}])
+    seen = spool.entries()
+    spool.append("append", "gmp_history", [{"n": 3}])  # spooled during a replay
+    spool.discard(len(seen))
+    assert [e["rows"][0]["n"] for e in spool.entries()] == [3]
+    spool.discard(1)
+    assert not spool.path.exists()
+    assert spool.entries() == []
+
+
+def test_torn_and_foreign_lines_are_skipped(tmp_path):
+    spool = WriteSpool(tmp_path / "spool.jsonl")
+    spool.append("append", "gmp_history", [{"n": 0}])
+    with spool.path.open("a", encoding="utf-8") as fh:
+        fh.write("\n")
+        fh.write(json.dumps({"op": "append", "rows": "not a list"}) + "\n")
+        fh.write(json.dumps(["no", "op"]) + "\n")
+    spool.append("append", "gmp_history", [{"n": 1}])
+    with spool.path.open("a", encoding="utf-8") as fh:
+        fh.write('{"op": "append", "table": "gmp_hist')  # crash mid-write
+    assert [e["rows"][0]["n"] for e in spool.entries()] == [0, 1]
+
+
+def test_quarantine_keeps_entry_and_error(tmp_path):
+    spool = WriteSpool(tmp_path / "spool.jsonl")
+    spool.append("append", "gmp_history", [{"n": 0}])
+    (entry,) = spool.entries()
+    spool.quarantine(entry, "bad row")
+    (kept,) = [json.loads(line) for line in spool.quarantine_path.read_text().splitlines()]
+    assert kept == {**entry, "error": "bad row"}
+    assert spool.entries() == [entry]  # until discard()
+
+
+# ------------------------------------------------------------------ #
+# Database.replay_spool
+# ------------------------------------------------------------------ #
+
+
+def test_replay_sends_batches_oldest_first(make_db):
+    db = make_db()
+    db.spool.append("append", "gmp_history", [gmp("a", 10, "2026-10-01T10:00:00+00:00")])
+    db.spool.append("append", "gmp_history", [gmp("a", 12, "2026-10-01T11:00:00+00:00")])
+    db.spool.append("upsert_ipos", "ipos", [
+        {"slug": "a", "ipo_name": "A", "status": "open", "last_scraped_at": "2026-10-01T10:00:00+00:00"}
+    ])
+    db.spool.append("update_ipos", "ipos", [
+        {"slug": "a", "status": "closed", "last_scraped_at": "2026-10-01T11:00:00+00:00"}
+    ])
+
+    assert db.replay_spool() == (4, 0)
+    assert history(db) == [
+        ("a", 10, "2026-10-01T10:00:00+00:00"),
+        ("a", 12, "2026-10-01T11:00:00+00:00"),
+    ]
+    assert ipo(db, "a")["status"] == "closed"
+    assert db.spool.entries() == []
+
+
+def test_replay_is_idempotent(make_db):
+    db = make_db()
+    batches = [
+        ("append", "gmp_history", [gmp("a", 10, "2026-10-01T10:00:00+00:00"), gmp("b", 5, "2026-10-01T10:00:00+00:00")]),
+        ("upsert_ipos", "ipos", [{"slug": "a", "ipo_name": "A", "last_scraped_at": "2026-10-01T10:00:00+00:00"}]),
+    ]
+    for batch in batches:
+        db.spool.append(*batch)
+    assert db.replay_spool() == (2, 0)
+    first = (history(db), ipo(db, "a"))
+
+    # The same batches again, as after a crash between send and discard.
+    for batch in batches:
+        db.spool.append(*batch)
+    assert db.replay_spool() == (2, 0)
+    assert (history(db), ipo(db, "a")) == first
+
+
+def test_replay_skips_ipos_rows_a_later_run_overwrote(make_db):
+    db = make_db()
+    db.spool.append("upsert_ipos", "ipos", [
+        {"slug": "a", "ipo_name": "A", "status": "open", "last_scraped_at": "2026-10-01T10:00:00+00:00"}
+    ])
+    db.seed("ipos", [{"slug": "a", "ipo_name": "A", "status": "closed", "last_scraped_at": "2026-10-02T10:00:00+00:00"}])
+    assert db.replay_spool() == (1, 0)
+    assert ipo(db, "a")["status"] == "closed"
+
+
+def test_replay_stops_at_an_outage_and_keeps_the_rest(make_db, monkeypatch):
+    db = make_db()
+    for n in range(3):
+        db.spool.append("append", "gmp_history", [gmp("a", n, f"2026-10-01T1{n}:00:00+00:00")])
+    real = db._replay
+
+    def replay(entry):
+        if entry["rows"][0]["gmp_amount"] == 1:
+            raise OSError("connection refused")
+        real(entry)
+
+    monkeypatch.setattr(db, "_replay", replay)
+    assert db.replay_spool() == (1, 2)
+    assert [e["rows"][0]["gmp_amount"] for e in db.spool.entries()] == [1, 2]
+    assert not db.spool.quarantine_path.exists()
+
+    monkeypatch.setattr(db, "_replay", real)
+    assert db.replay_spool() == (2, 0)
+    assert [amount for _, amount, _ in history(db)] == [0, 1, 2]
+
+
+def test_replay_quarantines_rejected_batches_and_carries_on(make_db):
+    db = make_db()
+    db.spool.append("append", "gmp_history", [gmp("a", 1, "2026-10-01T10:00:00+00:00")])
+    db.spool.append("append", "no_such_table", [gmp("a", 2, "2026-10-01T11:00:00+00:00")])
+    db.spool.append("append", "gmp_history", [gmp("a", 3, "2026-10-01T12:00:00+00:00")])
+
+    assert db.replay_spool() == (2, 0)
+    assert [amount for _, amount, _ in history(db)] == [1, 3]
+    assert db.spool.entries() == []
+    (kept,) = [json.loads(line) for line in db.spool.quarantine_path.read_text().splitlines()]
+    assert kept["table"] == "no_such_table" and kept["error"]
+
+
+def test_replay_without_spool(make_db):
+    db = make_db(write_spool=False)
+    assert db.spool is None
+    assert db.replay_spool() == (0, 0)
@@ -0,0 +1,78 @@
+"""run_staged: errors from any writer-side callback reach the caller
+instead of stopping the writer thread, and `finish` runs once at the end."""
+
+from __future__ import annotations
+
+import pytest
+
+from pipeline.sources._staged import run_staged
+
+
+def staged(items, **callbacks):
+    defaults = dict(
+        fetch=lambda item: item,
+        parse=lambda item, payload: payload,
+        write=lambda item, parsed: None,
+        on_error=lambda item, exc: None,
+        queue_size=1,
+    )
+    run_staged(items, **{**defaults, **callbacks})
+
+
+def test_items_are_written_in_order_then_finished():
+    calls = []
+    staged(range(5), write=lambda item, parsed: calls.append(parsed), finish=lambda: calls.append("finish"))
+    assert calls == [0, 1, 2, 3, 4, "finish"]
+
+
+def test_parse_errors_go_to_on_error():
+    def parse(item, payload):
+        if item == 2:
+            raise ValueError("bad page")
+        return payload
+
+    written, failed = [], []
+    staged(
+        range(4),
+        parse=parse,
+        write=lambda item, parsed: written.append(item),
+        on_error=lambda item, exc: failed.append((item, str(exc))),
+    )
+    assert written == [0, 1, 3]
+    assert failed == [(2, "bad page")]
+
+
+def test_failing_on_error_is_raised_not_hung():
+    def parse(item, payload):
+        raise ValueError("bad page")
+
+    def on_error(item, exc):
+        raise RuntimeError("on_error broke")
+
+    # More items than the queues hold: a dead writer would block the fetcher.
+    with pytest.raises(RuntimeError, match="on_error broke"):
+        staged(range(20), parse=parse, on_error=on_error)
+
+
+def test_write_failure_stops_fetching_and_still_finishes():
+    fetched, finished = [], []
+
+    def fetch(item):
+        fetched.append(item)
+        return item
+
+    def write(item, parsed):
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError, match="db down"):
+        staged(range(100), fetch=fetch, write=write, finish=lambda: finished.append(True))
+    assert len(fetched) < 100
+    assert finished == [True]
+
+
+def test_finish_failure_is_raised():
+    def finish():
+        raise RuntimeError("flush failed")
+
+    with pytest.raises(RuntimeError, match="flush failed"):
+        staged(range(3), finish=finish)
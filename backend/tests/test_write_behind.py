@@ -0,0 +1,101 @@
+"""Write-behind buffer (Settings.write_behind) on the SQLite backend:
+flushes send outside the buffer lock, failed batches go back in, and
+close() retires the exit-time flush."""
+
+from __future__ import annotations
+
+import atexit
+
+import pytest
+
+from pipeline.http_client import current_source
+
+
+def ipo(db, slug):
+    row = db.conn.execute("SELECT * FROM ipos WHERE slug = ?", (slug,)).fetchone()
+    return dict(row) if row else None
+
+
+def test_flush_writes_the_buffer(make_db):
+    db = make_db()
+    db.upsert_ipos([{"slug": "a", "ipo_name": "A", "status": "open"}])
+    db.bulk_update_ipos([{"slug": "a", "status": "closed"}])
+    assert ipo(db, "a") is None  # still buffered
+    assert db.flush() == 1
+    assert (ipo(db, "a")["ipo_name"], ipo(db, "a")["status"]) == ("A", "closed")
+    assert db.flush() == 0
+
+
+def test_buffering_isnt_blocked_by_a_flush_in_flight(make_db, monkeypatch):
+    db = make_db()
+    db.upsert_ipos([{"slug": "a", "ipo_name": "A"}])
+    real = db._write_ipos
+
+    def write_ipos(upserts, updates):
+        # Another source buffering mid-send must get the lock.
+        assert db._pending_lock.acquire(timeout=1)
+        db._pending_lock.release()
+        db.upsert_ipos([{"slug": "b", "ipo_name": "B"}])
+        return real(upserts, updates)
+
+    monkeypatch.setattr(db, "_write_ipos", write_ipos)
+    assert db.flush() == 1
+    assert ipo(db, "a") is not None and ipo(db, "b") is None
+    monkeypatch.undo()
+    assert db.flush() == 1
+    assert ipo(db, "b") is not None
+
+
+def test_failed_flush_goes_back_under_newer_writes(make_db, monkeypatch):
+    db = make_db()
+    token = current_source.set("detail")
+    try:
+        db.upsert_ipos([{"slug": "a", "ipo_name": "A", "status": "open", "issue_size_cr": 10}])
+        db.bulk_update_ipos([{"slug": "b", "status": "open"}])
+    finally:
+        current_source.reset(token)
+
+    def write_ipos(upserts, updates):
+        token = current_source.set("gmp")
+        try:
+            db.bulk_update_ipos([{"slug": "a", "status": "closed"}, {"slug": "b", "gmp": 5}])
+        finally:
+            current_source.reset(token)
+        raise ValueError("rejected")
+
+    monkeypatch.setattr(db, "_write_ipos", write_ipos)
+    with pytest.raises(ValueError):
+        db.flush()
+    assert db._pending_upserts == {"a": {"slug": "a", "ipo_name": "A", "status": "closed", "issue_size_cr": 10}}
+    assert db._pending_updates == {"b": {"status": "open", "gmp": 5}}
+    assert db.unflushed_sources() == {"detail", "gmp"}
+
+
+def test_final_flush_spools_on_an_outage(make_db, monkeypatch):
+    db = make_db()
+    db.upsert_ipos([{"slug": "a", "ipo_name": "A"}])
+
+    def down(upserts, updates):
+        raise OSError("connection refused")
+
+    monkeypatch.setattr(db, "_write_ipos", down)
+    with pytest.raises(OSError):
+        db.flush()  # mid-run: kept buffered
+    assert db.flush(final=True) == 0
+    assert [e["op"] for e in db.spool.entries()] == ["upsert_ipos"]
+    assert db._pending_upserts == {}
+
+
+def test_close_unregisters_the_exit_flush(make_db, monkeypatch):
+    registered = []
+    monkeypatch.setattr(atexit, "register", registered.append)
+    unregistered = []
+    monkeypatch.setattr(atexit, "unregister", unregistered.append)
+
+    db = make_db()
+    db.upsert_ipos([{"slug": "a", "ipo_name": "A"}])
+    assert registered == [db._flush_at_exit]
+    db.close()
+    assert unregistered == [db._flush_at_exit]
+    db._flush_at_exit()  # no-op on a closed database: doesn't touch the connection
+    assert db._pending_upserts
@@ -0,0 +1,153 @@
+"""Diff-against-current ipos writes (Settings.diff_writes), through the
+write-behind flush on the SQLite backend: only what changed is sent."""
+
+from __future__ import annotations
+
+import pytest
+
+NOW = "2026-10-02T10:00:00+00:00"
+EARLIER = "2026-10-01T10:00:00+00:00"
+
+
+def ipo(db, slug):
+    row = db.conn.execute("SELECT * FROM ipos WHERE slug = ?", (slug,)).fetchone()
+    return dict(row) if row else None
+
+
+def row(slug="a", at=NOW, **columns):
+    return {"slug": slug, "ipo_name": slug.upper(), "status": "open", "last_scraped_at": at, **columns}
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Record what each flush hands to the three write paths."""
+
+    def watch(db):
+        calls = {"upserts": [], "updates": [], "touches": []}
+        send_upserts, send_updates, touch_chunk = db._send_upserts, db._send_updates, db._touch_chunk
+
+        def upserts(rows):
+            calls["upserts"] += rows
+            return send_upserts(rows)
+
+        def updates(changes):
+            calls["updates"] += changes.items()
+            return send_updates(changes)
+
+        def touch(slugs, stamp):
+            calls["touches"] += [(slug, stamp) for slug in slugs]
+            return touch_chunk(slugs, stamp)
+
+        monkeypatch.setattr(db, "_send_upserts", upserts)
+        monkeypatch.setattr(db, "_send_updates", updates)
+        monkeypatch.setattr(db, "_touch_chunk", touch)
+        return calls
+
+    return watch
+
+
+def test_new_slug_is_upserted_whole(make_db, sent):
+    db = make_db()
+    calls = sent(db)
+    db.upsert_ipos([row(lot_size=50)])
+    assert db.flush() == 1
+    assert calls == {"upserts": [row(lot_size=50)], "updates": [], "touches": []}
+    assert ipo(db, "a")["lot_size"] == 50
+
+
+def test_unchanged_row_with_a_new_timestamp_is_touch_only(make_db, sent):
+    make_db().seed("ipos", [row(at=EARLIER, lot_size=50)])
+    db = make_db()  # a later run: current values come from the DB
+    calls = sent(db)
+    db.upsert_ipos([row(lot_size=50.0)])  # same value after the round trip
+    assert db.flush() == 1
+    assert calls == {"upserts": [], "updates": [], "touches": [("a", NOW)]}
+    assert ipo(db, "a")["last_scraped_at"] == NOW
+
+
+def test_touches_share_the_latest_timestamp(make_db, sent):
+    make_db().seed("ipos", [row("a", at=EARLIER), row("b", at=EARLIER)])
+    db = make_db()
+    calls = sent(db)
+    db.upsert_ipos([row("a", at="2026-10-02T09:00:00+00:00"), row("b", at=NOW)])
+    db.flush()
+    assert sorted(calls["touches"]) == [("a", NOW), ("b", NOW)]
+
+
+def test_identical_row_sends_nothing(make_db, sent):
+    make_db().seed("ipos", [row()])
+    db = make_db()
+    calls = sent(db)
+    db.upsert_ipos([row()])
+    assert db.flush() == 1  # found already current
+    assert calls == {"upserts": [], "updates": [], "touches": []}
+
+
+def test_changed_column_is_updated_alone(make_db, sent):
+    make_db().seed("ipos", [row(at=EARLIER, lot_size=50, issue_size_cr=100)])
+    db = make_db()
+    calls = sent(db)
+    db.upsert_ipos([row(status="closed", lot_size=50, issue_size_cr=100)])
+    assert db.flush() == 1
+    assert calls == {
+        "upserts": [],
+        "updates": [("a", {"status": "closed", "last_scraped_at": NOW})],
+        "touches": [],
+    }
+    assert (ipo(db, "a")["status"], ipo(db, "a")["last_scraped_at"]) == ("closed", NOW)
+
+
+def test_update_for_unknown_slug_sends_nothing(make_db, sent):
+    db = make_db()
+    calls = sent(db)
+    db.bulk_update_ipos([{"slug": "ghost", "status": "closed"}])
+    assert db.flush() == 0
+    assert calls == {"upserts": [], "updates": [], "touches": []}
+
+
+def test_touch_writes_skip(make_db, sent):
+    make_db().seed("ipos", [row(at=EARLIER)])
+    db = make_db(touch_writes="skip")
+    calls = sent(db)
+    db.upsert_ipos([row()])
+    assert db.flush() == 1
+    assert calls["touches"] == []
+    assert ipo(db, "a")["last_scraped_at"] == EARLIER
+
+
+def test_written_values_are_remembered_for_the_run(make_db, sent):
+    db = make_db()
+    calls = sent(db)
+    db.upsert_ipos([row()])
+    db.flush()
+    db.upsert_ipos([row()])
+    db.flush()
+    assert calls["upserts"] == [row()]  # the second flush found it current
+
+
+def test_failed_write_isnt_remembered_as_current(make_db, sent, monkeypatch):
+    make_db().seed("ipos", [row(at=EARLIER)])
+    db = make_db()
+    calls = sent(db)
+    updates = db._send_updates
+
+    def fail_once(changes):
+        monkeypatch.setattr(db, "_send_updates", updates)
+        raise OSError("connection reset")
+
+    monkeypatch.setattr(db, "_send_updates", fail_once)
+    db.upsert_ipos([row(status="closed")])
+    with pytest.raises(OSError):
+        db.flush()
+    assert db.flush() == 1
+    assert calls["updates"] == [("a", {"status": "closed", "last_scraped_at": NOW})]
+    assert ipo(db, "a")["status"] == "closed"
+
+
+def test_diff_writes_off_sends_everything(make_db, sent):
+    make_db().seed("ipos", [row()])
+    db = make_db(diff_writes=False)
+    calls = sent(db)
+    db.upsert_ipos([row()])
+    db.flush()
+    assert calls["upserts"] == [row()]